@@ -1,8 +1,16 @@
 import streamlit as st
-from modules.pdf_processor import process_pdf
+from modules.pdf_processor import process_pdf, create_conversation
 from modules.chat_handler import handle_chat_input
-from modules.document_processor import process_document
+from modules.document_processor import process_document, process_documents
 from modules.voice_processor import VoiceProcessor
+from modules.audio_cache import get_audio_cache
+from modules.index_cache import content_hash
+from modules.upload_store import UploadSession
+from modules import metrics
+from modules.embeddings import is_loaded, warm_up
+from modules.kb_snapshot import list_snapshots, open_snapshot, publish_snapshot
+from modules.course_store import DEFAULT_COURSE, get_course
+from modules.tabular_analyzer import TabularAnalyzer
 import os
 
 
@@ -19,6 +27,11 @@ st.set_page_config(
 st.title("🎓 T.A.R.A: Teaching Assistant & Research Assistant")
 st.subheader("Supporting students and faculty with course materials and research")
 
+# Load the shared embedding model once per process (disable with TARA_WARM_EMBEDDINGS=0)
+if os.getenv("TARA_WARM_EMBEDDINGS", "1") == "1" and not is_loaded():
+    with st.spinner("Loading embedding model..."):
+        warm_up()
+
 # Initialize session state
 if "conversation" not in st.session_state:
     st.session_state.conversation = None
@@ -29,19 +42,89 @@ if "document_processed" not in st.session_state:
 if "processing_status" not in st.session_state:
     st.session_state.processing_status = {}
 if "processed_files" not in st.session_state:
-    st.session_state.processed_files = set()
-if "temp_dir" not in st.session_state:
-    import tempfile
-    st.session_state.temp_dir = tempfile.mkdtemp()
+    st.session_state.processed_files = {}  # content hash -> file name
+if "upload_session" not in st.session_state:
+    # Owns spooled copies of large uploads; they are evicted when the session ends
+    st.session_state.upload_session = UploadSession()
 if "user_role" not in st.session_state:
     st.session_state.user_role = "student"  # Default to student role
+if "course_id" not in st.session_state:
+    st.session_state.course_id = DEFAULT_COURSE
+if "joined_course" not in st.session_state:
+    st.session_state.joined_course = None  # (course id, role, passcode) the session's materials come from
+if "course_passcode" not in st.session_state:
+    st.session_state.course_passcode = ""  # Professor passcode of the joined course
+if "upload_hashes" not in st.session_state:
+    st.session_state.upload_hashes = {}  # uploader file_id -> content hash
+
+def remove_document(file_hash):
+    """Remove one document from the knowledge base without re-embedding the others."""
+    file_name = st.session_state.processed_files.pop(file_hash)
+    if st.session_state.conversation:
+        st.session_state.conversation.retriever.knowledge_base.remove(file_hash)
+    # Drop its table unless a newer version with the same name is loaded
+    if file_name not in st.session_state.processed_files.values():
+        st.session_state.tabular_analyzer.remove(file_name)
+
+def session_knowledge_base():
+    """Return the knowledge base behind the current conversation, or None."""
+    if st.session_state.conversation:
+        return st.session_state.conversation.retriever.knowledge_base
+    return None
+
+def join_course(course_id, role, passcode=""):
+    """
+    Switch this session to a course's shared materials, or back to a private knowledge base.
+
+    Professors with the course's passcode get the course's knowledge base
+    itself; students (and professors without it) get a read-only view of it.
+    Either way the session gets its own conversation memory on top.
+    """
+    st.session_state.course_id = course_id
+    st.session_state.joined_course = (course_id, role, passcode) if course_id else None
+    st.session_state.course_passcode = ""
+    st.session_state.chat_history = []
+    st.session_state.processing_status = {}
+
+    if not course_id:
+        st.session_state.conversation = None
+        st.session_state.processed_files = {}
+        st.session_state.tabular_analyzer = TabularAnalyzer()
+        st.session_state.document_processed = False
+        return
 
-# Function to save uploaded file to temp directory
-def save_uploaded_file(uploaded_file):
-    file_path = os.path.join(st.session_state.temp_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return file_path
+    course = get_course(course_id)
+    knowledge_base = course.reader()
+    if role == "professor":
+        try:
+            knowledge_base = course.writer(passcode)
+            st.session_state.course_passcode = passcode
+        except PermissionError as e:
+            st.error(f"{e}. Course materials are read-only.")
+    st.session_state.conversation = create_conversation(knowledge_base)
+    st.session_state.processed_files = course.files(writable=not knowledge_base.read_only)
+    st.session_state.tabular_analyzer = course.tabular_analyzer
+
+def upload_hash(file):
+    """
+    Content hash of an uploaded file, computed once per upload.
+
+    The uploader keeps its files across reruns (every chat message is one),
+    so hashes are remembered by the upload's file_id, which is unique even
+    when two uploads share a name.
+    """
+    hashes = st.session_state.upload_hashes
+    file_id = getattr(file, "file_id", None) or id(file)
+    if file_id not in hashes:
+        hashes[file_id] = content_hash(file.getbuffer())
+    return hashes[file_id]
+
+def mark_processed(file_name, file_hash):
+    """Record a processed document; a new version of an existing file replaces the old one in place."""
+    st.session_state.processed_files[file_hash] = file_name
+    for old_hash, old_name in list(st.session_state.processed_files.items()):
+        if old_name == file_name and old_hash != file_hash:
+            remove_document(old_hash)
 
 # Role selection in sidebar
 with st.sidebar:
@@ -56,6 +139,26 @@ with st.sidebar:
     
     # Update role in session state
     st.session_state.user_role = role.lower()
+
+    # Sessions in the same course share the professor's materials
+    course_id = st.text_input(
+        "Course",
+        value=st.session_state.course_id,
+        help="Students see the materials professors add to the same course. Leave empty for a private knowledge base."
+    ).strip()
+    passcode = ""
+    if course_id and st.session_state.user_role == "professor":
+        passcode = st.text_input(
+            "Professor passcode",
+            type="password",
+            help="Needed to add or remove course materials. The first professor to open a course chooses it."
+        )
+    joined = (course_id, st.session_state.user_role, passcode) if course_id else None
+    if st.session_state.joined_course != joined:
+        join_course(course_id, st.session_state.user_role, passcode)
+    if course_id:
+        # Other sessions may have added or removed course materials since the last run
+        st.session_state.document_processed = bool(st.session_state.processed_files)
     
     st.divider()
     
@@ -67,21 +170,35 @@ with st.sidebar:
         st.header("📚 Knowledge Repository")
         uploader_text = "Upload course materials, research papers, etc."
     
-    # Allow multiple file uploads
-    uploaded_files = st.file_uploader(
-        uploader_text,
-          type=["pdf","csv","xlsx","xls"], accept_multiple_files=True)
+    knowledge_base = session_knowledge_base()
+    if knowledge_base is not None and knowledge_base.read_only:
+        # Students in a course and sessions opened from a snapshot cannot add materials
+        st.info("You are using shared materials, which are read-only here.")
+        uploaded_files = []
+    else:
+        # Allow multiple file uploads
+        uploaded_files = st.file_uploader(
+            uploader_text,
+              type=["pdf","csv","xlsx","xls"], accept_multiple_files=True)
     
     # Show currently processed files
     if st.session_state.processed_files:
         st.write("**Materials in my knowledge base:**")
-        for file_name in sorted(st.session_state.processed_files):
+        for file_name in sorted(st.session_state.processed_files.values()):
             st.write(f"• {file_name}")
     
     if uploaded_files:
-        # Identify new files not yet processed
-        current_upload_names = {file.name for file in uploaded_files}
-        new_files = [f for f in uploaded_files if f.name not in st.session_state.processed_files]
+        # Identify new files not yet processed, by content rather than name
+        new_files = []
+        seen_hashes = set(st.session_state.processed_files)
+        for file in uploaded_files:
+            if upload_hash(file) not in seen_hashes:
+                seen_hashes.add(upload_hash(file))
+                new_files.append(file)
+        # Forget uploads that were removed from the uploader
+        current_ids = {getattr(file, "file_id", None) or id(file) for file in uploaded_files}
+        for file_id in set(st.session_state.upload_hashes) - current_ids:
+            del st.session_state.upload_hashes[file_id]
         
         if new_files:
             st.write("**New materials to process:**")
@@ -92,12 +209,9 @@ with st.sidebar:
                 # Reset processing status for new batch
                 st.session_state.processing_status = {}
                 
-                # Save all files to temp directory first
+                # Mark all files as processing; they are parsed straight from the upload buffers
                 for file in new_files:
-                    file_path = save_uploaded_file(file)
-                    file_key = file.name
-                    # Mark as processing
-                    st.session_state.processing_status[file_key] = "processing"
+                    st.session_state.processing_status[file.name] = "processing"
                 
                 # Force UI update
                 st.rerun()
@@ -110,7 +224,54 @@ with st.sidebar:
         st.subheader("Processing Status")
         
         all_files_processed = True
+        pending_files = [
+            f for f in (uploaded_files or [])
+            if st.session_state.processing_status.get(f.name) == "processing"
+        ]
+        batch_names = set()
+        
+        if len(pending_files) > 1:
+            # Extract and embed the whole batch concurrently, then merge it in one step
+            batch_names = {f.name for f in pending_files}
+            status_slots = {}
+            for file in pending_files:
+                status_slots[file.name] = st.empty()
+                status_slots[file.name].info(f"Processing {file.name}...")
+            
+            def on_file_done(file_name, error):
+                if error is None:
+                    st.session_state.processing_status[file_name] = "complete"
+                    status_slots[file_name].success(f"Successfully processed {file_name}")
+                else:
+                    st.session_state.processing_status[file_name] = "failed"
+                    status_slots[file_name].error(f"Error processing {file_name}: {str(error)}")
+            
+            with st.spinner(f"Processing {len(pending_files)} files..."):
+                try:
+                    st.session_state.conversation = process_documents(
+                        pending_files,
+                        st.session_state.tabular_analyzer,
+                        existing_conversation=st.session_state.conversation,
+                        on_file_done=on_file_done,
+                        upload_session=st.session_state.upload_session
+                    )
+                except Exception as e:
+                    st.error(f"Error merging processed files: {str(e)}")
+                    for file_name in batch_names:
+                        st.session_state.processing_status[file_name] = "failed"
+            
+            for file in pending_files:
+                file_name = file.name
+                if st.session_state.processing_status[file_name] == "complete":
+                    mark_processed(file_name, upload_hash(file))
+                    st.session_state.document_processed = True
+                else:
+                    all_files_processed = False
+        
         for file_name, status in list(st.session_state.processing_status.items()):
+            if file_name in batch_names:
+                # Already shown by the batch status slots above
+                continue
             if status == "processing":
                 with st.spinner(f"Processing {file_name}..."):
                     # Find file object from the current uploads
@@ -151,15 +312,22 @@ with st.sidebar:
 
                     if file_obj:
                         try:
+                            # Make streamed PDFs queryable as soon as their first pages are indexed
+                            def on_ready(conversation):
+                                st.session_state.conversation = conversation
+                                st.session_state.document_processed = True
+
                             # Use the unified processor
                             st.session_state.conversation = process_document(
                                 file_obj,
                                 add_to_existing=(st.session_state.conversation is not None),
-                                existing_conversation=st.session_state.conversation
+                                existing_conversation=st.session_state.conversation,
+                                on_ready=on_ready,
+                                upload_session=st.session_state.upload_session
                             )
                             
                             if st.session_state.conversation:
-                                st.session_state.processed_files.add(file_name)
+                                mark_processed(file_name, upload_hash(file_obj))
                                 st.session_state.processing_status[file_name] = "complete"
                                 st.session_state.document_processed = True
                             else:
@@ -187,16 +355,68 @@ with st.sidebar:
         st.divider()
         st.subheader("Knowledge Base Management")
         st.write(f"Total documents: **{len(st.session_state.processed_files)}**")
+        st.caption("Upload a new version of a file with the same name to replace it.")
+        
+        knowledge_base = session_knowledge_base()
+        read_only = knowledge_base is not None and knowledge_base.read_only
+
+        # Remove individual documents; the rest of the knowledge base stays indexed
+        for file_hash, file_name in sorted(st.session_state.processed_files.items(), key=lambda item: item[1]):
+            name_col, button_col = st.columns([4, 1])
+            name_col.write(file_name)
+            if not read_only and button_col.button("Remove", key=f"remove_{file_hash}"):
+                remove_document(file_hash)
+                if not st.session_state.processed_files:
+                    st.session_state.document_processed = False
+                st.rerun()
         
         # Option to clear knowledge base
-        if st.button("Clear Knowledge Base"):
+        if st.session_state.course_id and not read_only:
+            if st.button("Clear Course Materials"):
+                get_course(st.session_state.course_id).reset(st.session_state.course_passcode)
+                st.session_state.document_processed = False
+                st.session_state.chat_history = []
+                st.success("Course materials cleared successfully.")
+                st.rerun()
+        elif not st.session_state.course_id and st.button("Clear Knowledge Base"):
             st.session_state.conversation = None
-            st.session_state.processed_files = set()
+            st.session_state.processed_files = {}
+            st.session_state.upload_session.close()
             st.session_state.document_processed = False
             st.session_state.chat_history = []
             st.success("Knowledge base cleared successfully.")
             st.rerun()
 
+    # Publish this knowledge base as a snapshot other server processes can map read-only
+    knowledge_base = session_knowledge_base()
+    if knowledge_base is not None and not knowledge_base.read_only:
+        with st.expander("Publish snapshot"):
+            snapshot_name = st.text_input("Snapshot name", value="course")
+            if st.button("Publish"):
+                try:
+                    version = publish_snapshot(knowledge_base, snapshot_name)
+                    st.success(f"Published {snapshot_name} (version {version})")
+                except Exception as e:
+                    st.error(f"Error publishing snapshot: {e}")
+
+    # Start from a published snapshot instead of uploading files
+    snapshot_names = list_snapshots()
+    if snapshot_names and st.session_state.conversation is None:
+        st.divider()
+        st.subheader("Published Snapshots")
+        snapshot_name = st.selectbox("Snapshot", snapshot_names)
+        if st.button("Open snapshot"):
+            try:
+                snapshot = open_snapshot(snapshot_name)
+                st.session_state.conversation = create_conversation(snapshot)
+                st.session_state.processed_files = {
+                    file_hash: source["name"] for file_hash, source in snapshot.sources.items()
+                }
+                st.session_state.document_processed = True
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error opening snapshot: {e}")
+
     st.divider()
 
     # In app.py - initialize voice processor
@@ -249,6 +469,33 @@ with st.sidebar:
             4. You can also use it to create teaching materials or answer common questions
         """)
 
+    # Process-wide performance metrics (ingestion throughput, latency, cache hit rates)
+    with st.expander("Performance metrics"):
+        snapshot = metrics.snapshot()
+        hits = snapshot["counters"].get("answer_cache.hits", 0)
+        misses = snapshot["counters"].get("answer_cache.misses", 0)
+        if hits + misses:
+            st.write(f"Answer cache hit ratio: **{hits / (hits + misses):.0%}** ({hits}/{hits + misses})")
+        fast_hits = snapshot["counters"].get("tabular.fast_path.hits", 0)
+        fast_misses = snapshot["counters"].get("tabular.fast_path.misses", 0)
+        if fast_hits + fast_misses:
+            st.write(f"Data questions answered without an LLM: **{fast_hits / (fast_hits + fast_misses):.0%}** "
+                     f"({fast_hits}/{fast_hits + fast_misses})")
+        audio = get_audio_cache().stats()
+        if audio["memory_hits"] + audio["disk_hits"] + audio["misses"]:
+            st.write(f"Voice clips served from cache: **{audio['hit_ratio']:.0%}** "
+                     f"({audio['memory_hits']} from memory, {audio['disk_hits']} from disk, "
+                     f"{audio['bytes_saved'] / 2**20:.1f} MiB of audio not re-synthesized)")
+        if st.session_state.conversation:
+            usage = st.session_state.conversation.retriever.knowledge_base.memory_usage()
+            if usage["chunks"]:
+                st.write(f"Knowledge base memory: **{usage['bytes_per_1000_chunks'] / 2**20:.1f} MiB per 1,000 chunks** "
+                         f"({usage['chunks']} chunks)")
+        for file_name, report in st.session_state.tabular_analyzer.memory_usage().items():
+            st.write(f"{file_name}: **{report['after'] / 2**20:.1f} MiB** in memory "
+                     f"(loaded as {report['before'] / 2**20:.1f} MiB)")
+        st.json(snapshot)
+
     st.divider()
     st.caption("Powered by Streamlit, LangChain, Ollama, and FAISS")
 
@@ -264,7 +511,9 @@ if st.session_state.document_processed:
         
     handle_chat_input()
 else:
-    if st.session_state.user_role == "student":
+    if st.session_state.user_role == "student" and st.session_state.course_id:
+        st.info(f"No materials have been shared in {st.session_state.course_id} yet. Check back once your professor has added them.")
+    elif st.session_state.user_role == "student":
         st.info("Upload and process your course materials to start getting help with your studies.")
     else:
         st.info("Upload and process course materials to build a knowledge base for your students and teaching support.")
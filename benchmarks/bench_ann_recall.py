@@ -0,0 +1,66 @@
+# benchmarks/bench_ann_recall.py
+#
+# Measure recall@k and query latency of the approximate indexes against exact
+# (flat) search, to choose TARA_ANN_INDEX, TARA_HNSW_EF_SEARCH and
+# TARA_IVF_NPROBE for a corpus size.
+#
+# Usage:
+#   python benchmarks/bench_ann_recall.py [--vectors 100000] [--dim 384] [--k 4]
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.vector_index import build_index, configure_search
+
+def make_corpus(n, d, queries, seed=0):
+    """Clustered random vectors (closer to real embeddings than uniform noise) and queries near them."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 100), d)).astype(np.float32)
+    corpus = centers[rng.integers(len(centers), size=n)] + 0.3 * rng.normal(size=(n, d)).astype(np.float32)
+    picks = corpus[rng.integers(n, size=queries)]
+    return corpus, picks + 0.1 * rng.normal(size=picks.shape).astype(np.float32)
+
+def bench(index, queries, k, truth=None):
+    """Return (result ids, ms/query, recall@k against truth)."""
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    ms_per_query = 1000 * (time.perf_counter() - start) / len(queries)
+    if truth is None:
+        return ids, ms_per_query, 1.0
+    recall = np.mean([len(set(found) & set(expected)) / k for found, expected in zip(ids, truth)])
+    return ids, ms_per_query, recall
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark approximate vector indexes against exact search")
+    parser.add_argument("--vectors", type=int, default=100000, help="Corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension (384 for all-MiniLM-L6-v2)")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of queries")
+    parser.add_argument("--k", type=int, default=4, help="Neighbours per query (the retriever uses 4)")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128], help="HNSW efSearch values")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="IVF nprobe values")
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.vectors, args.dim, args.queries)
+
+    print(f"{'index':<8} {'setting':<14} {'build s':>8} {'ms/query':>9} {f'recall@{args.k}':>9}")
+    start = time.perf_counter()
+    flat = build_index(corpus, "flat")
+    truth, ms, _ = bench(flat, queries, args.k)
+    print(f"{'flat':<8} {'exact':<14} {time.perf_counter() - start:>8.2f} {ms:>9.3f} {1.0:>9.3f}")
+
+    for kind, setting, values in (("hnsw", "ef_search", args.ef_search), ("ivfpq", "nprobe", args.nprobe)):
+        start = time.perf_counter()
+        index = build_index(corpus, kind)
+        build_seconds = time.perf_counter() - start
+        for value in values:
+            configure_search(index, **{setting: value})
+            _, ms, recall = bench(index, queries, args.k, truth)
+            print(f"{kind:<8} {f'{setting}={value}':<14} {build_seconds:>8.2f} {ms:>9.3f} {recall:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_intent_router.py
+#
+# Measure routing accuracy and per-question latency of the compiled intent
+# router against the original nested keyword scan, on the labelled questions
+# in benchmarks/routing_queries.jsonl. The rules were tuned on the "tuning"
+# questions only; --split heldout measures them on questions they never saw.
+# --classifier also loads the embedding model and measures the router with
+# the embedding classifier enabled. --min-accuracy makes the script exit
+# non-zero when the router falls below it.
+#
+# Usage:
+#   python benchmarks/bench_intent_router.py [--split heldout] [--repeat 200] [--classifier] [--min-accuracy 0.9]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.intent_router import ANALYSIS, DOCUMENTS, EmbeddingIntentClassifier, route_question
+
+CASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_queries.jsonl")
+
+def legacy_route(query):
+    """The keyword scan the router replaced: substring checks, including a verb x metric nested loop."""
+    analysis_keywords = [
+        "calculate", "compute", "analyze data", "run analysis",
+        "plot", "graph", "chart", "visualize", "visualization",
+        "statistics", "metrics", "average", "mean", "median", "sum",
+        "correlation", "trend", "compare data", "percentage",
+        "distribution", "histogram", "bar chart", "pie chart",
+        "standard deviation", "variance", "maximum", "minimum"
+    ]
+    analysis_verbs = ["analyze", "calculate", "compute", "count", "summarize", "plot", "chart", "graph", "compare"]
+    data_metrics = [
+        "average", "mean", "median", "mode", "sum", "total",
+        "minimum", "maximum", "count", "frequency", "percentage",
+        "growth", "trend", "distribution", "correlation", "variance"
+    ]
+    query_lower = query.lower()
+    if any(keyword in query_lower for keyword in analysis_keywords):
+        return ANALYSIS
+    for verb in analysis_verbs:
+        for metric in data_metrics:
+            if f"{verb} {metric}" in query_lower or f"{verb} the {metric}" in query_lower:
+                return ANALYSIS
+    if "how many" in query_lower and any(term in query_lower for term in ["rows", "entries", "records", "data points"]):
+        return ANALYSIS
+    if any(phrase in query_lower for phrase in ["group by", "filter by", "sort by"]):
+        return ANALYSIS
+    highest_lowest = ["highest", "lowest", "greatest", "smallest", "most", "least", "top", "bottom"]
+    if any(term in query_lower for term in highest_lowest) and any(metric in query_lower for metric in data_metrics):
+        return ANALYSIS
+    return DOCUMENTS
+
+class _NoClassifier:
+    """Stands in for the shared classifier so rule-only runs never touch the embedding model."""
+
+    def classify(self, question):
+        return DOCUMENTS, 0.0
+
+def load_cases(path, split="all"):
+    """Load labelled questions, optionally only one split ("tuning" or "heldout")."""
+    with open(path) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    return [case for case in cases if split == "all" or case["split"] == split]
+
+def bench(name, router, cases, repeat):
+    """Print accuracy, misrouted questions and microseconds per question for one router."""
+    predictions = [router(case["question"]) for case in cases]
+    correct = sum(prediction == case["intent"] for prediction, case in zip(predictions, cases))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            router(case["question"])
+    microseconds = (time.perf_counter() - start) / (repeat * len(cases)) * 1e6
+
+    accuracy = correct / len(cases)
+    print(f"{name:<22} accuracy {accuracy:6.1%} ({correct}/{len(cases)})   {microseconds:8.1f} us/question")
+    for prediction, case in zip(predictions, cases):
+        if prediction != case["intent"]:
+            print(f"    misrouted as {prediction}: {case['question']}")
+    return accuracy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", default=CASES_PATH)
+    parser.add_argument("--split", choices=["all", "tuning", "heldout"], default="all", help="Labelled questions to use")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the labelled set")
+    parser.add_argument("--classifier", action="store_true", help="Also measure the embedding classifier")
+    parser.add_argument("--min-accuracy", type=float, default=None)
+    args = parser.parse_args()
+
+    cases = load_cases(args.cases, args.split)
+    print(f"{len(cases)} labelled questions ({sum(c['intent'] == ANALYSIS for c in cases)} analysis)\n")
+
+    bench("legacy keyword scan", legacy_route, cases, args.repeat)
+    no_classifier = _NoClassifier()
+    accuracy = bench("compiled rules", lambda q: route_question(q, classifier=no_classifier).intent, cases, args.repeat)
+
+    if args.classifier:
+        from modules.embeddings import get_embeddings
+        classifier = EmbeddingIntentClassifier(get_embeddings())
+        # Embedding every question is far slower than the rules; a few passes are enough to time it
+        accuracy = bench(
+            "rules + classifier", lambda q: route_question(q, classifier=classifier).intent, cases, max(1, args.repeat // 50)
+        )
+
+    if args.min_accuracy is not None and accuracy < args.min_accuracy:
+        print(f"\nRouter accuracy {accuracy:.1%} is below {args.min_accuracy:.1%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_kb_memory.py
+#
+# Report knowledge base memory per 1,000 chunks with and without compact storage.
+#
+# Usage:
+#   python benchmarks/bench_kb_memory.py [--chunks 20000] [--dim 384]
+
+import argparse
+import os
+import sys
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.knowledge_base import KnowledgeBase
+
+def make_document_store(chunks, dim, chunk_chars=1000, pages_per_source=200, seed=0):
+    """A per-file FAISS store of synthetic 1000-character chunks with PDF-style metadata (no model needed)."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i} " + "lorem ipsum dolor sit amet " * (chunk_chars // 27) for i in range(chunks)]
+    metadatas = [
+        {"source": f"lecture_{i // (2 * pages_per_source)}.pdf", "page": (i // 2) % pages_per_source,
+         "total_pages": pages_per_source, "content_hash": f"{i // (2 * pages_per_source):064x}"}
+        for i in range(chunks)
+    ]
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embedding=FakeEmbeddings(size=dim), metadatas=metadatas)
+
+def measure(vector_store, compact_storage):
+    """Build a knowledge base in one storage mode and return its KnowledgeBase.memory_usage()."""
+    knowledge_base = KnowledgeBase(embeddings=vector_store.embedding_function, compact_storage=compact_storage)
+    knowledge_base.add(vector_store, "source", "source.pdf")
+    return knowledge_base.memory_usage()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark knowledge base memory per 1,000 chunks")
+    parser.add_argument("--chunks", type=int, default=20000, help="Chunks to index")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension (384 for all-MiniLM-L6-v2)")
+    args = parser.parse_args()
+
+    vector_store = make_document_store(args.chunks, args.dim)
+
+    print(f"{'storage':<8} {'KiB/1000 chunks':>16} {'vectors KiB':>12} {'docstore KiB':>13}")
+    for mode in ("off", "float16", "int8"):
+        usage = measure(vector_store, mode)
+        print(f"{mode:<8} {usage['bytes_per_1000_chunks'] / 1024:>16.1f} "
+              f"{usage['vector_bytes'] / 1024:>12.1f} {usage['docstore_bytes'] / 1024:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/bench_pdf_extractors.py
+#
+# Compare PDF text extraction throughput between backends.
+#
+# Usage:
+#   python benchmarks/bench_pdf_extractors.py path/to/book.pdf [--workers 4] [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.pdf_extractors import EXTRACTORS
+
+def bench(extractor, path, workers, repeat):
+    """Return (pages, best pages/sec, total characters) over several runs."""
+    best = None
+    pages = chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = chars = 0
+        for page in extractor.iter_pages(path, os.path.basename(path), workers=workers):
+            pages += 1
+            chars += len(page.page_content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return pages, pages / best if best else 0.0, chars
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction backends")
+    parser.add_argument("pdf", help="PDF file to extract")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="Worker process counts to try")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'workers':>7} {'pages':>6} {'pages/sec':>10} {'chars':>10}")
+    for name, extractor_class in EXTRACTORS.items():
+        if not extractor_class.is_available():
+            print(f"{name:<10} not installed")
+            continue
+        extractor = extractor_class()
+        for workers in args.workers:
+            pages, rate, chars = bench(extractor, args.pdf, workers, args.repeat)
+            print(f"{name:<10} {workers:>7} {pages:>6} {rate:>10.1f} {chars:>10}")
+
+if __name__ == "__main__":
+    main()
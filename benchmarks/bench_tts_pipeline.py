@@ -0,0 +1,112 @@
+# benchmarks/bench_tts_pipeline.py
+#
+# Measure time to first audio and playback stalls of the sentence-pipelined
+# voice mode against synthesizing the whole answer after it is written, using
+# the stub TTS server (benchmarks/stub_tts_server.py) and a simulated LLM that
+# streams an answer at --tokens-per-second.
+#
+# Usage:
+#   python benchmarks/bench_tts_pipeline.py [--chars 1500] [--tokens-per-second 40] [--workers 1 3 6]
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_tts_server import serve
+
+SENTENCES = [
+    "Recursion solves a problem by reducing it to smaller instances of the same problem.",
+    "Every recursive function needs a base case that stops the recursion.",
+    "Without one, the calls never end and the program runs out of stack space.",
+    "A classic example is the factorial, where n! equals n times (n - 1)!.",
+    "Merge sort splits a list in half, sorts each half recursively and merges the results.",
+    "Its running time is O(n log n) because each level of recursion does linear work.",
+]
+
+def make_answer(chars):
+    text = ""
+    while len(text) < chars:
+        text += " ".join(SENTENCES) + "\n"
+    return text[:chars]
+
+def stream_tokens(answer, tokens_per_second):
+    """Yield the answer word by word at the given rate, like a streaming LLM."""
+    for word in answer.split(" "):
+        time.sleep(1 / tokens_per_second)
+        yield word + " "
+
+def run_whole(voice, answer, tokens_per_second):
+    """The previous behaviour: wait for the full answer, then synthesize it."""
+    start = time.perf_counter()
+    for _ in stream_tokens(answer, tokens_per_second):
+        pass
+    audio = voice.text_to_speech(answer).getvalue()
+    return time.perf_counter() - start, 0, len(audio)
+
+def run_pipelined(voice, answer, tokens_per_second, workers):
+    """Split sentences as tokens arrive, synthesize on a worker pool, and replay the clips' timeline."""
+    from modules.voice_processor import SentenceSplitter, audio_seconds
+
+    start = time.perf_counter()
+    splitter = SentenceSplitter()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures, previous = [], None
+    ready_at = {}
+
+    def submit(piece, previous):
+        future = executor.submit(voice.synthesize, piece, previous)
+        index = len(futures)
+        future.add_done_callback(lambda _: ready_at.setdefault(index, time.perf_counter()))
+        futures.append(future)
+
+    for token in stream_tokens(answer, tokens_per_second):
+        for piece in splitter.feed(token):
+            submit(piece, previous)
+            previous = piece
+    for piece in splitter.flush():
+        submit(piece, previous)
+        previous = piece
+    clips = [future.result() for future in futures]
+    executor.shutdown()
+
+    # Clips play back to back; a stall is a clip that wasn't ready when the previous one ended
+    playing_until, stalls = 0.0, 0
+    for i, clip in enumerate(clips):
+        ready = ready_at[i] - start
+        if i and ready > playing_until:
+            stalls += 1
+        playing_until = max(ready, playing_until) + audio_seconds(clip)
+    return ready_at[0] - start, stalls, sum(len(clip) for clip in clips)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, default=1500, help="Answer length")
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub server delay before audio")
+    parser.add_argument("--seconds-per-char", type=float, default=0.002, help="Stub server synthesis time per character")
+    args = parser.parse_args()
+
+    server = serve(port=0, latency=args.latency, seconds_per_char=args.seconds_per_char, background=True)
+    os.environ["ELEVENLABS_API_KEY"] = "stub"
+    os.environ["ELEVENLABS_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    from modules.voice_processor import VoiceProcessor
+    voice = VoiceProcessor()
+
+    answer = make_answer(args.chars)
+    print(f"{len(answer)} character answer streamed at {args.tokens_per_second:g} words/s\n")
+    print(f"{'mode':<18} {'first audio (s)':>16} {'stalls':>7} {'audio (KB)':>11}")
+
+    first, stalls, size = run_whole(voice, answer, args.tokens_per_second)
+    print(f"{'whole answer':<18} {first:16.2f} {stalls:7d} {size / 1024:11.1f}")
+    for workers in args.workers:
+        first, stalls, size = run_pipelined(voice, answer, args.tokens_per_second, workers)
+        print(f"{f'pipelined x{workers}':<18} {first:16.2f} {stalls:7d} {size / 1024:11.1f}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/stub_tts_server.py
+#
+# A local stand-in for the ElevenLabs text-to-speech API, for testing voice
+# responses without an API key or quota. It answers
+# POST /v1/text-to-speech/<voice_id> (and .../stream) with silent MP3 audio
+# as long as the text would take to speak, after a simulated synthesis delay.
+# Texts over --max-chars are rejected like the real API does.
+#
+# Usage:
+#   python benchmarks/stub_tts_server.py [--port 8765] [--latency 0.3] [--seconds-per-char 0.002]
+#   ELEVENLABS_API_KEY=stub ELEVENLABS_BASE_URL=http://127.0.0.1:8765 streamlit run ai_ta.py
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_SECOND = 15  # Speaking rate used to size the audio
+# One silent MPEG-2 Layer III frame: 32 kbps, 22050 Hz, mono (matches mp3_22050_32), 576 samples
+FRAME = bytes([0xFF, 0xF3, 0x40, 0xC0]) + bytes(100)
+FRAME_SECONDS = 576 / 22050
+
+def silent_mp3(seconds):
+    """Return silent MP3 audio of about the given duration."""
+    return FRAME * max(1, round(seconds / FRAME_SECONDS))
+
+def make_handler(latency, seconds_per_char, max_chars):
+    class StubTTSHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.startswith("/v1/text-to-speech/"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            text = body.get("text", "")
+            if len(text) > max_chars:
+                self._send_json(400, {"detail": {"status": "max_character_limit_exceeded"}})
+                return
+
+            time.sleep(latency + seconds_per_char * len(text))
+            audio = silent_mp3(len(text) / CHARS_PER_SECOND)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(audio)))
+            self.end_headers()
+            self.wfile.write(audio)
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubTTSHandler
+
+def serve(port=8765, latency=0.3, seconds_per_char=0.002, max_chars=5000, background=False):
+    """
+    Start the stub server.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds before any audio is returned
+        seconds_per_char: Additional seconds per character of text
+        max_chars: Longest text accepted in one request
+        background: Serve from a daemon thread and return immediately
+
+    Returns:
+        The server (its base URL is http://127.0.0.1:<server.server_port>)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, seconds_per_char, max_chars))
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        print(f"Stub TTS server on http://127.0.0.1:{server.server_port}")
+        server.serve_forever()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before any audio is returned")
+    parser.add_argument("--seconds-per-char", type=float, default=0.002, help="Synthesis time per character")
+    parser.add_argument("--max-chars", type=int, default=5000)
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.seconds_per_char, args.max_chars)
+
+if __name__ == "__main__":
+    main()
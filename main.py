@@ -1,13 +1,13 @@
 import streamlit as st
-import os
-import tempfile
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.llms import Ollama
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
+from modules.embeddings import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from modules.embedding_pipeline import embed_into_vectorstore
+from modules.pdf_extractors import get_extractor
+from modules.index_cache import cache_key, load_cached_vectorstore, save_vectorstore
+from modules.upload_store import open_upload
 
 # Set page configuration
 st.set_page_config(page_title="Document RAG Chatbot", page_icon="📚", layout="wide")
@@ -26,31 +26,39 @@ if "document_processed" not in st.session_state:
 
 # Function to process the uploaded PDF document
 def process_document(uploaded_file):
-    # Create a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_path = tmp_file.name
-    
     try:
-        # Load the PDF
-        loader = PyPDFLoader(tmp_path)
-        documents = loader.load()
-        st.info(f"Loaded {len(documents)} pages from the PDF.")
-        
-        # Split the document into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
-        chunks = text_splitter.split_documents(documents)
-        st.info(f"Split into {len(chunks)} chunks of text for processing.")
-        
-        # Create embeddings and store in vector database
-        # Using HuggingFace embeddings (which run locally)
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        vector_store = FAISS.from_documents(chunks, embeddings)
-        st.success("Document processed and indexed successfully!")
+        # Parse straight from the upload buffer; large files are spooled once and removed afterwards
+        with open_upload(uploaded_file) as upload:
+            key = cache_key(upload.file_hash, chunk_size=1000, chunk_overlap=200, embedding_model=DEFAULT_EMBEDDING_MODEL)
+            
+            # Using HuggingFace embeddings (which run locally), shared across sessions
+            embeddings = get_embeddings()
+            
+            # Load the saved index if this exact document was processed before
+            vector_store = load_cached_vectorstore(key, embeddings, source_name=uploaded_file.name)
+            if vector_store is not None:
+                st.success("Loaded previously indexed document from cache!")
+            else:
+                # Load the PDF with the fastest available extractor
+                documents = list(get_extractor().iter_pages(upload.source, uploaded_file.name))
+                st.info(f"Loaded {len(documents)} pages from the PDF.")
+                
+                # Split the document into chunks
+                text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=1000,
+                    chunk_overlap=200,
+                    length_function=len
+                )
+                chunks = text_splitter.split_documents(documents)
+                for chunk in chunks:
+                    chunk.metadata["source"] = uploaded_file.name
+                    chunk.metadata["content_hash"] = upload.file_hash
+                st.info(f"Split into {len(chunks)} chunks of text for processing.")
+                
+                # Create embeddings and store in vector database
+                vector_store, stats = embed_into_vectorstore(chunks, embeddings)
+                save_vectorstore(key, vector_store)
+                st.success(f"Document processed and indexed successfully! ({stats['chunks_per_sec']:.1f} chunks/sec)")
         
         # Initialize the conversation memory
         memory = ConversationBufferMemory(
@@ -69,15 +77,10 @@ def process_document(uploaded_file):
             verbose=True
         )
         
-        # Clean up the temporary file
-        os.unlink(tmp_path)
-        
         return conversation_chain
     
     except Exception as e:
         st.error(f"Error processing document: {e}")
-        # Clean up the temporary file
-        os.unlink(tmp_path)
         return None
 
 # Sidebar for uploading document
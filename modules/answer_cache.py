@@ -0,0 +1,126 @@
+# modules/answer_cache.py
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Cache settings (override with environment variables)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("TARA_ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_SIZE = int(os.getenv("TARA_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("TARA_ANSWER_CACHE_TTL_SECONDS", "86400"))
+
+class AnswerCache:
+    """
+    Semantic cache of generated answers.
+
+    An entry is reused when a new question's embedding has cosine similarity
+    of at least `threshold` with a cached question, asked under the same user
+    role and context (e.g. a digest of the chat history the question follows)
+    against the same knowledge base version. Entries are evicted least
+    recently used first and expire after `ttl_seconds`. Entries made against
+    an older version of a knowledge base are dropped as soon as that
+    knowledge base changes.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # entry id -> entry, least recently used first
+        self._buckets = {}  # (kb_id, version, role, context) -> list of entry ids
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def lookup(self, query_vector, role, kb_stamp, context=""):
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            query_vector: Embedding of the question
+            role: User role the answer was written for
+            kb_stamp: KnowledgeBase.stamp at the time of the question
+            context: What else the answer depended on; "" for standalone questions
+
+        Returns:
+            Dictionary with "answer", "sources" and "similarity", or None on a miss
+        """
+        kb_id, version = kb_stamp
+        vector = _normalize(query_vector)
+        now = time.monotonic()
+
+        with self._lock:
+            self._drop_stale_versions(kb_id, version)
+            entry_ids = self._buckets.get((kb_id, version, role, context), [])
+
+            for entry_id in [e for e in entry_ids if now - self._entries[e]["created"] > self.ttl_seconds]:
+                self._remove(entry_id)
+            entry_ids = self._buckets.get((kb_id, version, role, context), [])
+            if not entry_ids:
+                return None
+
+            vectors = np.stack([self._entries[e]["vector"] for e in entry_ids])
+            similarities = vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            entry_id = entry_ids[best]
+            self._entries.move_to_end(entry_id)
+            entry = self._entries[entry_id]
+            return {"answer": entry["answer"], "sources": entry["sources"], "similarity": float(similarities[best])}
+
+    def store(self, query_vector, role, kb_stamp, answer, sources, context=""):
+        """Cache an answer for a question asked under the given role, context and knowledge base version."""
+        kb_id, version = kb_stamp
+
+        with self._lock:
+            self._drop_stale_versions(kb_id, version)
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "vector": _normalize(query_vector),
+                "bucket": (kb_id, version, role, context),
+                "answer": answer,
+                "sources": sources,
+                "created": time.monotonic(),
+            }
+            self._buckets.setdefault((kb_id, version, role, context), []).append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, kb_id):
+        """Drop every entry for a knowledge base."""
+        with self._lock:
+            for bucket in [b for b in self._buckets if b[0] == kb_id]:
+                for entry_id in list(self._buckets[bucket]):
+                    self._remove(entry_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop_stale_versions(self, kb_id, version):
+        for bucket in [b for b in self._buckets if b[0] == kb_id and b[1] != version]:
+            for entry_id in list(self._buckets[bucket]):
+                self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["bucket"]]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[entry["bucket"]]
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+# Process-wide cache shared by every session
+_answer_cache = AnswerCache()
+
+def get_answer_cache():
+    """Get the process-wide answer cache."""
+    return _answer_cache
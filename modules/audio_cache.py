@@ -0,0 +1,228 @@
+# modules/audio_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from modules import metrics
+
+# Audio cache settings (override with environment variables)
+AUDIO_CACHE = os.getenv("TARA_AUDIO_CACHE", "1") == "1"
+AUDIO_CACHE_DIR = os.getenv(
+    "TARA_AUDIO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tara", "audio"),
+)
+AUDIO_CACHE_MEMORY_BYTES = int(float(os.getenv("TARA_AUDIO_CACHE_MEMORY_MB", "32")) * 1024 * 1024)
+AUDIO_CACHE_DISK_BYTES = int(float(os.getenv("TARA_AUDIO_CACHE_DISK_MB", "512")) * 1024 * 1024)
+
+def normalize_text(text):
+    """Normalize text so answers differing only in whitespace or Unicode composition share audio."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def audio_key(text, voice_id, model_id, voice_settings, output_format, previous_text=None):
+    """
+    Build the content address of a synthesized clip.
+
+    Args:
+        text: Text that was spoken
+        voice_id: Eleven Labs voice
+        model_id: Eleven Labs model
+        voice_settings: VoiceSettings (or a dict of them)
+        output_format: Audio format, e.g. "mp3_22050_32"
+        previous_text: Context text passed with the request, which changes the intonation
+
+    Returns:
+        Hex digest identifying exactly this audio
+    """
+    settings = voice_settings.model_dump() if hasattr(voice_settings, "model_dump") else dict(voice_settings or {})
+    payload = json.dumps({
+        "text": normalize_text(text),
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "voice_settings": settings,
+        "output_format": output_format,
+        "previous_text": normalize_text(previous_text) if previous_text else None,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AudioCache:
+    """
+    Two-tier cache of synthesized audio, addressed by audio_key().
+
+    Recently used clips are kept in memory (least recently used evicted
+    first, up to memory_bytes). Every clip is also written to disk, where
+    the cache is shared with other server processes and survives restarts;
+    the oldest files are removed once the directory exceeds disk_bytes.
+    The directory is rescanned before evicting whenever something other
+    than this cache changed it, so the cap holds for all processes together.
+    Memory hits return the stored bytes object itself, so serving a cached
+    clip copies nothing; disk hits are read once and promoted to memory.
+    """
+
+    def __init__(self, cache_dir=AUDIO_CACHE_DIR, memory_bytes=AUDIO_CACHE_MEMORY_BYTES, disk_bytes=AUDIO_CACHE_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()  # key -> audio bytes, least recently used first
+        self._memory_size = 0
+        self._disk = None  # key -> file size, oldest first (scanned on first use and after other processes change the directory)
+        self._disk_size = 0
+        self._disk_mtime = None  # Directory mtime when _disk was last known to match it
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a clip.
+
+        Returns:
+            The audio bytes, or None on a miss
+        """
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+        if audio is not None:
+            self._record_hit("memory", audio)
+            return audio
+
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+        except OSError:
+            metrics.increment("audio_cache.misses")
+            return None
+        try:
+            os.utime(self._path(key))  # Mark as recently used for disk eviction
+        except OSError:
+            pass
+
+        with self._lock:
+            if self._disk is not None and key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, audio)
+        self._record_hit("disk", audio)
+        return audio
+
+    def put(self, key, audio):
+        """Store a clip in both tiers."""
+        if not audio:
+            return
+        with self._lock:
+            self._remember(key, audio)
+        try:
+            self._write(key, audio)
+        except OSError:
+            pass  # The disk tier is an optimization; a full or read-only disk only loses persistence
+
+    def stats(self):
+        """Return hit counts, hit ratio, bytes served from cache and the size of each tier."""
+        counters = metrics.snapshot()["counters"]
+        memory_hits = counters.get("audio_cache.memory_hits", 0)
+        disk_hits = counters.get("audio_cache.disk_hits", 0)
+        misses = counters.get("audio_cache.misses", 0)
+        lookups = memory_hits + disk_hits + misses
+        with self._lock:
+            return {
+                "memory_hits": memory_hits,
+                "disk_hits": disk_hits,
+                "misses": misses,
+                "hit_ratio": (memory_hits + disk_hits) / lookups if lookups else 0.0,
+                "bytes_saved": counters.get("audio_cache.bytes_saved", 0),
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size if self._disk is not None else None,
+            }
+
+    def clear(self):
+        """Drop every cached clip from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._disk = None  # Rescan, to include clips written by other processes
+            self._load_disk_index()
+            for key in list(self._disk):
+                self._remove_file(key)
+
+    def _record_hit(self, tier, audio):
+        metrics.increment(f"audio_cache.{tier}_hits")
+        metrics.increment("audio_cache.bytes_saved", len(audio))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _remember(self, key, audio):
+        """Add a clip to the memory tier (caller holds the lock)."""
+        if len(audio) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _write(self, key, audio):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            # Checked before our own write changes the directory: a difference means another process wrote or evicted
+            changed = self._directory_mtime() != self._disk_mtime
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".mp3.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            # Atomic, so other processes never read a partial clip
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if changed:
+                self._disk = None
+            self._load_disk_index()
+            self._disk_size += len(audio) - self._disk.pop(key, 0)
+            self._disk[key] = len(audio)
+            while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+                self._remove_file(next(iter(self._disk)))
+            self._disk_mtime = self._directory_mtime()
+
+    def _directory_mtime(self):
+        try:
+            return os.stat(self.cache_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_disk_index(self):
+        """Scan the cache directory unless it is already indexed, oldest files first (caller holds the lock)."""
+        if self._disk is not None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".mp3") and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name[:-len(".mp3")], stat.st_size))
+        except OSError:
+            pass
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_size = sum(self._disk.values())
+
+    def _remove_file(self, key):
+        """Delete a clip from disk (caller holds the lock); another process may have removed it already."""
+        self._disk_size -= self._disk.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+_audio_cache = AudioCache()
+
+def get_audio_cache():
+    """Return the process-wide audio cache, shared by every session."""
+    return _audio_cache
@@ -1,8 +1,18 @@
 # modules/chat_handler.py
 
+import hashlib
 import streamlit as st
 from modules.tabular_analyzer import TabularAnalyzer
+from modules.rag_streaming import (
+    chat_history_text, condense_question, retrieve_for_question, stream_answer, save_exchange, format_sources,
+)
+from modules.answer_cache import get_answer_cache
+from modules.tabular_fast_path import answer_fast
+from modules.intent_router import ANALYSIS, route_question
+from modules.voice_processor import TTS_STREAMING
+from modules import metrics
 import os
+import time
 
 # Initialize tabular analyzer in session state if not present
 if "tabular_analyzer" not in st.session_state:
@@ -40,102 +50,186 @@ def handle_chat_input():
         st.session_state.chat_history.append({"role": "user", "content": user_question})
         
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                # Check if the question is about data analysis
-                is_analysis_query = should_generate_analysis_code(user_question)
-                has_tabular_data = len(st.session_state.tabular_analyzer.dataframes) > 0
-                
-                if is_analysis_query and has_tabular_data:
-                    # Use Gemini for data analysis
-                    with st.spinner("Analyzing data..."):
-                        result = st.session_state.tabular_analyzer.analyze_with_gemini(user_question)
-                        
-                        if result["success"]:
-                            # Display the analysis results
-                            response_content = result["output"]
-                            st.write(response_content)
-                        else:
-                            # Display the error
-                            st.error(f"Analysis failed: {result['error']}")
-                            response_content = f"I encountered an issue while analyzing the data: {result['error']}"
-                else:
-                    # Select instruction prompt based on user role
-                    if st.session_state.user_role == "student":
-                        instruction_prompt = STUDENT_INSTRUCTIONS
-                    else:  # professor
-                        instruction_prompt = PROFESSOR_INSTRUCTIONS
+            # In streaming voice mode the answer is spoken sentence by sentence while it is written
+            voice_processor = st.session_state.voice_processor
+            voice_enabled = voice_processor.is_available and st.session_state.get("voice_enabled", False)
+            speech = voice_processor.speech_pipeline() if voice_enabled and TTS_STREAMING else None
+            answer_streamed = False
+            
+            # Check if the question is about data analysis (only worth routing when tables are loaded)
+            tabular_analyzer = st.session_state.tabular_analyzer
+            tables = tabular_analyzer.tables()  # Snapshot; professors may be loading files into a shared course
+            has_tabular_data = len(tables) > 0
+            columns = [column for table in tables.values() for column in table.columns]
+            is_analysis_query = has_tabular_data and should_generate_analysis_code(user_question, columns)
+            
+            # Simple aggregations are computed directly, without an LLM round trip
+            fast_answer = None
+            if is_analysis_query and has_tabular_data:
+                tables = tabular_analyzer.tables_for(user_question)
+                try:
+                    fast_answer = answer_fast(user_question, tables, {name: tabular_analyzer.profile(name) for name in tables})
+                except Exception:
+                    # Anything the fast path can't compute is left to the analyzer
+                    metrics.increment("tabular.fast_path.errors")
+            
+            if fast_answer is not None:
+                response_content = fast_answer
+                st.markdown(response_content)
+            elif is_analysis_query and has_tabular_data:
+                # Use Gemini for data analysis
+                with st.spinner("Analyzing data..."):
+                    result = st.session_state.tabular_analyzer.analyze_with_gemini(user_question)
                     
-                    # Use standard RAG approach for non-analysis queries
-                    enhanced_question = f"{instruction_prompt}\n\nUser question: {user_question}"
-                    response = st.session_state.conversation({"question": enhanced_question})
-                    response_content = response["answer"]
-                    st.write(response_content)
-                
-                # Add to chat history
-                st.session_state.chat_history.append({
-                    "role": "assistant", 
-                    "content": response_content
-                })
+                    if result["success"]:
+                        # Display the analysis results
+                        response_content = result["output"]
+                        st.write(response_content)
+                    else:
+                        # Display the error
+                        st.error(f"Analysis failed: {result['error']}")
+                        response_content = f"I encountered an issue while analyzing the data: {result['error']}"
+            else:
+                # Select instruction prompt based on user role
+                if st.session_state.user_role == "student":
+                    instruction_prompt = STUDENT_INSTRUCTIONS
+                else:  # professor
+                    instruction_prompt = PROFESSOR_INSTRUCTIONS
                 
-                # Generate and play voice if enabled
-                if st.session_state.voice_processor.is_available and st.session_state.get("voice_enabled", False):
-                    with st.spinner("Generating voice..."):
-                        audio_stream = st.session_state.voice_processor.text_to_speech(response_content)
-                        if audio_stream:
-                            st.audio(audio_stream, format="audio/mp3")
+                # Use standard RAG approach for non-analysis queries
+                enhanced_question = f"{instruction_prompt}\n\nUser question: {user_question}"
+                answer_streamed = True
+                response_content = stream_rag_response(
+                    st.session_state.conversation,
+                    enhanced_question,
+                    user_question,
+                    st.session_state.user_role,
+                    speech
+                )
+            
+            # Add to chat history
+            st.session_state.chat_history.append({
+                "role": "assistant", 
+                "content": response_content
+            })
+            
+            # Generate and play voice if enabled
+            if speech is not None:
+                # RAG answers were fed while streaming; analysis answers arrive whole
+                if not answer_streamed:
+                    speech.feed(response_content)
+                speech.finish()
+            elif voice_enabled:
+                with st.spinner("Generating voice..."):
+                    audio_stream = voice_processor.text_to_speech(response_content)
+                    if audio_stream:
+                        st.audio(audio_stream, format="audio/mp3")
 
-def should_generate_analysis_code(query):
+def stream_rag_response(conversation, question, user_question, role, speech=None):
     """
-    Determine if a query requires data analysis code generation.
-    Returns True only for queries that clearly need computational analysis.
+    Answer a question from the knowledge base, streaming tokens into the current chat bubble.
+
+    Answers to semantically equivalent questions asked under the same role
+    against the same knowledge base version are served from the answer
+    cache. The question as typed is looked up first, keyed on a digest of
+    the chat history; follow-ups are only condensed into a standalone
+    question (an LLM call) on a miss, and looked up again in that form.
+    Otherwise the retrieved sources are shown first, then the answer is
+    written token by token as the LLM generates it. Time to first token is
+    shown under the answer and recorded in the metrics registry.
+
+    Args:
+        conversation: ConversationalRetrievalChain for the session
+        question: The question to answer (including the role instructions)
+        user_question: The question as the user typed it
+        role: The user's role ("student" or "professor")
+        speech: Optional SpeechPipeline fed with the answer as it is written
+
+    Returns:
+        The complete answer text
     """
-    # Keywords that strongly indicate need for analysis
-    analysis_keywords = [
-        "calculate", "compute", "analyze data", "run analysis", 
-        "plot", "graph", "chart", "visualize", "visualization",
-        "statistics", "metrics", "average", "mean", "median", "sum", 
-        "correlation", "trend", "compare data", "percentage", 
-        "distribution", "histogram", "bar chart", "pie chart", 
-        "standard deviation", "variance", "maximum", "minimum"
-    ]
+    start = time.perf_counter()
+    knowledge_base = conversation.retriever.knowledge_base
+    answer_cache = get_answer_cache()
+    
+    with st.spinner("Thinking..."):
+        # The same words mean the same thing after the same history, so the raw question is tried first
+        chat_history_str = chat_history_text(conversation)
+        history_digest = hashlib.sha256(chat_history_str.encode("utf-8")).hexdigest()[:16] if chat_history_str else ""
+        kb_stamp = knowledge_base.stamp
+        raw_vector = knowledge_base.embeddings.embed_query(user_question)
+        cached = answer_cache.lookup(raw_vector, role, kb_stamp, history_digest)
+        
+        if cached is None:
+            search_text, query_vector = user_question, raw_vector
+            standalone_question = question
+            if chat_history_str:
+                # Only follow-ups that missed are condensed; standalone questions are shared across conversations
+                standalone_question = condense_question(conversation, question, chat_history_str)
+                search_text = standalone_question
+                query_vector = knowledge_base.embeddings.embed_query(search_text)
+                cached = answer_cache.lookup(query_vector, role, kb_stamp)
+        
+        if cached is None:
+            answer_question, docs = retrieve_for_question(
+                conversation, question, standalone_question, search_text=search_text, query_vector=query_vector
+            )
     
-    # Analysis action verbs
-    analysis_verbs = [
-        "analyze", "calculate", "compute", "count", "summarize", 
-        "plot", "chart", "graph", "compare"
-    ]
+    if cached is not None:
+        metrics.increment("answer_cache.hits")
+        if cached["sources"]:
+            st.caption("Sources: " + " · ".join(cached["sources"]))
+        st.write(cached["answer"])
+        if speech is not None:
+            speech.feed(cached["answer"])
+        save_exchange(conversation, question, cached["answer"])
+        
+        hit_seconds = time.perf_counter() - start
+        metrics.observe("answer_cache.hit_seconds", hit_seconds)
+        st.caption(f"Answered from cache in {hit_seconds * 1000:.0f} ms")
+        return cached["answer"]
     
-    # Data metric nouns
-    data_metrics = [
-        "average", "mean", "median", "mode", "sum", "total",
-        "minimum", "maximum", "count", "frequency", "percentage",
-        "growth", "trend", "distribution", "correlation", "variance"
-    ]
+    metrics.increment("answer_cache.misses")
+    metrics.observe("rag.retrieval_seconds", time.perf_counter() - start)
     
-    query_lower = query.lower()
+    sources = format_sources(docs)
+    if sources:
+        st.caption("Sources: " + " · ".join(sources))
     
-    # Check for strong indicators - direct analysis requests
-    for keyword in analysis_keywords:
-        if keyword in query_lower:
-            return True
+    first_token_at = []
     
-    # Check for combinations of analysis verbs and data metrics
-    for verb in analysis_verbs:
-        for metric in data_metrics:
-            if f"{verb} {metric}" in query_lower or f"{verb} the {metric}" in query_lower:
-                return True
+    def tokens():
+        for token in stream_answer(conversation, answer_question, docs):
+            if not first_token_at:
+                first_token_at.append(time.perf_counter())
+            if speech is not None:
+                speech.feed(str(token))
+            yield token
     
-    # Check for specific request patterns
-    if "how many" in query_lower and any(term in query_lower for term in ["rows", "entries", "records", "data points"]):
-        return True
-        
-    if any(phrase in query_lower for phrase in ["group by", "filter by", "sort by"]):
-        return True
-        
-    # Look for questions about highest/lowest values
-    highest_lowest = ["highest", "lowest", "greatest", "smallest", "most", "least", "top", "bottom"]
-    if any(term in query_lower for term in highest_lowest) and any(metric in query_lower for metric in data_metrics):
-        return True
+    answer = st.write_stream(tokens())
+    if not isinstance(answer, str):
+        answer = "".join(str(part) for part in answer)
+    save_exchange(conversation, question, answer)
+    answer_cache.store(query_vector, role, kb_stamp, answer, sources)
+    if history_digest:
+        answer_cache.store(raw_vector, role, kb_stamp, answer, sources, history_digest)
     
-    # Default to using RAG for anything else
-    return False
\ No newline at end of file
+    total_seconds = time.perf_counter() - start
+    metrics.observe("rag.total_seconds", total_seconds)
+    if first_token_at:
+        time_to_first_token = first_token_at[0] - start
+        metrics.observe("rag.time_to_first_token_seconds", time_to_first_token)
+        st.caption(f"First token in {time_to_first_token:.2f}s · full answer in {total_seconds:.2f}s")
+    
+    return answer
+
+def should_generate_analysis_code(query, columns=()):
+    """
+    Determine if a query requires data analysis code generation.
+    Returns True only for queries that clearly need computational analysis.
+
+    Args:
+        query: The user's question
+        columns: Column names of the loaded tables, used as extra evidence
+    """
+    return route_question(query, columns).intent == ANALYSIS
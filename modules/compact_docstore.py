@@ -0,0 +1,208 @@
+# modules/compact_docstore.py
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, List, Union
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Docstore that keeps chunk text in one UTF-8 blob instead of Document objects.
+
+    Each chunk is a (offset, length, metadata slot) triple in parallel arrays,
+    and metadata dictionaries are interned: chunks with identical metadata
+    (the same source file and page) share one dictionary, and their string
+    values are interned so every chunk of a source shares one copy of its
+    name and hash. Documents are only materialized when searched.
+
+    Drop-in replacement for LangChain's InMemoryDocstore in a FAISS vectorstore.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array("q")
+        self._lengths = array("l")
+        self._metadata_slots = array("l")
+        self._slots = {}  # docstore id -> row in the arrays above
+        self._free_rows = []  # rows of deleted chunks, reused by later adds
+        self._metadata = []  # interned metadata dictionaries
+        self._metadata_index = {}  # hashable form of a metadata dict -> position in _metadata
+        self._garbage = 0  # blob bytes belonging to deleted chunks
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Add documents by id; raises ValueError if an id is already present."""
+        overlapping = set(texts).intersection(self._slots)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+
+        for doc_id, doc in texts.items():
+            encoded = doc.page_content.encode("utf-8")
+            row = self._free_rows.pop() if self._free_rows else len(self._offsets)
+            values = (len(self._blob), len(encoded), self._intern_metadata(doc.metadata))
+            if row == len(self._offsets):
+                self._offsets.append(values[0])
+                self._lengths.append(values[1])
+                self._metadata_slots.append(values[2])
+            else:
+                self._offsets[row], self._lengths[row], self._metadata_slots[row] = values
+            self._blob += encoded
+            self._slots[doc_id] = row
+
+    def delete(self, ids: List) -> None:
+        """Delete documents by id; the blob is compacted once half of it is unused."""
+        missing = set(ids).difference(self._slots)
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+
+        for doc_id in ids:
+            row = self._slots.pop(doc_id)
+            self._garbage += self._lengths[row]
+            self._free_rows.append(row)
+
+        if self._garbage > len(self._blob) // 2:
+            self._compact()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Return the document with this id, or a message string if it is missing (as InMemoryDocstore does)."""
+        row = self._slots.get(search)
+        if row is None:
+            return f"ID {search} not found."
+
+        offset, length = self._offsets[row], self._lengths[row]
+        return Document(
+            id=search,
+            page_content=self._blob[offset:offset + length].decode("utf-8"),
+            metadata=dict(self._metadata[self._metadata_slots[row]]),
+        )
+
+    def memory_bytes(self):
+        """Approximate memory held by the store (text, chunk arrays, interned metadata and id map)."""
+        arrays = sum(a.itemsize * len(a) for a in (self._offsets, self._lengths, self._metadata_slots))
+        metadata = sum(sys.getsizeof(m) for m in self._metadata)
+        ids = sys.getsizeof(self._slots) + sum(sys.getsizeof(doc_id) for doc_id in self._slots)
+        return len(self._blob) + arrays + metadata + ids
+
+    def _intern_metadata(self, metadata):
+        try:
+            key = tuple(sorted(metadata.items()))
+            hash(key)
+        except TypeError:
+            key = repr(sorted(metadata.items()))
+
+        slot = self._metadata_index.get(key)
+        if slot is None:
+            slot = len(self._metadata)
+            interned = {k: sys.intern(v) if isinstance(v, str) else v for k, v in metadata.items()}
+            self._metadata.append(interned)
+            self._metadata_index[tuple(sorted(interned.items())) if isinstance(key, tuple) else key] = slot
+        return slot
+
+    def _compact(self):
+        """Rewrite the blob and metadata table without deleted chunks."""
+        blob = bytearray()
+        metadata, remap = [], {}
+        for row in self._slots.values():
+            offset, length = self._offsets[row], self._lengths[row]
+            self._offsets[row] = len(blob)
+            blob += self._blob[offset:offset + length]
+
+            slot = self._metadata_slots[row]
+            if slot not in remap:
+                remap[slot] = len(metadata)
+                metadata.append(self._metadata[slot])
+            self._metadata_slots[row] = remap[slot]
+
+        self._blob = blob
+        self._metadata = metadata
+        self._metadata_index = {key: remap[slot] for key, slot in self._metadata_index.items() if slot in remap}
+        self._garbage = 0
+
+def write_docstore(directory, ids, docstore):
+    """
+    Write the documents with the given ids, in order, as a mappable docstore.
+
+    Works for any docstore (InMemoryDocstore or CompactDocstore). The text is
+    written as one UTF-8 file and the offsets, lengths and metadata slots as
+    .npy arrays, so MappedDocstore can open them without copying.
+
+    Args:
+        directory: Existing directory to write into
+        ids: Docstore ids, in index order
+        docstore: Docstore holding the documents
+    """
+    interner = CompactDocstore()
+    offsets = np.zeros(len(ids), dtype=np.int64)
+    lengths = np.zeros(len(ids), dtype=np.int64)
+    slots = np.zeros(len(ids), dtype=np.int32)
+
+    with open(os.path.join(directory, "text.bin"), "wb") as text_file:
+        position = 0
+        for row, doc_id in enumerate(ids):
+            doc = docstore.search(doc_id)
+            encoded = doc.page_content.encode("utf-8")
+            text_file.write(encoded)
+            offsets[row], lengths[row] = position, len(encoded)
+            slots[row] = interner._intern_metadata(doc.metadata)
+            position += len(encoded)
+
+    np.save(os.path.join(directory, "offsets.npy"), offsets)
+    np.save(os.path.join(directory, "lengths.npy"), lengths)
+    np.save(os.path.join(directory, "slots.npy"), slots)
+    with open(os.path.join(directory, "docstore.json"), "w") as f:
+        json.dump({"ids": list(ids), "metadata": interner._metadata}, f)
+
+class MappedDocstore(Docstore):
+    """
+    Read-only docstore over files written by write_docstore().
+
+    The text and arrays are memory-mapped, so every process that opens the
+    same files shares one copy through the OS page cache.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "docstore.json")) as f:
+            manifest = json.load(f)
+        self.ids = manifest["ids"]
+        self._metadata = manifest["metadata"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+        self._offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self._lengths = np.load(os.path.join(directory, "lengths.npy"), mmap_mode="r")
+        self._slots = np.load(os.path.join(directory, "slots.npy"), mmap_mode="r")
+
+        text_path = os.path.join(directory, "text.bin")
+        if os.path.getsize(text_path):
+            with open(text_path, "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._text = b""  # mmap cannot map an empty file
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Return the document with this id, or a message string if it is missing."""
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+
+        offset, length = int(self._offsets[row]), int(self._lengths[row])
+        return Document(
+            id=search,
+            page_content=self._text[offset:offset + length].decode("utf-8"),
+            metadata=dict(self._metadata[int(self._slots[row])]),
+        )
+
+    def memory_bytes(self):
+        """Approximate memory of the mapped files plus this process's id map and metadata."""
+        mapped = len(self._text) + self._offsets.nbytes + self._lengths.nbytes + self._slots.nbytes
+        private = sys.getsizeof(self._rows) + sum(sys.getsizeof(doc_id) for doc_id in self.ids)
+        return mapped + private + sum(sys.getsizeof(m) for m in self._metadata)
@@ -0,0 +1,112 @@
+# modules/course_store.py
+
+import hmac
+import os
+import threading
+from types import MappingProxyType
+from modules.answer_cache import get_answer_cache
+from modules.knowledge_base import KnowledgeBase, ReadOnlyKnowledgeBase
+from modules.tabular_analyzer import TabularAnalyzer
+
+# Course joined by new sessions; an empty value gives each session a private knowledge base
+DEFAULT_COURSE = os.getenv("TARA_DEFAULT_COURSE", "")
+# Passcode professors need to change course materials; if unset, the first professor to open a course chooses it
+PROFESSOR_PASSCODE = os.getenv("TARA_PROFESSOR_PASSCODE", "")
+
+class Course:
+    """
+    Materials shared by every session in one course.
+
+    Professor sessions write to the knowledge base and tabular analyzer
+    through writer(), which checks the course's professor passcode; student
+    sessions read them through reader() and files(). Each session keeps only
+    its own conversation memory.
+    """
+
+    def __init__(self, course_id, passcode=PROFESSOR_PASSCODE):
+        self.course_id = course_id
+        self.knowledge_base = KnowledgeBase()
+        self.tabular_analyzer = TabularAnalyzer()
+        self.processed_files = {}  # content hash -> file name
+        self.lock = threading.RLock()  # Serializes resets by professors
+        self._passcode = passcode or None
+
+    def reader(self):
+        """Return a read-only view of this course's knowledge base."""
+        return ReadOnlyKnowledgeBase(self.knowledge_base)
+
+    def writer(self, passcode):
+        """
+        Return the course's knowledge base itself, for professors.
+
+        Args:
+            passcode: The course's professor passcode; the first professor to
+                open a course without a configured passcode sets it
+
+        Returns:
+            The course's KnowledgeBase
+
+        Raises:
+            PermissionError: If the passcode is missing or wrong
+        """
+        self.check_passcode(passcode)
+        return self.knowledge_base
+
+    def files(self, writable=False):
+        """Return the course's processed files (content hash -> file name), read-only unless writable."""
+        return self.processed_files if writable else MappingProxyType(self.processed_files)
+
+    def check_passcode(self, passcode):
+        """Raise PermissionError unless passcode is the course's professor passcode."""
+        if not passcode:
+            raise PermissionError(f"A professor passcode is required to change {self.course_id}")
+        with self.lock:
+            if self._passcode is None:
+                self._passcode = passcode
+            elif not hmac.compare_digest(passcode.encode(), self._passcode.encode()):
+                raise PermissionError(f"Wrong professor passcode for {self.course_id}")
+
+    def reset(self, passcode):
+        """
+        Drop every document from the course.
+
+        Documents are removed from the existing knowledge base rather than
+        replacing it, so conversations already open on it stay valid.
+
+        Raises:
+            PermissionError: If passcode is not the course's professor passcode
+        """
+        self.check_passcode(passcode)
+        with self.lock:
+            for source_key in list(self.knowledge_base.sources):
+                self.knowledge_base.remove(source_key)
+            get_answer_cache().invalidate(self.knowledge_base.kb_id)
+            self.tabular_analyzer.clear()
+            self.processed_files.clear()
+
+# Process-wide courses, keyed by course id
+_courses = {}
+_courses_lock = threading.Lock()
+
+def get_course(course_id):
+    """
+    Get the shared materials for a course, creating an empty course on first use.
+
+    Args:
+        course_id: Course identifier, e.g. "CS-101"
+
+    Returns:
+        Course shared by every session in this process
+    """
+    course_id = course_id.strip()
+    with _courses_lock:
+        course = _courses.get(course_id)
+        if course is None:
+            course = Course(course_id)
+            _courses[course_id] = course
+        return course
+
+def list_courses():
+    """Return the ids of every course with materials in this process."""
+    with _courses_lock:
+        return sorted(course_id for course_id, course in _courses.items() if course.processed_files)
@@ -0,0 +1,10 @@
+# modules/cpu_budget.py
+
+import os
+
+# Cores the app's worker pools may use together (override with TARA_CPU_BUDGET).
+# Embedding and PDF extraction run at the same time during ingestion, so the
+# budget is split between them instead of each pool sizing itself to the machine.
+CPU_BUDGET = max(1, int(os.getenv("TARA_CPU_BUDGET", str(os.cpu_count() or 1))))
+EMBED_CPUS = max(1, CPU_BUDGET // 2)  # Embedding worker processes x torch threads per worker
+EXTRACT_CPUS = max(1, CPU_BUDGET - EMBED_CPUS)  # PDF extraction worker processes
@@ -0,0 +1,176 @@
+# modules/dataframe_loader.py
+
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+from pandas.tseries.api import guess_datetime_format
+
+# Loading settings (override with environment variables)
+TABULAR_DTYPES = os.getenv("TARA_TABULAR_DTYPES", "compact")  # "compact", "arrow" or "default"
+CHUNK_ROWS = int(os.getenv("TARA_TABULAR_CHUNK_ROWS", "100000"))
+CATEGORY_MAX_RATIO = 0.5  # Text columns with at most this share of distinct values become categoricals
+DATE_SAMPLE_ROWS = 200  # Values used to guess a text column's date format
+
+def read_table(stream, file_extension, mode=TABULAR_DTYPES):
+    """
+    Read a CSV or Excel file into a DataFrame with compact column types.
+
+    CSV files are read CHUNK_ROWS rows at a time and each chunk is compacted
+    before the next is read, so the full default-typed frame never exists.
+    Column decisions are made once, on the first chunk: repetitive text
+    columns become categoricals and date columns get a fixed format. Dates
+    are parsed once the chunks are combined, and only if every value
+    matches the format. Floats are downcast after the chunks are combined.
+    "arrow" mode additionally reads into Arrow-backed dtypes.
+
+    Args:
+        stream: Binary stream over the file
+        file_extension: ".csv", ".xlsx" or ".xls"
+        mode: "compact", "arrow" or "default" (plain pandas types)
+
+    Returns:
+        Tuple of (DataFrame, memory report), where the report has the
+        "before" size of the rows as parsed and the "after" size, in bytes
+    """
+    options = {"dtype_backend": "pyarrow"} if mode == "arrow" else {}
+    if file_extension == ".csv":
+        chunks = pd.read_csv(stream, chunksize=CHUNK_ROWS, **options) if mode != "default" else [pd.read_csv(stream)]
+    else:
+        # Excel has no chunked reader; the sheet is compacted after it is parsed
+        chunks = [pd.read_excel(stream, **options)]
+
+    return compact_chunks(chunks, mode)
+
+def compact_chunks(chunks, mode=TABULAR_DTYPES):
+    """
+    Compact DataFrame chunks one at a time and combine them.
+
+    Text columns are planned on the first chunk (dates and categoricals),
+    each chunk is converted as it arrives, and dates are parsed and numbers
+    downcast once the chunks are combined.
+
+    Args:
+        chunks: Iterable of DataFrames with the same columns
+        mode: "compact" or "arrow" (both compact), or "default" to only combine the chunks
+
+    Returns:
+        Tuple of (DataFrame, memory report) as for read_table()
+    """
+    if mode == "default":
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else (frames[0] if frames else pd.DataFrame())
+        size = _memory_bytes(df)
+        return df, {"before": size, "after": size}
+
+    frames = []
+    before = 0
+    plan = None
+    for chunk in chunks:
+        before += _memory_bytes(chunk)
+        if plan is None:
+            plan = _plan_columns(chunk)
+        frames.append(_apply_plan(chunk, plan))
+
+    df = _concat(frames, plan["categories"] + list(plan["dates"])) if frames else pd.DataFrame()
+    df = _parse_dates(df, plan["dates"]) if frames else df
+    df = downcast_numbers(df)
+    return df, {"before": before, "after": _memory_bytes(df)}
+
+def downcast_numbers(df):
+    """
+    Shrink float columns without changing any value.
+
+    Floats become float32 only if every value survives the round trip
+    exactly. Integers keep 64 bits: arithmetic in generated expressions
+    (enrolled * fee) would silently wrap around in a narrower type.
+    """
+    for column in df.columns:
+        series = df[column]
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series) or series.empty:
+            continue
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and not isinstance(series.dtype, pd.ArrowDtype):
+            continue  # Nullable and other extension types are left as they are
+        target = None
+        if pd.api.types.is_float_dtype(series) and series.dtype.itemsize > 4:
+            narrow = series.astype(np.float32 if not isinstance(series.dtype, pd.ArrowDtype) else "float32[pyarrow]")
+            if ((narrow.astype(series.dtype) == series) | series.isna()).all():
+                target = np.dtype(np.float32)
+        if target is not None and target.itemsize < series.dtype.itemsize:
+            df[column] = series.astype(pd.ArrowDtype(pa.from_numpy_dtype(target)) if isinstance(series.dtype, pd.ArrowDtype) else target)
+    return df
+
+def _memory_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def _is_text(series):
+    return not isinstance(series.dtype, pd.CategoricalDtype) and (
+        pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+    )
+
+def _plan_columns(chunk):
+    """Decide from the first chunk which text columns hold dates (and in which format) and which become categoricals."""
+    dates, categories = {}, []
+    for column in chunk.columns:
+        series = chunk[column]
+        if not _is_text(series):
+            continue
+        values = series.dropna()
+        if values.empty:
+            continue
+        sample = values.head(DATE_SAMPLE_ROWS).astype(str)
+        date_format = guess_datetime_format(sample.iloc[0])
+        if date_format and pd.to_datetime(sample, format=date_format, errors="coerce").notna().all():
+            dates[column] = date_format
+        elif values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            categories.append(column)
+    return {"dates": dates, "categories": categories}
+
+def _apply_plan(chunk, plan):
+    # Date columns are held as categoricals too, and parsed once every chunk has been seen
+    for column in plan["categories"] + list(plan["dates"]):
+        if column in chunk.columns:
+            chunk[column] = chunk[column].astype("category")
+    return chunk
+
+def _parse_dates(df, dates):
+    """
+    Parse the planned date columns of the combined frame.
+
+    Each distinct value is parsed once with the column's format. If any value
+    does not match it (e.g. "Jan 5 2024" in a column of "2024-01-05"), the
+    column is left as text rather than silently turning that value into NaT.
+    """
+    for column, date_format in dates.items():
+        series = df[column]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            continue  # A later chunk parsed the column as another type
+        categories = series.cat.categories
+        parsed = pd.to_datetime(categories.astype(str), format=date_format, errors="coerce")
+        if parsed.isna().any():
+            if len(categories) > CATEGORY_MAX_RATIO * series.count():
+                df[column] = series.astype(categories.dtype)
+            continue
+        df[column] = parsed.take(series.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT)
+    return df
+
+def _concat(frames, category_columns):
+    """Concatenate chunks, merging each categorical column's categories instead of falling back to object."""
+    if len(frames) == 1:
+        return frames[0]
+    merged = {}
+    for column in category_columns:
+        try:
+            merged[column] = union_categoricals([frame[column] for frame in frames], ignore_order=True)
+        except TypeError:
+            # A later chunk parsed the column as another type; keep it as plain values
+            merged[column] = None
+    df = pd.concat(
+        [frame.drop(columns=[c for c in merged if merged[c] is not None]) for frame in frames],
+        ignore_index=True,
+    )
+    for column, values in merged.items():
+        if values is not None:
+            df[column] = values
+    return df[frames[0].columns]
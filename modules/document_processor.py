@@ -1,74 +1,155 @@
 # modules/document_processor.py
 
+import itertools
 import os
-from modules.pdf_processor import process_pdf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.pdf_processor import process_pdf, build_pdf_vectorstore, attach_to_conversation
+from modules.embeddings import get_embeddings
+from modules.embedding_pipeline import embed_stream
+from modules.upload_store import open_upload
+from modules.tabular_processor import build_table_documents, build_workbook_document, iter_row_documents
 import streamlit as st
 
-def process_document(uploaded_file, add_to_existing=False, existing_conversation=None):
+# Number of files extracted and embedded concurrently in a batch
+INGEST_WORKERS = int(os.getenv("TARA_INGEST_WORKERS", "4"))
+
+def process_document(uploaded_file, add_to_existing=False, existing_conversation=None, on_ready=None, upload_session=None):
     """
     Process any supported document type (PDF, CSV, Excel).
-    
+
     Args:
         uploaded_file: The uploaded file object
         add_to_existing: Whether to add to existing conversation
         existing_conversation: The existing conversation object
-        
+        on_ready: Called with a new conversation as soon as part of a PDF is searchable
+        upload_session: UploadSession that owns spooled copies of large uploads
+
     Returns:
         ConversationalRetrievalChain object or None if processing fails
     """
     file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-    
+
     if file_extension == '.pdf':
         # Process PDF with existing PDF processor
         if add_to_existing and existing_conversation:
-            return process_pdf(uploaded_file, add_to_existing=True, existing_conversation=existing_conversation)
+            return process_pdf(uploaded_file, add_to_existing=True, existing_conversation=existing_conversation,
+                               upload_session=upload_session)
         else:
-            return process_pdf(uploaded_file)
-    
+            return process_pdf(uploaded_file, on_ready=on_ready, upload_session=upload_session)
+
     elif file_extension in ['.csv', '.xlsx', '.xls']:
         # Load tabular file into the analyzer
         try:
             # Load file into tabular analyzer
-            st.session_state.tabular_analyzer.load_file(uploaded_file)
-            
-            # If this is the first document, create a conversation chain
-            if not add_to_existing or existing_conversation is None:
-                # Create minimal vectorstore for interacting with non-analysis questions
-                from langchain.schema import Document
-                from langchain_community.vectorstores import FAISS
-                from langchain_community.embeddings import HuggingFaceEmbeddings
-                from langchain.memory import ConversationBufferMemory
-                from langchain_community.llms import Ollama
-                from langchain.chains import ConversationalRetrievalChain
-                
-                # Create a simple document about the file
-                doc = Document(
-                    page_content=f"This is a tabular data file named {uploaded_file.name}. Use data analysis techniques to query its contents.",
-                    metadata={"source": uploaded_file.name, "type": "tabular"}
-                )
-                
-                # Create embeddings and vectorstore
-                embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-                vector_store = FAISS.from_documents([doc], embeddings)
-                
-                # Create conversation chain
-                memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-                llm = Ollama(model="gemma3:4b", temperature=0.5)
-                
-                return ConversationalRetrievalChain.from_llm(
-                    llm=llm,
-                    retriever=vector_store.as_retriever(search_kwargs={"k": 1}),
-                    memory=memory,
-                    verbose=False
-                )
-            else:
-                # Just return the existing conversation
-                return existing_conversation
-                
+            with open_upload(uploaded_file, upload_session) as upload:
+                st.session_state.tabular_analyzer.load_file(uploaded_file, upload_session=upload_session)
+                file_hash = upload.file_hash
+
+            # Add a minimal description of the file for non-analysis questions,
+            # creating a conversation chain if this is the first document
+            return attach_to_conversation(
+                _build_tabular_vectorstore(uploaded_file.name, file_hash, st.session_state.tabular_analyzer),
+                existing_conversation if add_to_existing else None,
+                file_hash,
+                uploaded_file.name
+            )
+
         except Exception as e:
             st.error(f"Error processing tabular file: {e}")
             return None
-    
+
     else:
         # Unsupported file type
-        raise ValueError(f"Unsupported file extension: {file_extension}")
\ No newline at end of file
+        raise ValueError(f"Unsupported file extension: {file_extension}")
+
+def build_document_index(uploaded_file, tabular_analyzer, upload_session=None):
+    """
+    Extract and embed one file into its own vectorstore without touching Streamlit.
+
+    Safe to run in a worker thread; tabular files are also loaded into the
+    given analyzer.
+
+    Args:
+        uploaded_file: The uploaded file object
+        tabular_analyzer: TabularAnalyzer that receives CSV/Excel data
+        upload_session: UploadSession that owns spooled copies of large uploads
+
+    Returns:
+        Tuple of (vector_store, file_hash) for the file's chunks
+    """
+    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+    if file_extension not in ['.pdf', '.csv', '.xlsx', '.xls']:
+        raise ValueError(f"Unsupported file extension: {file_extension}")
+
+    with open_upload(uploaded_file, upload_session) as upload:
+        if file_extension == '.pdf':
+            vector_store, _ = build_pdf_vectorstore(upload)
+        else:
+            tabular_analyzer.load_file(uploaded_file, upload_session=upload_session)
+            vector_store = _build_tabular_vectorstore(uploaded_file.name, upload.file_hash, tabular_analyzer)
+        return vector_store, upload.file_hash
+
+def process_documents(uploaded_files, tabular_analyzer, existing_conversation=None, on_file_done=None, upload_session=None):
+    """
+    Process a batch of files concurrently and merge them into the knowledge base in one step.
+
+    Files are extracted and embedded on a pool of INGEST_WORKERS threads (each
+    PDF's embedding batches also use the shared embedding worker pool). Their
+    per-file vectorstores are added to the knowledge base once every file
+    has finished.
+
+    Args:
+        uploaded_files: List of uploaded file objects
+        tabular_analyzer: TabularAnalyzer that receives CSV/Excel data
+        existing_conversation: The existing conversation object, or None
+        on_file_done: Called as on_file_done(file_name, error) in the calling
+            thread as each file finishes; error is None on success
+        upload_session: UploadSession that owns spooled copies of large uploads
+
+    Returns:
+        ConversationalRetrievalChain over the merged knowledge base, or the
+        existing conversation (possibly None) if no file succeeded
+    """
+    indexed = []  # (vector_store, file_hash, file_name)
+
+    with ThreadPoolExecutor(max_workers=max(1, INGEST_WORKERS)) as pool:
+        futures = {
+            pool.submit(build_document_index, uploaded_file, tabular_analyzer, upload_session): uploaded_file.name
+            for uploaded_file in uploaded_files
+        }
+
+        for future in as_completed(futures):
+            file_name = futures[future]
+            try:
+                vector_store, file_hash = future.result()
+                indexed.append((vector_store, file_hash, file_name))
+                error = None
+            except Exception as e:
+                error = e
+            if on_file_done:
+                on_file_done(file_name, error)
+
+    # Add every file's index to the knowledge base, tracked per source
+    conversation = existing_conversation
+    for vector_store, file_hash, file_name in indexed:
+        conversation = attach_to_conversation(vector_store, conversation, file_hash, file_name)
+    return conversation
+
+def _build_tabular_vectorstore(file_name, file_hash, tabular_analyzer):
+    """Create a vectorstore describing a loaded table (or workbook), its columns and its rows for non-analysis questions."""
+    documents = []
+    workbook = tabular_analyzer.workbooks.get(file_name)
+    if workbook is not None and len(workbook.sheet_names) > 1:
+        documents.append(build_workbook_document(file_name, workbook.sheet_names, file_hash))
+    tables = tabular_analyzer.tables()
+    for table_name in tabular_analyzer.table_names(file_name):
+        table = tables[table_name]
+        documents = itertools.chain(
+            documents,
+            build_table_documents(table_name, table, tabular_analyzer.profile(table_name), file_hash),
+            iter_row_documents(table_name, table, file_hash),
+        )
+
+    # Row chunks are generated and embedded window by window with the shared embedding model
+    vector_store, _ = embed_stream(documents, get_embeddings())
+    return vector_store
@@ -0,0 +1,170 @@
+# modules/embedding_pipeline.py
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from langchain_community.vectorstores import FAISS
+from modules.cpu_budget import EMBED_CPUS
+from modules.embeddings import get_embeddings
+from modules import metrics
+
+# Tuning knobs (override per host with environment variables)
+EMBED_BATCH_SIZE = int(os.getenv("TARA_EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("TARA_EMBED_WORKERS", str(EMBED_CPUS)))
+# "process" embeds batches on worker processes; "inline" embeds them one by one
+# in the calling thread (torch still parallelizes each batch across its threads)
+EMBED_EXECUTOR = os.getenv("TARA_EMBED_EXECUTOR", "process")
+
+# Below this many batches the pool overhead outweighs the parallel speedup
+MIN_PARALLEL_BATCHES = 2
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+def _init_worker(torch_threads):
+    """Keep each worker process from oversubscribing the CPU with its own thread pool."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+def _embed_batch(model_name, texts):
+    # Runs inside a worker process; the model is loaded once per worker
+    return get_embeddings(model_name).embed_documents(texts)
+
+def _get_pool(workers):
+    """Get the long-lived worker pool so worker processes keep their loaded model between calls."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # Workers share the embedding part of the CPU budget, so together
+            # with PDF extraction they never ask for more cores than there are
+            torch_threads = max(1, EMBED_CPUS // workers)
+            # Spawn rather than fork: the Streamlit server is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(torch_threads,),
+            )
+            _pool_workers = workers
+        return _pool
+
+def _make_batches(documents, batch_size):
+    """Sort chunks by length so each batch pads to a similar size, then slice into batches."""
+    order = sorted(range(len(documents)), key=lambda i: len(documents[i].page_content))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def embed_into_vectorstore(documents, embeddings, vector_store=None, batch_size=None, workers=None, executor=None):
+    """
+    Embed document chunks in length-sorted batches and add the vectors to a FAISS index.
+
+    Batches are written into the index as soon as they finish, so no second
+    pass over the chunks is needed.
+
+    Args:
+        documents: List of Document chunks to embed
+        embeddings: Embedding model (SharedEmbeddings for multi-process runs)
+        vector_store: Existing FAISS vectorstore to add to, or None to create one
+        batch_size: Chunks per batch (defaults to TARA_EMBED_BATCH_SIZE)
+        workers: Number of parallel workers (defaults to TARA_EMBED_WORKERS)
+        executor: "process" or "inline" (defaults to TARA_EMBED_EXECUTOR)
+
+    Returns:
+        Tuple of (vector_store, stats) where stats has chunks, seconds and chunks_per_sec
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    workers = workers or EMBED_WORKERS
+    executor = executor or EMBED_EXECUTOR
+    model_name = getattr(embeddings, "model_name", None)
+
+    start = time.perf_counter()
+    batches = _make_batches(documents, batch_size)
+
+    def add_batch(vector_store, batch, vectors):
+        texts = [documents[i].page_content for i in batch]
+        metadatas = [documents[i].metadata for i in batch]
+        text_embeddings = list(zip(texts, vectors))
+        if vector_store is None:
+            return FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+        vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+        return vector_store
+
+    # Only registry models can be re-created inside worker processes. Threads
+    # are no alternative: the shared model serializes calls on its lock.
+    parallel = (
+        executor == "process" and model_name is not None
+        and workers > 1 and len(batches) >= MIN_PARALLEL_BATCHES
+    )
+
+    if not parallel:
+        for batch in batches:
+            vectors = embeddings.embed_documents([documents[i].page_content for i in batch])
+            vector_store = add_batch(vector_store, batch, vectors)
+    else:
+        pool = _get_pool(workers)
+        futures = {}
+        for batch in batches:
+            texts = [documents[i].page_content for i in batch]
+            futures[pool.submit(_embed_batch, model_name, texts)] = batch
+
+        for future in as_completed(futures):
+            vector_store = add_batch(vector_store, futures[future], future.result())
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "chunks": len(documents),
+        "seconds": seconds,
+        "chunks_per_sec": len(documents) / seconds if seconds > 0 else 0.0,
+    }
+    metrics.increment("embedding.chunks", len(documents))
+    metrics.observe("embedding.chunks_per_sec", stats["chunks_per_sec"])
+
+    return vector_store, stats
+
+def embed_stream(documents, embeddings, vector_store=None, window_size=None):
+    """
+    Embed documents from an iterator, window by window, into one FAISS index.
+
+    Only window_size documents are held before they are embedded, so
+    generators over large sources (e.g. the rows of a big table) never
+    have to be materialized.
+
+    Args:
+        documents: Iterable of Document chunks
+        embeddings: Embedding model
+        vector_store: Existing FAISS vectorstore to add to, or None to create one
+        window_size: Documents per window (defaults to 8 embedding batches)
+
+    Returns:
+        Tuple of (vector_store, stats) where stats has chunks, seconds and chunks_per_sec;
+        vector_store is None if the iterator was empty
+    """
+    window_size = window_size or EMBED_BATCH_SIZE * 8
+    start = time.perf_counter()
+    chunks = 0
+    window = []
+
+    for document in documents:
+        window.append(document)
+        if len(window) >= window_size:
+            vector_store, _ = embed_into_vectorstore(window, embeddings, vector_store=vector_store)
+            chunks += len(window)
+            window = []
+    if window:
+        vector_store, _ = embed_into_vectorstore(window, embeddings, vector_store=vector_store)
+        chunks += len(window)
+
+    seconds = time.perf_counter() - start
+    return vector_store, {
+        "chunks": chunks,
+        "seconds": seconds,
+        "chunks_per_sec": chunks / seconds if seconds > 0 else 0.0,
+    }
@@ -0,0 +1,61 @@
+# modules/embeddings.py
+
+import threading
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Process-wide registry of loaded embedding models, keyed by model name
+_models = {}
+_registry_lock = threading.Lock()
+
+class SharedEmbeddings(Embeddings):
+    """
+    Thread-safe wrapper around one loaded embedding model.
+
+    The HuggingFace tokenizer is not safe for concurrent calls, so requests
+    from different sessions and threads are serialized on a per-model lock.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = HuggingFaceEmbeddings(model_name=model_name)
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            return self._model.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            return self._model.embed_query(text)
+
+def get_embeddings(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Get the shared embedding model, loading it on first use.
+
+    Args:
+        model_name: Name of the sentence-transformers model
+
+    Returns:
+        SharedEmbeddings instance shared by every caller in this process
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _registry_lock:
+            # Another thread may have loaded it while we waited
+            model = _models.get(model_name)
+            if model is None:
+                model = SharedEmbeddings(model_name)
+                _models[model_name] = model
+    return model
+
+def is_loaded(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Return True if the model has already been loaded in this process."""
+    return model_name in _models
+
+def warm_up(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Load the model and run one query so the first real request pays no startup cost."""
+    if not is_loaded(model_name):
+        get_embeddings(model_name).embed_query("warm up")
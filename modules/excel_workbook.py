@@ -0,0 +1,198 @@
+# modules/excel_workbook.py
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from modules.dataframe_loader import CHUNK_ROWS, TABULAR_DTYPES, compact_chunks
+from modules.table_store import ROW_GROUP_ROWS, TABLE_STORE_DIR, ParquetTable
+
+class ExcelWorkbook:
+    """
+    An uploaded workbook whose sheets are parsed one at a time, on demand.
+
+    Opening a workbook only lists its sheets. A sheet is parsed the first
+    time it is needed, streaming its rows in openpyxl's read-only mode, and
+    the parsed sheet is saved as Parquet in the table store. Later loads of
+    the same workbook (in any session) read the sheet list and sheets from
+    there and never open the Excel file again.
+
+    Attributes:
+        name: Uploaded file name
+        file_hash: Content hash of the upload
+        sheet_names: Sheet names in workbook order
+        out_of_core: Whether sheets are kept on disk as ParquetTables instead of DataFrames
+    """
+
+    def __init__(self, upload, out_of_core=False):
+        self.name = upload.name
+        self.file_hash = upload.file_hash
+        self.suffix = upload.suffix
+        self.out_of_core = out_of_core
+        os.makedirs(TABLE_STORE_DIR, exist_ok=True)
+        self.path = os.path.join(TABLE_STORE_DIR, f"{self.file_hash}{self.suffix}")
+        self._store_copy(upload)
+        self.sheet_names = self._list_sheets()
+
+    def table_name(self, sheet):
+        """Name a sheet's table: the file name for single-sheet workbooks, else "file.xlsx [Sheet]"."""
+        return self.name if len(self.sheet_names) == 1 else f"{self.name} [{sheet}]"
+
+    def sheets_mentioned(self, text):
+        """Return the sheets whose names appear in a question."""
+        text = _normalize(text)
+        return [sheet for sheet in self.sheet_names if re.search(rf"\b{re.escape(_normalize(sheet))}\b", text)]
+
+    def load_sheet(self, sheet):
+        """
+        Get one sheet as a table, parsing it only if it is not cached yet.
+
+        Args:
+            sheet: Sheet name
+
+        Returns:
+            Tuple of (DataFrame or ParquetTable, memory report); the report is
+            None when the sheet came from the Parquet cache
+        """
+        path = self._sheet_path(sheet)
+        report = None
+        df = None
+        if not os.path.exists(path):
+            df, report = compact_chunks(self._iter_sheet_frames(sheet))
+            # Formatted but empty columns show up as unnamed columns without values
+            df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed: ") and df[c].isna().all()])
+            df = _write_parquet(df, path)
+
+        if self.out_of_core:
+            return ParquetTable(path, self.table_name(sheet)), report
+        return (df if df is not None else pd.read_parquet(path)), report
+
+    def _store_copy(self, upload):
+        """Keep the workbook in the table store so sheets can still be parsed after the upload is gone."""
+        if os.path.exists(self.path):
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=TABLE_STORE_DIR, suffix=f"{self.suffix}.tmp")
+        with os.fdopen(fd, "wb") as target, upload.open() as source:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, self.path)
+
+    def _sheets_path(self):
+        return os.path.join(TABLE_STORE_DIR, f"{self.file_hash}.sheets.json")
+
+    def _sheet_path(self, sheet):
+        sheet_key = hashlib.sha256(sheet.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(TABLE_STORE_DIR, f"{self.file_hash}-{sheet_key}-{TABULAR_DTYPES}.parquet")
+
+    def _list_sheets(self):
+        try:
+            with open(self._sheets_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if self.suffix == ".xlsx":
+            from openpyxl import load_workbook
+            # Read-only mode reads the workbook index without parsing any sheet
+            workbook = load_workbook(self.path, read_only=True)
+            try:
+                names = list(workbook.sheetnames)
+            finally:
+                workbook.close()
+        else:
+            with pd.ExcelFile(self.path) as workbook:
+                names = list(workbook.sheet_names)
+
+        with open(self._sheets_path(), "w") as f:
+            json.dump(names, f)
+        return names
+
+    def _iter_sheet_frames(self, sheet):
+        """Yield a sheet as DataFrames of CHUNK_ROWS rows, with the first row as the header."""
+        if self.suffix != ".xlsx":
+            # .xls files have no streaming reader; pandas parses the one sheet
+            yield _arrow_dtypes(pd.read_excel(self.path, sheet_name=sheet))
+            return
+
+        from openpyxl import load_workbook
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                yield pd.DataFrame()
+                return
+            columns = _column_names(header)
+
+            chunk = []
+            emitted = False
+            for row in rows:
+                # Skip blank rows (read-only mode also reports formatted but empty rows)
+                if all(value is None for value in row):
+                    continue
+                chunk.append(row[:len(columns)] + (None,) * (len(columns) - len(row)))
+                if len(chunk) >= CHUNK_ROWS:
+                    yield _arrow_dtypes(_frame(chunk, columns))
+                    chunk = []
+                    emitted = True
+            if chunk or not emitted:
+                yield _arrow_dtypes(_frame(chunk, columns))
+        finally:
+            workbook.close()
+
+def _normalize(text):
+    return re.sub(r"[_\-]+", " ", str(text).lower()).strip()
+
+def _column_names(header):
+    """Name columns the way pandas.read_excel does: "Unnamed: i" for blanks, ".1" suffixes for repeats."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _write_parquet(df, path):
+    """
+    Write a sheet to the table store atomically, so concurrent sessions never read a partial file.
+
+    Returns:
+        The DataFrame as stored (columns mixing numbers and text become text)
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        mixed = [
+            c for c in df.columns
+            if pd.api.types.is_object_dtype(df[c])
+            or (isinstance(df[c].dtype, pd.CategoricalDtype) and pd.api.types.is_object_dtype(df[c].cat.categories))
+        ]
+        df = df.astype({c: "string" for c in mixed})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+    fd, tmp_path = tempfile.mkstemp(dir=TABLE_STORE_DIR, suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return df
+
+def _frame(rows, columns):
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    # Let pandas infer numeric and date columns as read_excel would
+    return df.infer_objects()
+
+def _arrow_dtypes(df):
+    return df.convert_dtypes(dtype_backend="pyarrow") if TABULAR_DTYPES == "arrow" else df
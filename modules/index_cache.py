@@ -0,0 +1,122 @@
+# modules/index_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from langchain_community.vectorstores import FAISS
+
+# Location of the on-disk index cache (override with TARA_INDEX_CACHE_DIR)
+CACHE_DIR = os.getenv(
+    "TARA_INDEX_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tara", "indexes"),
+)
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of a file's raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def cache_key(file_hash, **params):
+    """
+    Build a cache key from a file's content hash and the parameters used to index it.
+
+    Args:
+        file_hash: Content hash of the source file
+        **params: Chunking and embedding parameters (chunk_size, embedding_model, ...)
+
+    Returns:
+        Hex digest identifying this exact (content, parameters) combination
+    """
+    payload = json.dumps({"content": file_hash, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key)
+
+class IndexCacheWriter:
+    """
+    Write a cache entry part by part, so a document never has to be held in memory whole.
+
+    Each part is saved to a temporary directory as it is appended; the entry
+    only appears, atomically, on commit(). Entries written this way load
+    exactly like those from save_vectorstore().
+    """
+
+    def __init__(self, key):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.key = key
+        self.tmp_path = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+        self.parts = 0
+
+    def append(self, vector_store):
+        """Save the next part of the document."""
+        vector_store.save_local(os.path.join(self.tmp_path, f"part-{self.parts:05d}"))
+        self.parts += 1
+
+    def commit(self):
+        """Publish the entry."""
+        try:
+            os.replace(self.tmp_path, _entry_path(self.key))
+        except OSError:
+            # Another process stored the same entry first; keep theirs
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+        self.tmp_path = None
+
+    def abort(self):
+        """Discard the parts written so far (does nothing after commit())."""
+        if self.tmp_path is not None:
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+            self.tmp_path = None
+
+def load_cached_vectorstore(key, embeddings, source_name=None):
+    """
+    Load a previously indexed document from the cache.
+
+    Args:
+        key: Cache key from cache_key()
+        embeddings: Embedding model used for future queries against the store
+        source_name: If given, rewrite each chunk's "source" metadata to this name
+
+    Returns:
+        FAISS vectorstore with the saved chunks and vectors, or None on a miss
+    """
+    path = _entry_path(key)
+    if not os.path.isdir(path):
+        return None
+
+    try:
+        # The pickles were written by this app, so deserializing them is safe
+        parts = sorted(name for name in os.listdir(path) if name.startswith("part-"))
+        if not parts:
+            vector_store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        else:
+            # Written by IndexCacheWriter
+            vector_store = None
+            for part in parts:
+                part_store = FAISS.load_local(os.path.join(path, part), embeddings, allow_dangerous_deserialization=True)
+                if vector_store is None:
+                    vector_store = part_store
+                else:
+                    vector_store.merge_from(part_store)
+    except Exception:
+        # Treat unreadable entries as a miss; they get overwritten on save
+        return None
+
+    if source_name:
+        for doc in vector_store.docstore._dict.values():
+            doc.metadata["source"] = source_name
+
+    return vector_store
+
+def save_vectorstore(key, vector_store):
+    """Write a vectorstore to the cache atomically so readers never see partial entries."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+
+    try:
+        vector_store.save_local(tmp_path)
+        os.replace(tmp_path, _entry_path(key))
+    except OSError:
+        # Another process stored the same entry first; keep theirs
+        shutil.rmtree(tmp_path, ignore_errors=True)
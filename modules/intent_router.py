@@ -0,0 +1,236 @@
+# modules/intent_router.py
+
+import os
+import re
+import threading
+from collections import namedtuple
+import numpy as np
+from modules.embeddings import DEFAULT_EMBEDDING_MODEL, get_embeddings, is_loaded
+from modules import metrics
+
+# Router settings (override with environment variables)
+ROUTER_CLASSIFIER = os.getenv("TARA_ROUTER_CLASSIFIER", "1") == "1"  # Consult the embedding classifier when rules are unsure
+ROUTER_RULE_CONFIDENCE = float(os.getenv("TARA_ROUTER_RULE_CONFIDENCE", "0.8"))  # Below this the classifier is asked
+
+ANALYSIS = "analysis"  # Computed from the loaded tables
+DOCUMENTS = "documents"  # Answered from the knowledge base
+
+Route = namedtuple("Route", ["intent", "confidence", "source"])
+
+_VERBS = r"(?:analy[sz]e|calculate|compute|count|summari[sz]e|plot|chart|graph|compare|find|get|show|list|give me)"
+_METRICS = (
+    r"(?:average|mean|median|mode|sum|total|minimum|maximum|min|max|count|frequency|percentage|percent|"
+    r"growth|trend|distribution|correlation|variance|standard deviation|number|ratio)s?"
+)
+_EXTREMES = r"(?:highest|lowest|greatest|smallest|largest|most|least|top|bottom|best|worst)"
+
+# (intent, weight, patterns): a question scores the highest weight it matches for each intent
+RULES = [
+    (ANALYSIS, 0.95, [
+        r"calculate", r"compute", r"analy[sz]e (?:the |this |my |our )?data", r"run (?:an |the )?analysis",
+        r"plot", r"(?:bar|pie|line) charts?", r"histograms?", r"visuali[sz](?:e|ation)",
+        r"standard deviation", r"variance", r"correlat(?:e|ion)", r"percentages?",
+        r"average", r"median", r"sum of", r"totals? (?:of|for|per|by)", r"(?:mean|count) (?:of|for|per|by|across)",
+        r"(?:group|filter|sort|order)(?:ed)? by", r"pivot", r"how many (?:rows|entries|records|data points)",
+    ]),
+    (ANALYSIS, 0.9, [
+        rf"{_VERBS} (?:the |a |an )?{_METRICS}",
+        rf"{_EXTREMES} \d+",
+        rf"{_EXTREMES} {_METRICS}",
+        r"(?:average|mean|total) \w+ (?:of|for|per|by|across)", r"(?:ratio|proportion) of",
+    ]),
+    (ANALYSIS, 0.7, [
+        r"how many", r"number of", r"charts?", r"graphs?", r"statistics", r"metrics", r"trends?",
+        r"maximum", r"minimum", r"distribution", rf"{_EXTREMES}\b.*\b{_METRICS}", r"rank(?:ed|ing)?",
+        rf"(?:which|who|what) (?:\w+ )?(?:has|had|got|scored|is|was|were) the {_EXTREMES}",
+        r"(?:this|the|my|our) (?:data|dataset|spreadsheet|table|csv|excel|sheet|gradebook)",
+    ]),
+    (DOCUMENTS, 0.85, [
+        r"explain", r"define", r"definition", r"what does .* mean", r"meaning of", r"describe",
+        r"according to (?:the )?(?:lecture|notes|book|textbook|slides|paper|reading)",
+        r"(?:in|from) (?:the )?(?:lecture|notes|book|textbook|slides|chapter|paper|reading)s?",
+        r"summari[sz]e (?:the )?(?:chapter|lecture|paper|reading|article|section|notes|slides)",
+        r"theorem", r"proof", r"prove", r"derive", r"concept", r"why", r"formulas?",
+        # Statistics and algorithms vocabulary that names a metric without asking for one to be computed
+        r"random variables?", r"(?:normal|binomial|poisson|uniform|exponential|probability|sampling) distributions?",
+        r"(?:average|best|worst)[- ]case", r"(?:time |space )?complexity",
+    ]),
+    (DOCUMENTS, 0.6, [
+        r"what is", r"what are", r"who", r"how does", r"how do", r"example", r"chapter", r"page",
+    ]),
+]
+
+def _compile_rules(rules):
+    """Compile every rule into one alternation with a named group per (intent, weight) tier."""
+    groups = []
+    tiers = {}
+    # Highest weights first, so a stronger pattern wins when two start at the same position
+    for index, (intent, weight, patterns) in enumerate(sorted(rules, key=lambda rule: -rule[1])):
+        name = f"t{index}"
+        tiers[name] = (intent, weight)
+        groups.append(f"(?P<{name}>\\b(?:{'|'.join(patterns)})\\b)")
+    return re.compile("|".join(groups)), tiers
+
+_PATTERN, _TIERS = _compile_rules(RULES)
+
+# Weight of the strong DOCUMENTS tier (explain, define, slides, lecture, formula, ...)
+CONCEPT_WEIGHT = 0.85
+# That tier on its own: matches don't overlap, so "what is the worst case" is taken whole by an
+# analysis pattern and hides "worst case" from the single scan
+_CONCEPTS, _ = _compile_rules([rule for rule in RULES if rule[0] == DOCUMENTS and rule[1] == CONCEPT_WEIGHT])
+
+# Labelled examples for the embedding classifier (kept apart from the benchmark's evaluation set)
+CLASSIFIER_EXAMPLES = {
+    ANALYSIS: [
+        "What is the average score in the class?",
+        "Which student has the highest grade?",
+        "How many students are in section B?",
+        "Show the total sales per region",
+        "Give me the top 5 products by revenue",
+        "What percentage of students passed?",
+        "List everyone who scored below 50",
+        "Compare the midterm and final results",
+        "Which month had the most submissions?",
+        "Count the rows where attendance is missing",
+        "What's the spread of the exam marks?",
+        "Who got the best result on quiz 3?",
+    ],
+    DOCUMENTS: [
+        "Explain the central limit theorem",
+        "What is a binary search tree?",
+        "Summarize the main argument of the reading",
+        "What does the lecture say about recursion?",
+        "Can you give an example of dynamic programming?",
+        "Why does gradient descent converge?",
+        "What are the learning objectives for this week?",
+        "How does photosynthesis work?",
+        "Define entropy in information theory",
+        "What topics will be on the exam?",
+        "Help me understand the proof in chapter 2",
+        "What is the difference between TCP and UDP?",
+    ],
+}
+
+class EmbeddingIntentClassifier:
+    """
+    Nearest-neighbour intent classifier over the shared sentence embedding model.
+
+    The labelled examples are embedded once; a question is embedded and
+    compared with them by cosine similarity. The confidence is the
+    similarity-weighted share of the k nearest examples that agree.
+    """
+
+    def __init__(self, embeddings, examples=CLASSIFIER_EXAMPLES, k=5):
+        self.embeddings = embeddings
+        self.k = k
+        self.labels = [intent for intent, texts in examples.items() for _ in texts]
+        texts = [text for texts in examples.values() for text in texts]
+        self.vectors = _normalize_rows(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+
+    def classify(self, question):
+        """Return (intent, confidence) for a question."""
+        query = _normalize_rows(np.asarray([self.embeddings.embed_query(question)], dtype=np.float32))[0]
+        similarities = self.vectors @ query
+        nearest = np.argsort(-similarities)[:self.k]
+        votes = {}
+        for i in nearest:
+            votes[self.labels[i]] = votes.get(self.labels[i], 0.0) + max(float(similarities[i]), 0.0)
+        intent = max(votes, key=votes.get)
+        total = sum(votes.values())
+        return intent, votes[intent] / total if total > 0 else 0.5
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """
+    Get the shared embedding classifier, or None if it cannot be used cheaply.
+
+    The classifier only reuses an embedding model that is already loaded;
+    routing never triggers a model load.
+    """
+    global _classifier
+    if not ROUTER_CLASSIFIER or not is_loaded(DEFAULT_EMBEDDING_MODEL):
+        return None
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = EmbeddingIntentClassifier(get_embeddings(DEFAULT_EMBEDDING_MODEL))
+    return _classifier
+
+def score_rules(question, columns=()):
+    """
+    Score a question against the compiled keyword rules.
+
+    Args:
+        question: The user's question
+        columns: Column names of the loaded tables; naming one counts as evidence for analysis
+
+    Returns:
+        Dictionary of intent -> highest matched weight (0 if nothing matched)
+    """
+    text = " ".join(question.lower().split())
+    scores = {ANALYSIS: 0.0, DOCUMENTS: 0.0}
+    for match in _PATTERN.finditer(text):
+        intent, weight = _TIERS[match.lastgroup]
+        scores[intent] = max(scores[intent], weight)
+    if scores[ANALYSIS] and scores[DOCUMENTS] < CONCEPT_WEIGHT and _CONCEPTS.search(text):
+        scores[DOCUMENTS] = CONCEPT_WEIGHT
+
+    if columns:
+        named = any(
+            re.search(rf"\b{re.escape(column)}s?\b", text)
+            for column in {re.sub(r"[_\-]+", " ", str(c).lower()).strip() for c in columns}
+            if len(column) > 2
+        )
+        if named:
+            scores[ANALYSIS] = min(0.99, scores[ANALYSIS] + 0.15) if scores[ANALYSIS] >= 0.5 else 0.7
+    return scores
+
+def route_question(question, columns=(), classifier=None):
+    """
+    Decide whether a question is answered from the loaded tables or from the knowledge base.
+
+    The keyword rules are compiled into a single regular expression, so a
+    question is scanned once. When the rules are not confident (below
+    ROUTER_RULE_CONFIDENCE), the embedding classifier is consulted if the
+    embedding model is already loaded, and the more confident of the two
+    decides. A strong documents signal next to an analysis match ("explain
+    how to compute the variance") makes the rules only as sure as the
+    margin between the two, so the classifier decides those questions.
+
+    Args:
+        question: The user's question
+        columns: Column names of the loaded tables
+        classifier: Classifier to use instead of the shared one (for benchmarks)
+
+    Returns:
+        Route(intent, confidence, source) where intent is ANALYSIS or
+        DOCUMENTS and source is "rules" or "classifier"
+    """
+    scores = score_rules(question, columns)
+    if scores[ANALYSIS] >= 0.5 and scores[ANALYSIS] >= scores[DOCUMENTS]:
+        confidence = scores[ANALYSIS]
+        if scores[DOCUMENTS] >= CONCEPT_WEIGHT:
+            confidence = max(0.5, 0.5 + scores[ANALYSIS] - scores[DOCUMENTS])
+        route = Route(ANALYSIS, confidence, "rules")
+    else:
+        # With no evidence either way the knowledge base is the safer default, but not a confident one;
+        # with conflicting evidence the decision is only as sure as the margin between the two
+        confidence = max(scores[DOCUMENTS], 0.6) if scores[ANALYSIS] == 0 else max(0.5, 0.5 + scores[DOCUMENTS] - scores[ANALYSIS])
+        route = Route(DOCUMENTS, confidence, "rules")
+
+    if route.confidence < ROUTER_RULE_CONFIDENCE:
+        classifier = classifier or get_classifier()
+        if classifier is not None:
+            intent, confidence = classifier.classify(question)
+            if confidence > route.confidence:
+                route = Route(intent, confidence, "classifier")
+
+    metrics.increment(f"router.{route.intent}")
+    metrics.observe("router.confidence", route.confidence)
+    return route
@@ -0,0 +1,209 @@
+# modules/kb_snapshot.py
+
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+import faiss
+from langchain_community.vectorstores import FAISS
+from modules import metrics
+from modules.compact_docstore import MappedDocstore, write_docstore
+from modules.embeddings import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from modules.knowledge_base import KnowledgeBase, ReadOnlyKnowledgeBase
+
+# Snapshot settings (override with environment variables)
+SNAPSHOT_DIR = os.getenv(
+    "TARA_SNAPSHOT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tara", "snapshots"),
+)
+SNAPSHOT_KEEP = int(os.getenv("TARA_SNAPSHOT_KEEP", "3"))  # versions kept on disk per snapshot
+SNAPSHOT_POLL_SECONDS = float(os.getenv("TARA_SNAPSHOT_POLL_SECONDS", "5"))
+
+# Memory-map flat vector codes instead of reading them (older FAISS builds only map IVF lists)
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+_VERSION_PATTERN = re.compile(r"^v(\d{6})$")
+
+def _snapshot_path(name):
+    if not re.fullmatch(r"[\w.-]+", name) or name.startswith("."):
+        raise ValueError(f"Invalid snapshot name: {name!r}")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+def list_snapshots():
+    """Return the names of all published snapshots."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(name for name in os.listdir(SNAPSHOT_DIR) if current_version(name) is not None)
+
+def current_version(name):
+    """Return the latest published version of a snapshot, or None if it has none."""
+    try:
+        with open(os.path.join(_snapshot_path(name), "CURRENT")) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def publish_snapshot(knowledge_base, name):
+    """
+    Publish a knowledge base as a new read-only snapshot version.
+
+    The version is written to a temporary directory, moved into place and
+    then made current by atomically rewriting the CURRENT file, so readers
+    never see a partial snapshot. Older versions beyond SNAPSHOT_KEEP are
+    deleted; processes that still have them mapped keep working.
+
+    Args:
+        knowledge_base: KnowledgeBase to publish
+        name: Snapshot name (letters, digits, ".", "_" and "-")
+
+    Returns:
+        The published version number
+    """
+    path = _snapshot_path(name)
+    os.makedirs(path, exist_ok=True)
+
+    with knowledge_base._lock:
+        if knowledge_base.vectorstore is None:
+            raise ValueError("Cannot publish an empty knowledge base")
+        vector_store = knowledge_base.vectorstore
+        ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+
+        tmp_path = tempfile.mkdtemp(dir=path, prefix=".tmp-")
+        try:
+            faiss.write_index(vector_store.index, os.path.join(tmp_path, "index.faiss"))
+            write_docstore(tmp_path, ids, vector_store.docstore)
+            with open(os.path.join(tmp_path, "lexical.pkl"), "wb") as f:
+                pickle.dump(knowledge_base.lexical, f, protocol=pickle.HIGHEST_PROTOCOL)
+            manifest = {
+                "name": name,
+                "embedding_model": getattr(knowledge_base.embeddings, "model_name", DEFAULT_EMBEDDING_MODEL),
+                "compact_storage": knowledge_base.compact_storage,
+                "sources": knowledge_base.sources,
+                "published": time.time(),
+            }
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    # Claim the next free version; another process may be publishing the same name
+    version = (current_version(name) or 0) + 1
+    while True:
+        try:
+            with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+                json.dump({**manifest, "version": version}, f)
+            os.rename(tmp_path, os.path.join(path, f"v{version:06d}"))
+            break
+        except OSError:
+            if not os.path.exists(os.path.join(path, f"v{version:06d}")):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+            version += 1
+
+    current_tmp = os.path.join(path, f".CURRENT-{version}")
+    with open(current_tmp, "w") as f:
+        f.write(str(version))
+    if version > (current_version(name) or 0):
+        os.replace(current_tmp, os.path.join(path, "CURRENT"))
+    else:
+        os.remove(current_tmp)
+
+    _prune_versions(path, keep=SNAPSHOT_KEEP)
+    return version
+
+def load_snapshot(name, version=None, embeddings=None):
+    """
+    Open one snapshot version as a read-only KnowledgeBase.
+
+    The vectors and chunk text are memory-mapped; only the id map, interned
+    metadata and BM25 index are loaded into this process.
+
+    Args:
+        name: Snapshot name
+        version: Version to open, defaults to the current one
+        embeddings: Embedding model for queries; defaults to the model the snapshot was built with
+
+    Returns:
+        Read-only KnowledgeBase whose stamp is stable across processes
+    """
+    version = version or current_version(name)
+    if version is None:
+        raise FileNotFoundError(f"No published snapshot named {name!r}")
+    path = os.path.join(_snapshot_path(name), f"v{version:06d}")
+
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    embeddings = embeddings or get_embeddings(manifest["embedding_model"])
+
+    docstore = MappedDocstore(path)
+    knowledge_base = KnowledgeBase(embeddings, compact_storage=manifest["compact_storage"])
+    knowledge_base.vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=faiss.read_index(os.path.join(path, "index.faiss"), _MMAP_FLAGS),
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(docstore.ids)),
+    )
+    # The snapshot was written by this app, so unpickling it is safe
+    with open(os.path.join(path, "lexical.pkl"), "rb") as f:
+        knowledge_base.lexical = pickle.load(f)
+    knowledge_base.sources = manifest["sources"]
+    knowledge_base.kb_id = f"snapshot:{name}"
+    knowledge_base.version = version
+    knowledge_base.read_only = True
+    return knowledge_base
+
+class SnapshotKnowledgeBase(ReadOnlyKnowledgeBase):
+    """
+    Read-only view of a published snapshot that reloads new versions in place.
+
+    At most every poll_seconds, a search checks the snapshot's CURRENT file
+    and, if a newer version was published, opens it and swaps it in. Existing
+    retrievers and conversations keep working across reloads, and if a version
+    cannot be opened (for example because a later publish already pruned it)
+    the loaded one stays in use until the next check.
+    """
+
+    def __init__(self, name, embeddings=None, poll_seconds=SNAPSHOT_POLL_SECONDS):
+        super().__init__(load_snapshot(name, embeddings=embeddings))
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self._embeddings = embeddings
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the KnowledgeBase for the latest version, reloading if a newer one was published."""
+        if time.monotonic() - self._checked >= self.poll_seconds:
+            with self._lock:
+                if time.monotonic() - self._checked >= self.poll_seconds:
+                    version = current_version(self.name)
+                    if version is not None and version != self._knowledge_base.version:
+                        try:
+                            self._knowledge_base = load_snapshot(self.name, version, self._embeddings)
+                        except Exception:
+                            metrics.increment("snapshot.reload_errors")
+                    self._checked = time.monotonic()
+        return self._knowledge_base
+
+# One mapped view per snapshot name, shared by every session in this process
+_open_snapshots = {}
+_open_lock = threading.Lock()
+
+def open_snapshot(name):
+    """Get the process-wide, hot-reloading view of a published snapshot."""
+    with _open_lock:
+        snapshot = _open_snapshots.get(name)
+        if snapshot is None:
+            snapshot = SnapshotKnowledgeBase(name)
+            _open_snapshots[name] = snapshot
+        return snapshot
+
+def _prune_versions(path, keep):
+    versions = sorted(
+        int(match.group(1)) for match in map(_VERSION_PATTERN.match, os.listdir(path)) if match
+    )
+    for version in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(path, f"v{version:06d}"), ignore_errors=True)
@@ -0,0 +1,390 @@
+# modules/knowledge_base.py
+
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, List
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from modules.embeddings import get_embeddings
+from modules.lexical_index import BM25Index
+from modules.compact_docstore import CompactDocstore, MappedDocstore
+from modules.vector_index import (
+    IVF_RETRAIN_GROWTH, build_index, choose_index_type, index_kind, index_memory_bytes, new_index,
+    rebuild_index, reconstruct_all,
+)
+from modules import metrics
+
+# Retrieval settings (override with environment variables)
+RETRIEVAL_MODE = os.getenv("TARA_RETRIEVAL_MODE", "hybrid")  # "hybrid" or "dense"
+RRF_K = int(os.getenv("TARA_RRF_K", "60"))
+HYBRID_PREFILTER = os.getenv("TARA_HYBRID_PREFILTER", "1") == "1"
+PREFILTER_MAX_CANDIDATES = int(os.getenv("TARA_PREFILTER_MAX_CANDIDATES", "256"))
+# "off" keeps float32 vectors and Document objects; "float16" or "int8" also stores chunk text compactly
+COMPACT_STORAGE = os.getenv("TARA_COMPACT_STORAGE", "off")
+
+class KnowledgeBase:
+    """
+    A FAISS vectorstore that tracks which vector IDs belong to which source document.
+
+    Documents are added from their own per-file vectorstores (fresh or loaded
+    from the index cache), so adding never re-embeds anything, and a single
+    document can later be removed or replaced without touching the others.
+    Retrievers created with as_retriever() keep working across changes.
+
+    A BM25 index over the same chunks is kept alongside the vectors, and
+    searches fuse the dense and lexical rankings so exact matches on course
+    codes or theorem numbers are not lost.
+
+    Search starts out exact (flat index). Once the knowledge base grows past
+    ANN_THRESHOLD vectors it migrates to an approximate index (HNSW or IVF-PQ),
+    and IVF-PQ indexes are retrained as the corpus keeps growing. IVF-PQ
+    cannot give back the vectors it holds, only approximations, so while it
+    is in use the original float32 vectors are kept alongside it and every
+    retrain or migration starts from them.
+
+    In compact storage mode vectors are kept as float16 or int8 and chunk
+    text in a CompactDocstore, which cuts memory per chunk several times over.
+    """
+
+    def __init__(self, embeddings=None, compact_storage=None):
+        self.embeddings = embeddings or get_embeddings()
+        self.compact_storage = compact_storage or COMPACT_STORAGE
+        self.storage = "float32" if self.compact_storage == "off" else self.compact_storage
+        self.kb_id = uuid.uuid4().hex
+        self.vectorstore = None
+        self.sources = {}  # source key (content hash) -> {"name": file name, "ids": [docstore ids]}
+        self.version = 0  # Incremented on every change to the indexed content
+        self.lexical = BM25Index()
+        self._positions = None  # (version, {docstore id: index position}), built on demand
+        self._trained_size = 0  # Vector count the current approximate index was built from
+        self._exact_vectors = None  # float32 vectors by index position, kept while the index is IVF-PQ
+        self.read_only = False  # Set for knowledge bases opened from a published snapshot
+        self._lock = threading.RLock()
+
+    def add(self, vector_store, source_key, source_name):
+        """
+        Merge a document's vectorstore into the knowledge base.
+
+        Calling this again with the same source key (e.g. for each page window
+        of a streamed PDF) adds to that source's vectors.
+
+        Args:
+            vector_store: FAISS vectorstore holding only this document's chunks
+            source_key: Stable key for the document (its content hash)
+            source_name: Display name of the document
+        """
+        with self._lock:
+            self._check_writable()
+
+            # Copy rather than FAISS.merge_from, which empties the source index
+            # (the caller may still need it, e.g. for the index cache)
+            ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+            if ids:
+                vectors = vector_store.index.reconstruct_n(0, len(ids))
+                if self.vectorstore is None:
+                    self.vectorstore = FAISS(
+                        embedding_function=self.embeddings,
+                        index=new_index(vector_store.index.d, storage=self.storage, training_vectors=vectors),
+                        docstore=InMemoryDocstore() if self.compact_storage == "off" else CompactDocstore(),
+                        index_to_docstore_id={},
+                    )
+                docs = [vector_store.docstore.search(doc_id) for doc_id in ids]
+                self.vectorstore.add_embeddings(
+                    list(zip([doc.page_content for doc in docs], vectors)),
+                    metadatas=[doc.metadata for doc in docs],
+                    ids=ids,
+                )
+                for doc_id, doc in zip(ids, docs):
+                    self.lexical.add(doc_id, doc.page_content)
+                if self._exact_vectors is not None:
+                    self._exact_vectors = np.vstack([self._exact_vectors, vectors])
+
+            source = self.sources.setdefault(source_key, {"name": source_name, "ids": []})
+            source["ids"].extend(ids)
+            if ids:
+                self._update_index_type()
+            self.version += 1
+
+    def remove(self, source_key):
+        """
+        Remove one document's vectors and chunks.
+
+        Args:
+            source_key: Key the document was added under
+
+        Returns:
+            True if the document was found and removed
+        """
+        with self._lock:
+            self._check_writable()
+            source = self.sources.pop(source_key, None)
+            if source is None:
+                return False
+
+            if source["ids"]:
+                if index_kind(self.vectorstore.index) == "flat":
+                    self.vectorstore.delete(source["ids"])
+                else:
+                    self._delete_from_approximate_index(source["ids"])
+                for doc_id in source["ids"]:
+                    self.lexical.remove(doc_id)
+                self._update_index_type()
+            self.version += 1
+            return True
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("This knowledge base is a read-only snapshot")
+
+    def _delete_from_approximate_index(self, ids):
+        """Delete vectors from an HNSW or IVF index by rebuilding it without them."""
+        removed = set(ids)
+        id_map = self.vectorstore.index_to_docstore_id
+        keep = [i for i in range(len(id_map)) if id_map[i] not in removed]
+
+        self.vectorstore.index = rebuild_index(self.vectorstore.index, keep, self._exact_vectors)
+        if self._exact_vectors is not None:
+            self._exact_vectors = self._exact_vectors[np.asarray(keep, dtype=np.int64)]
+        self.vectorstore.docstore.delete(ids)
+        self.vectorstore.index_to_docstore_id = {new: id_map[old] for new, old in enumerate(keep)}
+
+    def _update_index_type(self):
+        """Migrate between exact and approximate search as the corpus grows or shrinks."""
+        index = self.vectorstore.index
+        current = index_kind(index)
+        target = choose_index_type(index.ntotal, current)
+
+        retrain = current == "ivfpq" and target == "ivfpq" and index.ntotal > IVF_RETRAIN_GROWTH * self._trained_size
+        if target == current and not retrain:
+            return
+
+        # Positions are preserved, so index_to_docstore_id stays valid
+        start = time.perf_counter()
+        vectors = self._exact_vectors if self._exact_vectors is not None else reconstruct_all(index)
+        self.vectorstore.index = build_index(vectors, target, self.storage)
+        self._exact_vectors = vectors if target == "ivfpq" else None
+        self._trained_size = index.ntotal
+        metrics.increment("vector_index.migrations")
+        metrics.observe("vector_index.migration_seconds", time.perf_counter() - start)
+
+    def replace(self, old_source_key, vector_store, source_key, source_name):
+        """Swap in a new version of a document; only the new version's vectors are added."""
+        with self._lock:
+            self.add(vector_store, source_key, source_name)
+            if old_source_key != source_key:
+                self.remove(old_source_key)
+
+    @property
+    def stamp(self):
+        """(kb_id, version) pair identifying the current contents, for cache invalidation."""
+        return (self.kb_id, self.version)
+
+    def memory_usage(self):
+        """
+        Estimate the memory held by the vectors and chunk store.
+
+        Returns:
+            Dictionary with "chunks", "vector_bytes", "docstore_bytes" and
+            "bytes_per_1000_chunks"
+        """
+        with self._lock:
+            if self.vectorstore is None or not self.vectorstore.index.ntotal:
+                return {"chunks": 0, "vector_bytes": 0, "docstore_bytes": 0, "bytes_per_1000_chunks": 0}
+
+            chunks = self.vectorstore.index.ntotal
+            vector_bytes = index_memory_bytes(self.vectorstore.index)
+            if self._exact_vectors is not None:
+                vector_bytes += self._exact_vectors.nbytes
+            docstore = self.vectorstore.docstore
+            if isinstance(docstore, (CompactDocstore, MappedDocstore)):
+                docstore_bytes = docstore.memory_bytes()
+            else:
+                docstore_bytes = _document_store_bytes(docstore)
+            return {
+                "chunks": chunks,
+                "vector_bytes": vector_bytes,
+                "docstore_bytes": docstore_bytes,
+                "bytes_per_1000_chunks": int((vector_bytes + docstore_bytes) * 1000 / chunks),
+            }
+
+    def search(self, query, k=4, mode=None, query_vector=None):
+        """
+        Return the k chunks most relevant to the query.
+
+        In hybrid mode the dense and BM25 rankings are combined with reciprocal
+        rank fusion. If the query contains rare terms, the documents containing
+        them are used as a prefilter and only those are scored densely.
+
+        Args:
+            query: Query text
+            k: Number of chunks to return
+            mode: "hybrid" or "dense"; defaults to RETRIEVAL_MODE
+            query_vector: The query's embedding, if the caller already has it
+
+        Returns:
+            List of Documents, best first
+        """
+        mode = mode or RETRIEVAL_MODE
+        fetch_k = max(20, 4 * k)
+
+        with self._lock:
+            if self.vectorstore is None or not self.vectorstore.index.ntotal:
+                return []
+
+            candidates = None
+            if mode == "hybrid":
+                start = time.perf_counter()
+                lexical_ranking = [doc_id for doc_id, _ in self.lexical.search(query, fetch_k)]
+                if HYBRID_PREFILTER:
+                    candidates = self.lexical.candidates(query, PREFILTER_MAX_CANDIDATES)
+                    if candidates is not None and len(candidates) < k:
+                        candidates = None
+                metrics.observe("retrieval.lexical_seconds", time.perf_counter() - start)
+
+            start = time.perf_counter()
+            dense_ranking = self._dense_search(query, fetch_k, candidates, query_vector)
+            metrics.observe("retrieval.dense_seconds", time.perf_counter() - start)
+
+            if mode == "hybrid":
+                if candidates is not None:
+                    metrics.increment("retrieval.prefiltered")
+                    lexical_ranking = [doc_id for doc_id in lexical_ranking if doc_id in candidates]
+                ranking = reciprocal_rank_fusion([dense_ranking, lexical_ranking], RRF_K)
+            else:
+                ranking = dense_ranking
+
+            return [self.vectorstore.docstore.search(doc_id) for doc_id in ranking[:k]]
+
+    def _dense_search(self, query, k, candidates=None, query_vector=None):
+        """Rank docstore ids by vector distance, optionally only among candidate ids."""
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        query_vector = np.asarray([query_vector], dtype=np.float32)
+        index = self.vectorstore.index
+        id_map = self.vectorstore.index_to_docstore_id
+
+        if candidates is None:
+            _, positions = index.search(query_vector, min(k, index.ntotal))
+            return [id_map[int(i)] for i in positions[0] if i != -1]
+
+        # Exact scoring of the prefiltered candidates only
+        positions = self._id_positions()
+        candidate_positions = np.fromiter((positions[doc_id] for doc_id in candidates), dtype=np.int64)
+        if self._exact_vectors is not None:
+            # An IVF-PQ index only reconstructs approximations, so score the original vectors
+            vectors = self._exact_vectors[candidate_positions]
+        else:
+            vectors = np.vstack([index.reconstruct(int(i)) for i in candidate_positions])
+        distances = ((vectors - query_vector) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        return [id_map[int(candidate_positions[i])] for i in order]
+
+    def _id_positions(self):
+        """Map docstore ids to index positions, rebuilt only when the contents change."""
+        if self._positions is None or self._positions[0] != self.version:
+            self._positions = (self.version, {doc_id: i for i, doc_id in self.vectorstore.index_to_docstore_id.items()})
+        return self._positions[1]
+
+    def as_retriever(self, k=4):
+        """Create a retriever that always searches the current contents of this knowledge base."""
+        return KnowledgeBaseRetriever(knowledge_base=self, k=k)
+
+class ReadOnlyKnowledgeBase:
+    """
+    Read-only view of a knowledge base, for sessions that may search but not change it.
+
+    Subclasses override current() to resolve the knowledge base lazily (for
+    example a shared course knowledge base that can be reset, or a snapshot
+    that is reloaded), so retrievers created from the view always see the
+    latest contents.
+    """
+
+    read_only = True
+
+    def __init__(self, knowledge_base=None):
+        self._knowledge_base = knowledge_base
+
+    def current(self):
+        """Return the knowledge base this view reads from."""
+        return self._knowledge_base
+
+    @property
+    def kb_id(self):
+        return self.current().kb_id
+
+    @property
+    def version(self):
+        return self.current().version
+
+    @property
+    def sources(self):
+        return self.current().sources
+
+    @property
+    def stamp(self):
+        return self.current().stamp
+
+    @property
+    def embeddings(self):
+        return self.current().embeddings
+
+    def search(self, query, k=4, mode=None, query_vector=None):
+        return self.current().search(query, k=k, mode=mode, query_vector=query_vector)
+
+    def memory_usage(self):
+        return self.current().memory_usage()
+
+    def add(self, vector_store, source_key, source_name):
+        raise RuntimeError("This knowledge base is read-only")
+
+    def remove(self, source_key):
+        raise RuntimeError("This knowledge base is read-only")
+
+    def replace(self, old_source_key, vector_store, source_key, source_name):
+        raise RuntimeError("This knowledge base is read-only")
+
+    def as_retriever(self, k=4):
+        """Create a retriever that always searches the current contents."""
+        return KnowledgeBaseRetriever(knowledge_base=self, k=k)
+
+def _document_store_bytes(docstore):
+    """Approximate memory held by an InMemoryDocstore's Document objects."""
+    total = sys.getsizeof(docstore._dict)
+    for doc_id, doc in docstore._dict.items():
+        total += sys.getsizeof(doc_id) + sys.getsizeof(doc) + sys.getsizeof(doc.__dict__)
+        total += sys.getsizeof(doc.page_content) + sys.getsizeof(doc.metadata)
+        total += sum(sys.getsizeof(value) for value in doc.metadata.values())
+    return total
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuse several rankings of ids with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of ids, each best first
+        k: Smoothing constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        List of ids ordered by fused score
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+class KnowledgeBaseRetriever(BaseRetriever):
+    """LangChain retriever backed by a KnowledgeBase."""
+
+    knowledge_base: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.knowledge_base.search(query, k=self.k)
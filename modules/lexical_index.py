@@ -0,0 +1,124 @@
+# modules/lexical_index.py
+
+import heapq
+import math
+import re
+
+# Keeps course codes, section and theorem numbers together ("cs-101", "3.2.1", "x_i")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+
+def tokenize(text):
+    """Lowercase a text and split it into BM25 terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    Incremental BM25 inverted index over document chunks.
+
+    Documents can be added and removed one at a time, so the index is built
+    alongside the vectorstore during ingestion and shrinks with it when a
+    source document is removed.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}  # doc_id -> number of terms
+        self.doc_terms = {}  # doc_id -> distinct terms, so removal only touches its own postings
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, text):
+        """Index one document's text under doc_id."""
+        terms = tokenize(text)
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+        self.doc_lengths[doc_id] = len(terms)
+        self.doc_terms[doc_id] = list(frequencies)
+        self.total_length += len(terms)
+
+    def remove(self, doc_id):
+        """Remove a document from the index (no-op if it is not indexed)."""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+
+        for term in self.doc_terms.pop(doc_id):
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query, k):
+        """
+        Score documents against a query with BM25.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            List of (doc_id, score), best first
+        """
+        if not self.doc_lengths:
+            return []
+
+        n_docs = len(self.doc_lengths)
+        average_length = self.total_length / n_docs or 1.0
+        scores = {}
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def candidates(self, query, max_candidates, rare_ratio=0.05):
+        """
+        Cheaply narrow the search to documents containing the query's rare terms.
+
+        Rare terms (in at most rare_ratio of documents, such as course codes or
+        theorem numbers) are taken rarest first while their combined postings
+        stay within max_candidates.
+
+        Args:
+            query: Query text
+            max_candidates: Largest candidate set worth returning
+            rare_ratio: Document frequency ratio below which a term counts as rare
+
+        Returns:
+            Set of candidate doc_ids, or None if the query has no usable rare terms
+        """
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return None
+
+        rare_postings = sorted(
+            (posting for posting in (self.postings.get(term) for term in set(tokenize(query)))
+             if posting and len(posting) <= max(1, rare_ratio * n_docs)),
+            key=len,
+        )
+
+        selected = set()
+        for posting in rare_postings:
+            if len(selected | posting.keys()) > max_candidates:
+                break
+            selected |= posting.keys()
+
+        return selected or None
@@ -0,0 +1,49 @@
+# modules/metrics.py
+
+import threading
+from collections import deque
+
+# Number of recent observations kept per metric
+WINDOW_SIZE = 1000
+
+_lock = threading.Lock()
+_counters = {}
+_observations = {}
+
+def increment(name, amount=1):
+    """Add to a process-wide counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def observe(name, value):
+    """Record one observation (latency, throughput, ...) for a metric."""
+    with _lock:
+        if name not in _observations:
+            _observations[name] = deque(maxlen=WINDOW_SIZE)
+        _observations[name].append(value)
+
+def snapshot():
+    """
+    Get the current counters and a summary of recent observations.
+
+    Returns:
+        Dictionary with "counters" and "observations" (count, mean, p50, p95, last per metric)
+    """
+    with _lock:
+        counters = dict(_counters)
+        observations = {name: list(values) for name, values in _observations.items()}
+
+    summaries = {}
+    for name, values in observations.items():
+        if not values:
+            continue
+        ordered = sorted(values)
+        summaries[name] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "last": values[-1],
+        }
+
+    return {"counters": counters, "observations": summaries}
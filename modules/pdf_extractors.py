@@ -0,0 +1,237 @@
+# modules/pdf_extractors.py
+
+import abc
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from langchain.schema import Document
+from modules.cpu_budget import EXTRACT_CPUS
+from modules.upload_store import MemoryviewReader
+
+# Extraction backend: "auto" picks the fastest installed one (override with TARA_PDF_EXTRACTOR)
+PDF_EXTRACTOR = os.getenv("TARA_PDF_EXTRACTOR", "auto")
+# Page-parallel extraction settings
+EXTRACT_WORKERS = int(os.getenv("TARA_EXTRACT_WORKERS", str(EXTRACT_CPUS)))
+EXTRACT_RANGE_PAGES = int(os.getenv("TARA_EXTRACT_RANGE_PAGES", "32"))
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+class PdfExtractor(abc.ABC):
+    """
+    Base class for PDF text extraction backends.
+
+    Backends implement page_count() and read_range(); iter_pages() turns them
+    into one Document per page with the same metadata shape as PyPDFLoader,
+    splitting large files into page ranges extracted by worker processes.
+    Backends that parse the file on opening also override opened(), so one
+    extraction opens the file once for all its ranges.
+    """
+
+    name = None
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    @abc.abstractmethod
+    def page_count(self, source):
+        """Return the number of pages in a PDF given as a path, a bytes-like buffer or an opened() document."""
+
+    @abc.abstractmethod
+    def read_range(self, source, start, stop):
+        """Return the text of pages [start, stop) as a list of strings."""
+
+    @contextlib.contextmanager
+    def opened(self, source):
+        """Open a PDF once for several page_count()/read_range() calls (by default the source is used as is)."""
+        yield source
+
+    def iter_pages(self, source, file_name, workers=None):
+        """
+        Yield one Document per page, in page order.
+
+        Args:
+            source: Path to the PDF, or a bytes-like buffer with its contents
+            file_name: Name recorded as each page's "source"
+            workers: Worker processes for page-parallel extraction (defaults
+                to TARA_EXTRACT_WORKERS); in-memory PDFs are written to a
+                temporary file once for the workers to read
+
+        Yields:
+            Document with metadata {"source", "page", "total_pages"}
+        """
+        workers = workers or EXTRACT_WORKERS
+        with self.opened(source) as document:
+            total_pages = self.page_count(document)
+            ranges = [
+                (start, min(start + EXTRACT_RANGE_PAGES, total_pages))
+                for start in range(0, total_pages, EXTRACT_RANGE_PAGES)
+            ]
+
+            if workers > 1 and len(ranges) > 1:
+                with _as_path(source) as path:
+                    yield from self._documents(ranges, _extract_parallel(self.name, path, ranges, workers), file_name, total_pages)
+            else:
+                texts_by_range = (self.read_range(document, start, stop) for start, stop in ranges)
+                yield from self._documents(ranges, texts_by_range, file_name, total_pages)
+
+    def _documents(self, ranges, texts_by_range, file_name, total_pages):
+        for (start, _), texts in zip(ranges, texts_by_range):
+            for offset, text in enumerate(texts):
+                yield Document(
+                    page_content=text,
+                    metadata={"source": file_name, "page": start + offset, "total_pages": total_pages}
+                )
+
+class PyPdfExtractor(PdfExtractor):
+    """Pure-Python extraction with pypdf (always available, the fallback backend)."""
+
+    name = "pypdf"
+
+    def _reader(self, source):
+        from pypdf import PdfReader
+        if isinstance(source, PdfReader):
+            return source
+        if isinstance(source, str):
+            return PdfReader(source)
+        # Read in-memory uploads through a zero-copy stream
+        return PdfReader(io.BufferedReader(MemoryviewReader(source)))
+
+    @contextlib.contextmanager
+    def opened(self, source):
+        yield self._reader(source)
+
+    def page_count(self, source):
+        return len(self._reader(source).pages)
+
+    def read_range(self, source, start, stop):
+        reader = self._reader(source)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+class PyMuPdfExtractor(PdfExtractor):
+    """Native MuPDF extraction, typically an order of magnitude faster than pypdf."""
+
+    name = "pymupdf"
+
+    @classmethod
+    def is_available(cls):
+        return _import_pymupdf() is not None
+
+    def _open(self, source):
+        pymupdf = _import_pymupdf()
+        if isinstance(source, pymupdf.Document):
+            return contextlib.nullcontext(source)  # Opened by opened(), which closes it
+        if isinstance(source, str):
+            return pymupdf.open(source)
+        # In-memory uploads arrive as memoryviews, which pymupdf does not accept as a stream
+        return pymupdf.open(stream=bytes(source), filetype="pdf")
+
+    @contextlib.contextmanager
+    def opened(self, source):
+        # Opening copies an in-memory PDF, so it is done once per extraction rather than per range
+        with self._open(source) as doc:
+            yield doc
+
+    def page_count(self, source):
+        with self._open(source) as doc:
+            return doc.page_count
+
+    def read_range(self, source, start, stop):
+        with self._open(source) as doc:
+            return [doc[i].get_text() for i in range(start, stop)]
+
+EXTRACTORS = {
+    PyMuPdfExtractor.name: PyMuPdfExtractor,
+    PyPdfExtractor.name: PyPdfExtractor,
+}
+
+def get_extractor(name=None):
+    """
+    Get a PDF extractor by name, falling back to pypdf when it is not installed.
+
+    Args:
+        name: "pymupdf", "pypdf" or "auto" (defaults to TARA_PDF_EXTRACTOR)
+
+    Returns:
+        PdfExtractor instance
+    """
+    name = name or PDF_EXTRACTOR
+    if name == "auto":
+        name = PyMuPdfExtractor.name
+
+    extractor_class = EXTRACTORS.get(name)
+    if extractor_class is None:
+        raise ValueError(f"Unknown PDF extractor: {name}")
+    if not extractor_class.is_available():
+        extractor_class = PyPdfExtractor
+    return extractor_class()
+
+def _import_pymupdf():
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        pass
+    try:
+        import fitz
+        return fitz
+    except ImportError:
+        return None
+
+@contextlib.contextmanager
+def _as_path(source):
+    """Give worker processes a path to read: the source itself, or a temporary copy of an in-memory PDF."""
+    if isinstance(source, str):
+        yield source
+        return
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        yield path
+    finally:
+        os.remove(path)
+
+def _read_range_worker(backend, source, start, stop):
+    # Runs inside a worker process
+    return EXTRACTORS[backend]().read_range(source, start, stop)
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # Spawn rather than fork: the Streamlit server is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def _extract_parallel(backend, path, ranges, workers):
+    """Extract page ranges on worker processes, yielding results in page order.
+
+    At most 2 * workers ranges are in flight, so finished pages never pile up
+    faster than the caller consumes them.
+    """
+    pool = _get_pool(workers)
+    in_flight = []
+    pending = iter(ranges)
+
+    for start, stop in pending:
+        in_flight.append(pool.submit(_read_range_worker, backend, path, start, stop))
+        if len(in_flight) >= 2 * workers:
+            break
+
+    while in_flight:
+        texts = in_flight.pop(0).result()
+        next_range = next(pending, None)
+        if next_range is not None:
+            in_flight.append(pool.submit(_read_range_worker, backend, path, *next_range))
+        yield texts
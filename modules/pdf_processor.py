@@ -1,74 +1,247 @@
+import itertools
 import os
-import tempfile
-from langchain_community.document_loaders import PyPDFLoader
+import time
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.llms import Ollama
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
+from modules.embeddings import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from modules.embedding_pipeline import EMBED_BATCH_SIZE, EMBED_WORKERS, MIN_PARALLEL_BATCHES, embed_into_vectorstore
+from modules.pdf_extractors import get_extractor
+from modules.index_cache import IndexCacheWriter, cache_key, load_cached_vectorstore, save_vectorstore
+from modules.upload_store import open_upload
+from modules.knowledge_base import KnowledgeBase
 import streamlit as st
 
-def process_pdf(uploaded_file, add_to_existing=False, existing_conversation=None):
+# Indexing parameters (also part of the index cache key)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = DEFAULT_EMBEDDING_MODEL
+
+# Streaming ingestion: pages are extracted, split, embedded and indexed in windows of this size
+STREAM_PDFS = os.getenv("TARA_STREAM_PDFS", "1") == "1"
+STREAM_WINDOW_PAGES = int(os.getenv("TARA_STREAM_WINDOW_PAGES", "16"))
+
+def process_pdf(uploaded_file, add_to_existing=False, existing_conversation=None, streaming=None, on_ready=None, upload_session=None):
     """
     Process a PDF file and either create a new conversational chain or add to an existing one.
-    
+
+    Documents already indexed with the same content and parameters are loaded
+    from the on-disk index cache instead of being parsed and embedded again.
+
     Args:
         uploaded_file: The uploaded PDF file object
         add_to_existing: Whether to add documents to an existing conversation
         existing_conversation: The existing ConversationalRetrievalChain object
-        
+        streaming: Index page windows as they are extracted (defaults to TARA_STREAM_PDFS)
+        on_ready: Called with the conversation as soon as the first pages are searchable
+        upload_session: UploadSession that owns spooled copies of large uploads
+
     Returns:
         ConversationalRetrievalChain: Either a new chain or the updated existing one
     """
-    # Create a temporary file to store the uploaded PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_path = tmp_file.name
+    if streaming is None:
+        streaming = STREAM_PDFS
+
+    state = {"conversation": existing_conversation if add_to_existing else None, "attached": False}
+    progress_bar = st.progress(0.0, text=f"Indexing {uploaded_file.name}...") if streaming else None
+
+    def on_window(window_store, pages_done, total_pages):
+        # Merge each window into the live knowledge base as soon as it is embedded,
+        # so early pages can be queried while later ones are still being indexed.
+        # The first window replaces anything an interrupted earlier run left under this file
+        is_new = state["conversation"] is None
+        state["conversation"] = attach_to_conversation(
+            window_store, state["conversation"], state["file_hash"], uploaded_file.name, replace=not state["attached"]
+        )
+        state["attached"] = True
+        if is_new and on_ready:
+            # First window of a new knowledge base: make it searchable right away
+            on_ready(state["conversation"])
+
+        progress_bar.progress(
+            min(1.0, pages_done / max(total_pages, 1)),
+            text=f"Indexing {uploaded_file.name}: {pages_done}/{total_pages} pages"
+        )
 
     try:
-        # Load and process the new PDF
-        loader = PyPDFLoader(tmp_path)
-        documents = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_documents(documents)
-        
-        # Always create embeddings for the new document chunks
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        
-        # Decide whether to create a new vectorstore or add to existing one
-        if add_to_existing and existing_conversation:
-            # Extract the existing vectorstore from the conversation
-            existing_retriever = existing_conversation.retriever
-            existing_vectorstore = existing_retriever.vectorstore
-            
-            # Add new document chunks to the existing vectorstore
-            existing_vectorstore.add_documents(chunks)
-            
-            # The existing conversation already has the updated vectorstore
-            # since vectorstores are modified in-place
-            conversation = existing_conversation
-        else:
-            # Create a new vectorstore and conversation
-            vector_store = FAISS.from_documents(chunks, embeddings)
-            memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-            llm = Ollama(model="gemma3:4b", temperature=0.5)
-            
-            # Create a new conversational chain
-            conversation = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=vector_store.as_retriever(search_kwargs={"k": 4}),
-                memory=memory,
-                verbose=False
+        with open_upload(uploaded_file, upload_session) as upload:
+            state["file_hash"] = upload.file_hash
+            vector_store, stats = build_pdf_vectorstore(
+                upload,
+                window_pages=STREAM_WINDOW_PAGES if streaming else None,
+                on_window=on_window if streaming else None,
             )
-        
-        # Clean up the temporary file
-        os.unlink(tmp_path)
-        
-        return conversation
-        
+
+        if not stats["cached"]:
+            st.caption(f"Embedded {stats['chunks']} chunks at {stats['chunks_per_sec']:.1f} chunks/sec")
+
+        if stats["cached"] or not streaming:
+            return attach_to_conversation(vector_store, state["conversation"], upload.file_hash, uploaded_file.name)
+        return state["conversation"]
+
     except Exception as e:
-        # Clean up in case of error
         st.error(f"Error processing PDF: {e}")
-        os.unlink(tmp_path)
-        return None
\ No newline at end of file
+        return None
+
+    finally:
+        if progress_bar is not None:
+            progress_bar.empty()
+
+def build_pdf_vectorstore(upload, window_pages=None, on_window=None):
+    """
+    Build (or load from the index cache) the FAISS vectorstore for one PDF.
+
+    Pages are extracted and split in windows of window_pages pages. Chunks
+    are embedded and indexed once enough have accumulated to keep every
+    embedding worker busy (often several windows' worth), so only that many
+    chunks of page text are held at a time. With on_window, each group is
+    handed over and then only written to the index cache, so the document's
+    vectors are held once, by whoever on_window gives them to. This function
+    does not touch Streamlit, so it can run in worker threads.
+
+    Args:
+        upload: Upload for the PDF, parsed from memory or from its spooled file
+        window_pages: Pages per window, or None to process the whole file at once
+        on_window: Called as on_window(window_store, pages_done, total_pages)
+            after each group of chunks is indexed
+
+    Returns:
+        Tuple of (vector_store, stats) where stats has cached, chunks, seconds and chunks_per_sec;
+        vector_store is None when the chunks were indexed through on_window
+    """
+    file_name = upload.name
+    file_hash = upload.file_hash
+    key = cache_key(
+        file_hash,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        embedding_model=EMBEDDING_MODEL,
+    )
+    embeddings = get_embeddings(EMBEDDING_MODEL)
+
+    # Reuse the saved chunks and vectors if this document was indexed before
+    vector_store = load_cached_vectorstore(key, embeddings, source_name=file_name)
+    if vector_store is not None:
+        stats = {"cached": True, "chunks": vector_store.index.ntotal, "seconds": 0.0, "chunks_per_sec": 0.0}
+        return vector_store, stats
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    extractor = get_extractor()
+    total_pages = 0
+    # A window rarely fills MIN_PARALLEL_BATCHES batches on its own, so chunks are
+    # embedded in groups spanning windows, one batch per embedding worker
+    group_chunks = max(MIN_PARALLEL_BATCHES, EMBED_WORKERS) * EMBED_BATCH_SIZE
+    doc_store = None  # The whole document, only built when there is no on_window
+    cache_writer = IndexCacheWriter(key) if on_window else None
+    pages_done = 0
+    chunks_done = 0
+    pending = []
+    start = time.perf_counter()
+
+    try:
+        windows = _iter_page_windows(extractor, upload.source, file_name, window_pages)
+        for window in itertools.chain(windows, [None]):
+            if window:
+                # Read from the pages rather than opening the PDF a second time
+                total_pages = window[0].metadata["total_pages"]
+                pending.extend(_split_pages(window, text_splitter, file_name, file_hash))
+                pages_done += len(window)
+            if not pending or (window is not None and len(pending) < group_chunks):
+                continue
+            chunks, pending = pending, []
+
+            if on_window:
+                window_store, window_stats = embed_into_vectorstore(chunks, embeddings)
+                on_window(window_store, pages_done, total_pages)
+                # The group goes to disk for the index cache and is then dropped
+                cache_writer.append(window_store)
+            else:
+                doc_store, window_stats = embed_into_vectorstore(chunks, embeddings, vector_store=doc_store)
+            chunks_done += window_stats["chunks"]
+
+        if not chunks_done:
+            raise ValueError("No text could be extracted from the PDF")
+
+        # Store the document for next time
+        if cache_writer is not None:
+            cache_writer.commit()
+        else:
+            save_vectorstore(key, doc_store)
+    finally:
+        if cache_writer is not None:
+            cache_writer.abort()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "cached": False,
+        "chunks": chunks_done,
+        "seconds": seconds,
+        "chunks_per_sec": chunks_done / seconds if seconds > 0 else 0.0,
+    }
+    return doc_store, stats
+
+def _iter_page_windows(extractor, source, file_name, window_pages):
+    """Yield lists of at most window_pages page Documents without loading the whole PDF."""
+    pages = extractor.iter_pages(source, file_name)
+    if window_pages is None:
+        yield list(pages)
+        return
+
+    window = []
+    for page in pages:
+        window.append(page)
+        if len(window) == window_pages:
+            yield window
+            window = []
+    if window:
+        yield window
+
+def _split_pages(pages, text_splitter, file_name, file_hash):
+    chunks = text_splitter.split_documents(pages)
+    for chunk in chunks:
+        chunk.metadata["source"] = file_name
+        chunk.metadata["content_hash"] = file_hash
+    return chunks
+
+def attach_to_conversation(vector_store, conversation, source_key, source_name, replace=True):
+    """
+    Add a document's vectorstore to a conversation's knowledge base, or start a new conversation over it.
+
+    Args:
+        vector_store: FAISS vectorstore holding the document's chunks
+        conversation: Existing ConversationalRetrievalChain, or None
+        source_key: Key the document is tracked under (its content hash)
+        source_name: Display name of the document
+        replace: Drop whatever the knowledge base already holds under source_key
+            first (e.g. windows of a run a Streamlit rerun interrupted); False
+            adds to it, for the later windows of a streamed PDF
+
+    Returns:
+        ConversationalRetrievalChain that can search the document
+    """
+    if conversation:
+        # Merge the vectors into the existing knowledge base without embedding
+        # anything again; the conversation's retriever sees them immediately
+        knowledge_base = conversation.retriever.knowledge_base
+        if replace and source_key in knowledge_base.sources:
+            knowledge_base.remove(source_key)
+        knowledge_base.add(vector_store, source_key, source_name)
+        return conversation
+
+    knowledge_base = KnowledgeBase(get_embeddings(EMBEDDING_MODEL))
+    knowledge_base.add(vector_store, source_key, source_name)
+    return create_conversation(knowledge_base)
+
+def create_conversation(knowledge_base):
+    """Create a new conversational chain with its own memory over a knowledge base."""
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    llm = Ollama(model="gemma3:4b", temperature=0.5)
+
+    # Create a new conversational chain
+    return ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        retriever=knowledge_base.as_retriever(k=4),
+        memory=memory,
+        verbose=False
+    )
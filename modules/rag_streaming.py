@@ -0,0 +1,101 @@
+# modules/rag_streaming.py
+
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from langchain_core.prompts import format_document
+
+def chat_history_text(conversation):
+    """Return the conversation's chat history formatted as the chain formats it ("" if there is none)."""
+    chat_history = conversation.memory.load_memory_variables({})[conversation.memory.memory_key]
+    get_chat_history = conversation.get_chat_history or _get_chat_history
+    return get_chat_history(chat_history)
+
+def condense_question(conversation, question, chat_history_str=None):
+    """
+    Turn a follow-up question into a standalone one, as ConversationalRetrievalChain does.
+
+    Args:
+        conversation: ConversationalRetrievalChain with memory
+        question: The user's question (including any instruction prompt)
+        chat_history_str: Result of chat_history_text(), if already computed
+
+    Returns:
+        The standalone question, or the question itself if there is no chat history
+    """
+    if chat_history_str is None:
+        chat_history_str = chat_history_text(conversation)
+
+    if not chat_history_str:
+        return question
+    return conversation.question_generator.run(question=question, chat_history=chat_history_str)
+
+def retrieve_for_question(conversation, question, standalone_question=None, search_text=None, query_vector=None):
+    """
+    Run the retrieval half of a ConversationalRetrievalChain.
+
+    Follows the chain's own steps: the question is condensed with the chat
+    history into a standalone question, then used to retrieve documents.
+
+    Args:
+        conversation: ConversationalRetrievalChain with memory
+        question: The user's question (including any instruction prompt)
+        standalone_question: Result of condense_question(), if already computed
+        search_text: Text to search for (defaults to the standalone question)
+        query_vector: Embedding of search_text, if already computed; used
+            directly by knowledge base retrievers instead of embedding again
+
+    Returns:
+        Tuple of (question to answer, retrieved documents)
+    """
+    if standalone_question is None:
+        standalone_question = condense_question(conversation, question)
+    if search_text is None:
+        search_text = standalone_question
+
+    retriever = conversation.retriever
+    if query_vector is not None and hasattr(retriever, "knowledge_base"):
+        docs = retriever.knowledge_base.search(search_text, k=retriever.k, query_vector=query_vector)
+    else:
+        docs = retriever.invoke(search_text)
+    answer_question = standalone_question if conversation.rephrase_question else question
+    return answer_question, docs
+
+def stream_answer(conversation, question, docs):
+    """
+    Generate the answer from retrieved documents token by token.
+
+    Builds the same prompt as the chain's combine-documents step and streams
+    it through the chain's LLM.
+
+    Args:
+        conversation: ConversationalRetrievalChain the documents were retrieved for
+        question: Question returned by retrieve_for_question()
+        docs: Documents returned by retrieve_for_question()
+
+    Yields:
+        Answer text fragments as the LLM produces them
+    """
+    stuff_chain = conversation.combine_docs_chain
+    context = stuff_chain.document_separator.join(
+        format_document(doc, stuff_chain.document_prompt) for doc in docs
+    )
+    prompt = stuff_chain.llm_chain.prompt.format(**{
+        stuff_chain.document_variable_name: context,
+        "question": question,
+    })
+
+    yield from stuff_chain.llm_chain.llm.stream(prompt)
+
+def save_exchange(conversation, question, answer):
+    """Record a streamed exchange in the conversation memory, as the chain would have."""
+    conversation.memory.save_context({"question": question}, {"answer": answer})
+
+def format_sources(docs):
+    """Return a short, de-duplicated list of the sources documents came from."""
+    sources = []
+    for doc in docs:
+        label = doc.metadata.get("source", "unknown")
+        if "page" in doc.metadata:
+            label += f" (p. {doc.metadata['page'] + 1})"
+        if label not in sources:
+            sources.append(label)
+    return sources
@@ -0,0 +1,172 @@
+# modules/table_profile.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from modules.table_store import is_out_of_core
+
+# Profile settings
+TOP_VALUES = 5  # Most frequent values kept per column
+PROFILE_CACHE_SIZE = 64  # Profiles kept in memory, shared by every session in this process
+QUANTILES = (0.25, 0.5, 0.75)
+
+_profiles = OrderedDict()  # fingerprint -> profile
+_profiles_lock = threading.Lock()
+
+def fingerprint(table):
+    """
+    Identify a table's contents.
+
+    DataFrames are hashed with pandas' vectorized row hashing together with
+    their columns and dtypes; on-disk tables are already named by the
+    content hash of their upload.
+
+    Args:
+        table: DataFrame or ParquetTable
+
+    Returns:
+        Hex digest that changes whenever the data does
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((list(map(str, table.columns)), [str(t) for t in table.dtypes], table.shape)).encode("utf-8"))
+    if is_out_of_core(table):
+        digest.update(table.path.encode("utf-8"))
+    else:
+        digest.update(pd.util.hash_pandas_object(table, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def get_profile(table):
+    """
+    Get a table's column profile, computing it only the first time the same data is seen.
+
+    The profile has, per column: dtype, count, nulls, unique and the
+    TOP_VALUES most frequent values with their counts, plus mean, std, sum,
+    min, quartiles and max for numeric columns (min and max for dates).
+    Values are plain Python scalars.
+
+    Args:
+        table: DataFrame or ParquetTable
+
+    Returns:
+        Dictionary with "fingerprint", "rows", "columns" (column name -> statistics)
+        and "approximate_quantiles" (True for on-disk tables)
+    """
+    key = fingerprint(table)
+    with _profiles_lock:
+        profile = _profiles.get(key)
+        if profile is not None:
+            _profiles.move_to_end(key)
+            return profile
+
+    columns = _profile_parquet(table) if is_out_of_core(table) else _profile_frame(table)
+    profile = {"fingerprint": key, "rows": len(table), "columns": columns, "approximate_quantiles": is_out_of_core(table)}
+
+    with _profiles_lock:
+        _profiles[key] = profile
+        while len(_profiles) > PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+    return profile
+
+def summary_frame(profile, columns=None):
+    """
+    Render a profile like DataFrame.describe(include="all").T for prompts and documents.
+
+    Args:
+        profile: Result of get_profile()
+        columns: Columns to include, defaults to all of them
+
+    Returns:
+        DataFrame indexed by column with count, unique, top, mean, min, 50% and max
+    """
+    rows = {}
+    for name in columns if columns is not None else profile["columns"]:
+        stats = profile["columns"][name]
+        row = {"count": stats["count"], "unique": stats["unique"]}
+        if stats["top"]:
+            row["top"] = stats["top"][0][0]
+        for key in ("mean", "min", "50%", "max"):
+            if key in stats:
+                row[key] = stats[key]
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+def _scalar(value):
+    """Convert numpy and Arrow scalars to plain Python values (NaN becomes None)."""
+    if hasattr(value, "as_py"):
+        value = value.as_py()
+    elif hasattr(value, "item"):
+        value = value.item()
+    return None if isinstance(value, float) and value != value else value
+
+def _profile_frame(df):
+    """Profile a DataFrame with one vectorized call per statistic across all columns."""
+    counts = df.count()
+    uniques = df.nunique(dropna=True)
+    numeric = df.select_dtypes(include="number", exclude="bool")
+    dates = df.select_dtypes(include="datetime")
+    moments = numeric.agg(["mean", "std", "sum", "min", "max"]) if not numeric.empty else None
+    quantiles = numeric.quantile(list(QUANTILES)) if not numeric.empty else None
+    date_range = dates.agg(["min", "max"]) if not dates.empty else None
+
+    columns = {}
+    for name in df.columns:
+        stats = {
+            "dtype": str(df[name].dtype),
+            "count": int(counts[name]),
+            "nulls": int(len(df) - counts[name]),
+            "unique": int(uniques[name]),
+            "top": [],
+        }
+        if moments is not None and name in numeric.columns:
+            stats.update({key: _scalar(moments.at[key, name]) for key in ("mean", "std", "sum", "min", "max")})
+            if pd.api.types.is_integer_dtype(df[name]):
+                # The combined aggregation is float; keep integer columns' exact statistics as ints
+                stats.update({key: int(stats[key]) for key in ("sum", "min", "max") if stats[key] is not None})
+            stats.update({f"{q:.0%}": _scalar(quantiles.at[q, name]) for q in QUANTILES})
+        elif date_range is not None and name in dates.columns:
+            stats.update(min=date_range.at["min", name], max=date_range.at["max", name])
+        # Columns where every value is distinct (ids, names) have no meaningful top values
+        if 0 < stats["unique"] < stats["count"]:
+            top = df[name].value_counts().head(TOP_VALUES)
+            stats["top"] = [(_scalar(value), int(count)) for value, count in top.items()]
+        columns[str(name)] = stats
+    return columns
+
+def _profile_parquet(table):
+    """Profile an on-disk table one column at a time with Arrow compute kernels (quartiles are approximate)."""
+    columns = {}
+    dtypes = table.dtypes
+    for name in table.columns:
+        column = table.dataset.to_table(columns=[name]).column(name)
+        if pa.types.is_dictionary(column.type):
+            # Categorical columns are stored dictionary-encoded
+            column = column.cast(column.type.value_type)
+        values = column.drop_null()
+        stats = {
+            "dtype": str(dtypes[name]),
+            "count": len(values),
+            "nulls": column.null_count,
+            "unique": _scalar(pc.count_distinct(values)),
+            "top": [],
+        }
+        if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            min_max = pc.min_max(values)
+            stats.update(
+                mean=_scalar(pc.mean(values)), std=_scalar(pc.stddev(values, ddof=1)), sum=_scalar(pc.sum(values)),
+                min=_scalar(min_max["min"]), max=_scalar(min_max["max"]),
+            )
+            if len(values):
+                quartiles = pc.tdigest(values, q=list(QUANTILES))
+                stats.update({f"{q:.0%}": _scalar(value) for q, value in zip(QUANTILES, quartiles)})
+        elif pa.types.is_temporal(column.type):
+            min_max = pc.min_max(values)
+            stats.update(min=_scalar(min_max["min"]), max=_scalar(min_max["max"]))
+        if 0 < stats["unique"] < stats["count"]:
+            counts = values.value_counts()
+            order = pc.array_sort_indices(counts.field("counts"), order="descending")[:TOP_VALUES]
+            stats["top"] = [(_scalar(counts.field("values")[i]), _scalar(counts.field("counts")[i])) for i in order.to_pylist()]
+        columns[name] = stats
+    return columns
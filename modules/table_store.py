@@ -0,0 +1,203 @@
+# modules/table_store.py
+
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Table store settings (override with environment variables)
+TABLE_STORE_DIR = os.getenv(
+    "TARA_TABLE_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tara", "tables"),
+)
+# Uploads larger than this are queried from Parquet on disk instead of being loaded into memory
+OUT_OF_CORE_BYTES = int(float(os.getenv("TARA_OUT_OF_CORE_MB", "64")) * 1024 * 1024)
+ROW_GROUP_ROWS = int(os.getenv("TARA_PARQUET_ROW_GROUP_ROWS", "131072"))
+CSV_BLOCK_BYTES = 16 * 1024 * 1024  # CSV bytes parsed per streamed batch
+
+class ParquetTable:
+    """
+    A table kept on disk as Parquet and read lazily.
+
+    Exposes the same shape, columns and dtypes as a DataFrame without
+    loading any rows. Rows are only read through scan(), which pushes the
+    requested columns and filter down to the Parquet reader so unused
+    columns and row groups are never decoded.
+
+    Attributes:
+        name: Table name (the uploaded file name)
+        path: Parquet file path
+    """
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.dataset = ds.dataset(path, format="parquet")
+        self.num_rows = pq.ParquetFile(path).metadata.num_rows
+
+    @property
+    def columns(self):
+        return pd.Index(self.dataset.schema.names)
+
+    @property
+    def dtypes(self):
+        return self.dataset.schema.empty_table().to_pandas().dtypes
+
+    @property
+    def shape(self):
+        return (self.num_rows, len(self.dataset.schema.names))
+
+    def __len__(self):
+        return self.num_rows
+
+    def scan(self, columns=None, filter=None):
+        """
+        Read part of the table into a DataFrame.
+
+        Args:
+            columns: Columns to read, or None for all of them
+            filter: Optional pyarrow.dataset expression, e.g. ds.field("score") > 50
+
+        Returns:
+            DataFrame with only the requested columns and matching rows
+        """
+        return self.dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+    def head(self, n=5):
+        return self.dataset.head(n).to_pandas()
+
+    def iter_frames(self, batch_rows):
+        """Yield the table as DataFrames of at most batch_rows rows, reading one batch at a time."""
+        for batch in self.dataset.to_batches(batch_size=batch_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+def is_out_of_core(table):
+    """Return True for tables that live on disk rather than in a DataFrame."""
+    return isinstance(table, ParquetTable)
+
+def store_upload(upload):
+    """
+    Convert an uploaded CSV file to Parquet once and open it lazily.
+
+    The file is parsed in blocks and written row group by row group, so the
+    whole file is never in memory (Excel sheets are stored by ExcelWorkbook). The Parquet file is named by the upload's
+    content hash and reused by every later session that uploads the same file.
+
+    Args:
+        upload: Upload from upload_store.open_upload()
+
+    Returns:
+        ParquetTable over the converted file
+    """
+    os.makedirs(TABLE_STORE_DIR, exist_ok=True)
+    path = os.path.join(TABLE_STORE_DIR, f"{upload.file_hash}.parquet")
+
+    if not os.path.exists(path):
+        fd, tmp_path = tempfile.mkstemp(dir=TABLE_STORE_DIR, suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            _write_csv_as_parquet(upload, tmp_path)
+            # Atomic, so concurrent sessions converting the same file never see a partial one
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return ParquetTable(path, upload.name)
+
+def _write_csv_as_parquet(upload, path):
+    source = upload.path if upload.path else pa.BufferReader(pa.py_buffer(upload.buffer))
+    try:
+        reader = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES))
+        with pq.ParquetWriter(path, reader.schema) as writer:
+            pending, pending_rows = [], 0
+            for batch in reader:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= ROW_GROUP_ROWS:
+                    writer.write_table(pa.Table.from_batches(pending), row_group_size=ROW_GROUP_ROWS)
+                    pending, pending_rows = [], 0
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=ROW_GROUP_ROWS)
+    except pa.ArrowInvalid:
+        # Column types are inferred from the first block; a later block that
+        # doesn't fit them (e.g. text in a numeric column) needs a full parse
+        with upload.open() as stream:
+            table = pa.Table.from_pandas(pd.read_csv(stream, low_memory=False), preserve_index=False)
+        pq.write_table(table, path, row_group_size=ROW_GROUP_ROWS)
+
+def project_tables(tables, columns=None):
+    """
+    Materialize on-disk tables with only the given columns.
+
+    In-memory DataFrames are passed through unchanged. Columns not in a
+    table are ignored, so a table nobody references is read with no
+    columns (which still gives the right row count).
+
+    Args:
+        tables: Dictionary of table name -> DataFrame or ParquetTable
+        columns: Column names that are needed, or None to read every column
+
+    Returns:
+        Dictionary of table name -> DataFrame
+    """
+    return {
+        name: (table.scan(columns=None if columns is None else [c for c in table.columns if c in columns])
+               if is_out_of_core(table) else table)
+        for name, table in tables.items()
+    }
+
+def sql_available():
+    """Return True if the DuckDB SQL engine is installed."""
+    return _import_duckdb() is not None
+
+def run_sql(query, tables, max_rows=50):
+    """
+    Run a read-only SQL query over the loaded tables with DuckDB.
+
+    Tables are registered under their file names (quote them, e.g.
+    SELECT avg("score") FROM "grades.csv"). On-disk tables are scanned
+    through Arrow datasets, so DuckDB pushes column selection and WHERE
+    filters down to the Parquet reader. File access from SQL is disabled
+    and only a single SELECT statement is accepted.
+
+    Args:
+        query: SQL text
+        tables: Dictionary of table name -> DataFrame or ParquetTable
+        max_rows: Largest number of result rows fetched
+
+    Returns:
+        DataFrame with at most max_rows + 1 rows (the extra row shows the result was cut)
+
+    Raises:
+        ValueError: If the query is not a single SELECT statement
+    """
+    duckdb = _import_duckdb()
+    if duckdb is None:
+        raise RuntimeError("DuckDB is not installed")
+
+    statements = duckdb.extract_statements(query)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only a single SELECT query is allowed")
+
+    connection = duckdb.connect()
+    try:
+        for name, table in tables.items():
+            connection.register(name, table.dataset if is_out_of_core(table) else table)
+        connection.execute("SET enable_external_access = false")
+        connection.execute("SET lock_configuration = true")
+        return connection.sql(query).limit(max_rows + 1).df()
+    finally:
+        connection.close()
+
+def _import_duckdb():
+    try:
+        import duckdb
+        return duckdb
+    except ImportError:
+        return None
@@ -1,19 +1,40 @@
 # modules/tabular_analyzer.py
 
-import pandas as pd
-import tempfile
 import os
 import io
+import json
 import base64
+import threading
 import streamlit as st
 from google import genai
 from google.genai import types
+from modules.upload_store import open_upload
+from modules.tabular_sandbox import evaluate_expression, format_result, reads_whole_tables, string_constants
+from modules.dataframe_loader import read_table
+from modules.excel_workbook import ExcelWorkbook
+from modules.table_profile import get_profile, summary_frame
+from modules.table_store import OUT_OF_CORE_BYTES, is_out_of_core, project_tables, run_sql, sql_available, store_upload
+from modules import metrics
+
+# Analysis settings (override with environment variables)
+TABULAR_MODE = os.getenv("TARA_TABULAR_MODE", "local")  # "local" (schema-only prompts) or "full" (send all data)
+SAMPLE_ROWS = int(os.getenv("TARA_TABULAR_SAMPLE_ROWS", "5"))
+PROMPT_COLUMNS = int(os.getenv("TARA_TABULAR_PROMPT_COLUMNS", "60"))
+RESULT_ROWS = int(os.getenv("TARA_TABULAR_RESULT_ROWS", "50"))
+PLAN_ATTEMPTS = 2  # The second attempt gets the first attempt's error
 
 class TabularAnalyzer:
     """Class to handle tabular data analysis using Gemini API."""
     
     def __init__(self):
-        self.dataframes = {}  # Store loaded dataframes by filename
+        self.dataframes = {}  # Store loaded dataframes (or on-disk ParquetTables) by filename
+        self.memory_reports = {}  # filename -> {"before": bytes as parsed, "after": bytes as stored}
+        self.profiles = {}  # filename -> column profile from table_profile.get_profile()
+        self.workbooks = {}  # Excel file name -> ExcelWorkbook whose sheets load on demand
+        # Sessions sharing a course and ingest worker threads change the tables concurrently:
+        # _lock guards every change to the dicts above, _sheet_lock stops two sessions loading one sheet
+        self._lock = threading.RLock()
+        self._sheet_lock = threading.Lock()
         # Initialize Gemini API client if API key is available
         if "GEMINI_API_KEY" in os.environ:
             self.client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
@@ -21,50 +42,157 @@ class TabularAnalyzer:
         else:
             self.client = None
     
-    def load_file(self, uploaded_file):
-        """Load a tabular file into a dataframe and store it."""
+    def load_file(self, uploaded_file, upload_session=None):
+        """
+        Load a tabular file and store it.
+        
+        CSV files up to TARA_OUT_OF_CORE_MB are loaded into a DataFrame with
+        compact column types (see dataframe_loader.read_table). Larger ones
+        are converted to Parquet once and kept on disk as a ParquetTable,
+        which analysis reads column by column.
+        
+        For Excel workbooks only the sheet names are read here, plus the
+        first sheet; every other sheet is loaded by tables_for() when a
+        question names it. Sheets of multi-sheet workbooks are stored as
+        "file.xlsx [Sheet]".
+        """
         file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+        if file_extension not in ['.csv', '.xlsx', '.xls']:
+            raise ValueError(f"Unsupported file extension: {file_extension}")
         
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            # Load data into DataFrame
-            if file_extension == '.csv':
-                df = pd.read_csv(tmp_path)
-            elif file_extension in ['.xlsx', '.xls']:
-                df = pd.read_excel(tmp_path)
+        # Files are parsed outside the lock, so other files keep loading meanwhile
+        with open_upload(uploaded_file, upload_session) as upload:
+            if file_extension != '.csv':
+                workbook = ExcelWorkbook(upload, out_of_core=upload.size > OUT_OF_CORE_BYTES)
+                sheet = workbook.sheet_names[0]
+                name = workbook.table_name(sheet)
+                df, report = workbook.load_sheet(sheet)
+            elif upload.size > OUT_OF_CORE_BYTES:
+                workbook, name = None, uploaded_file.name
+                df, report = store_upload(upload), None
             else:
-                raise ValueError(f"Unsupported file extension: {file_extension}")
-            
-            # Store the dataframe with the filename as key
-            self.dataframes[uploaded_file.name] = df
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
-            return True
+                workbook, name = None, uploaded_file.name
+                # Parse straight from the upload buffer (or its spooled file) without a temp copy
+                with upload.open() as stream:
+                    df, report = read_table(stream, file_extension)
+        
+        with self._lock:
+            # A new version of a file replaces all of the old version's tables
+            self.remove(uploaded_file.name)
+            if workbook is not None:
+                self.workbooks[uploaded_file.name] = workbook
+            self._add_table(name, df, report)
+        return True
+    
+    def _add_table(self, name, df, report=None):
+        # Store the table by name, profiled once while it is fresh
+        profile = get_profile(df)
+        with self._lock:
+            self.dataframes[name] = df
+            self.profiles[name] = profile
+            if report is not None:
+                self.memory_reports[name] = report
+        if report is not None:
+            metrics.observe("tabular.load_bytes_before", report["before"])
+            metrics.observe("tabular.load_bytes_after", report["after"])
+    
+    def _load_sheet(self, workbook, sheet):
+        table, report = workbook.load_sheet(sheet)
+        self._add_table(workbook.table_name(sheet), table, report)
+    
+    def tables(self):
+        """Return a snapshot of the loaded tables (table name -> DataFrame or ParquetTable), safe to iterate."""
+        with self._lock:
+            return dict(self.dataframes)
+    
+    def memory_usage(self):
+        """Return a snapshot of the loaded tables' memory reports (table name -> {"before", "after"})."""
+        with self._lock:
+            return {name: report for name, report in self.memory_reports.items() if name in self.dataframes}
+    
+    def tables_for(self, question):
+        """
+        Get the tables a question can use, loading any workbook sheets it names first.
+        
+        Args:
+            question: The user's question
             
-        except Exception as e:
-            if 'tmp_path' in locals():
-                os.unlink(tmp_path)
-            raise e
+        Returns:
+            Dictionary of table name -> DataFrame or ParquetTable (the loaded tables)
+        """
+        with self._lock:
+            workbooks = list(self.workbooks.values())
+        for workbook in workbooks:
+            for sheet in workbook.sheets_mentioned(question):
+                if workbook.table_name(sheet) not in self.dataframes:
+                    with self._sheet_lock:
+                        if workbook.table_name(sheet) not in self.dataframes:
+                            self._load_sheet(workbook, sheet)
+        return self.tables()
+    
+    def unloaded_sheets(self):
+        """Return the table names of workbook sheets that have not been loaded yet."""
+        with self._lock:
+            return [
+                workbook.table_name(sheet)
+                for workbook in self.workbooks.values()
+                for sheet in workbook.sheet_names
+                if workbook.table_name(sheet) not in self.dataframes
+            ]
+    
+    def table_names(self, filename):
+        """Return the names of the loaded tables that came from one file."""
+        with self._lock:
+            workbook = self.workbooks.get(filename)
+            if workbook is None:
+                return [filename] if filename in self.dataframes else []
+            return [workbook.table_name(sheet) for sheet in workbook.sheet_names if workbook.table_name(sheet) in self.dataframes]
+    
+    def profile(self, filename):
+        """Get a loaded table's column profile, computing it if the table was added directly."""
+        with self._lock:
+            profile = self.profiles.get(filename)
+            df = self.dataframes[filename]
+        if profile is None:
+            profile = get_profile(df)
+            with self._lock:
+                self.profiles[filename] = profile
+        return profile
+    
+    def remove(self, filename):
+        """Forget a file's tables (every sheet, for workbooks)."""
+        with self._lock:
+            workbook = self.workbooks.pop(filename, None)
+            names = [workbook.table_name(sheet) for sheet in workbook.sheet_names] if workbook else [filename]
+            for name in names:
+                self.dataframes.pop(name, None)
+                self.memory_reports.pop(name, None)
+                self.profiles.pop(name, None)
+    
+    def clear(self):
+        """Forget every loaded table."""
+        with self._lock:
+            self.dataframes.clear()
+            self.memory_reports.clear()
+            self.profiles.clear()
+            self.workbooks.clear()
     
     def get_dataframe_info(self, filename):
         """Get information about a dataframe."""
         if filename not in self.dataframes:
             return None
         
-        df = self.dataframes[filename]
+        profile = self.profile(filename)
         
         # Basic information
         info = {
             "filename": filename,
-            "shape": df.shape,
-            "columns": list(df.columns),
-            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+            "shape": (profile["rows"], len(profile["columns"])),
+            "columns": list(profile["columns"]),
+            "dtypes": {col: stats["dtype"] for col, stats in profile["columns"].items()},
         }
+        if filename in self.memory_reports:
+            info["memory_bytes"] = self.memory_reports[filename]["after"]
         
         return info
     
@@ -72,6 +200,12 @@ class TabularAnalyzer:
         """
         Analyze tabular data using Gemini API.
         
+        In "local" mode (the default) Gemini only sees each table's schema,
+        summary statistics and a few sample rows, and writes a pandas
+        expression that is run here against the full data; only the result
+        goes back to Gemini for the explanation. "full" mode sends every
+        table as CSV.
+        
         Args:
             user_query: The user's question about the data
             
@@ -87,7 +221,7 @@ class TabularAnalyzer:
             }
         
         # Check if we have dataframes loaded
-        if not self.dataframes:
+        if not self.tables():
             return {
                 "success": False,
                 "error": "No tabular data has been loaded yet.",
@@ -95,18 +229,115 @@ class TabularAnalyzer:
             }
         
         try:
-            # Prepare data context for Gemini
-            data_context = []
+            # Every step works on one snapshot of the tables, even if files are added or removed meanwhile
+            tables = self.tables_for(user_query)
+            
+            # On-disk tables are too large to send; they are always analyzed locally
+            if TABULAR_MODE == "full" and not any(is_out_of_core(df) for df in tables.values()):
+                output = self._analyze_full_data(user_query, tables)
+            else:
+                output = self._analyze_locally(user_query, tables)
+            
+            return {
+                "success": True,
+                "output": output,
+                "error": ""
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error analyzing data with Gemini: {str(e)}",
+                "output": ""
+            }
+    
+    def _analyze_locally(self, user_query, tables):
+        """Have Gemini plan a query from the schema, run it locally, then explain the result."""
+        schema = "".join(self.describe_for_prompt(filename, tables[filename]) for filename in tables)
+        unloaded = self.unloaded_sheets()
+        if unloaded:
+            schema += f"\nOther sheets (only available if the user names them): {', '.join(unloaded)}\n"
+        single_table = len(tables) == 1
+        # On-disk tables are queried with SQL when DuckDB is installed, so filters reach the Parquet reader
+        use_sql = sql_available() and any(is_out_of_core(df) for df in tables.values())
+        
+        if use_sql:
+            language = "sql"
+            instructions = """Write ONE DuckDB SQL SELECT query that computes what the user's question needs from the full tables.
+- Tables are named after their files; always quote table and column names, e.g. SELECT avg("score") FROM "grades.csv"
+- Select only the columns you need and filter with WHERE where possible
+- Keep the result small (aggregate, filter or use LIMIT rather than returning whole tables)"""
+            answer_key = "sql"
+        else:
+            language = "python"
+            instructions = f"""Write ONE Python expression using pandas that computes what the user's question needs from the full tables.
+- Refer to tables as dfs["<file name>"]{' (or df, since there is only one table)' if single_table else ''}
+- Refer to columns as table["column"], never as attributes
+- Use only DataFrame/Series methods; no imports, lambdas, comprehensions, assignments or file access
+- Keep the result small (aggregate, filter or use head/nlargest rather than returning whole tables)"""
+            answer_key = "expression"
+        
+        plan_prompt = f"""You are an expert data analyst. You cannot see the data itself, only each table's schema, summary statistics and a few sample rows:
+{schema}
+{instructions}
+
+USER QUERY:
+{user_query}
+
+Respond with JSON: {{"{answer_key}": "<{'SQL query' if use_sql else 'pandas expression'}>"}}
+"""
+        
+        error = None
+        for attempt in range(PLAN_ATTEMPTS):
+            prompt = plan_prompt if error is None else (
+                f"{plan_prompt}\nYour previous {'query' if use_sql else 'expression'} failed:\n{expression}\nError: {error}\nReturn a corrected one."
+            )
+            # Until the response parses, the retry prompt shows the raw text
+            expression = self._generate(prompt, response_mime_type="application/json")
+            try:
+                expression = json.loads(expression)[answer_key]
+                if use_sql:
+                    value = run_sql(expression, tables, max_rows=RESULT_ROWS)
+                else:
+                    # Only the columns the expression names are read from on-disk tables, unless
+                    # it works on whole rows (filters, nlargest, shape, describe)
+                    columns = None if reads_whole_tables(expression) else string_constants(expression)
+                    value = evaluate_expression(expression, project_tables(tables, columns))
+                result = format_result(value, max_rows=RESULT_ROWS)
+                break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        else:
+            raise ValueError(f"Could not compute an answer from the data ({error})")
+        
+        explain_prompt = f"""You are an expert data analyst assistant. The user asked a question about their tabular data. It was answered by running this {'SQL query' if use_sql else 'pandas expression'} on the full data:
+{expression}
+
+RESULT:
+{result}
+
+USER QUERY:
+{user_query}
+
+Please explain the result clearly, with relevant statistics and insights. Only use the numbers in the result; do not invent values. If appropriate, describe what visualizations would be helpful.
+"""
+        explanation = self._generate(explain_prompt)
+        return f"{explanation}\n\n```{language}\n{expression}\n```"
+    
+    def _analyze_full_data(self, user_query, tables):
+        """Send every table as CSV in one prompt (only practical for small tables)."""
+        # Prepare data context for Gemini
+        data_context = []
+        
+        for filename, df in tables.items():
+            # Convert dataframe to CSV
+            csv_data = df.to_csv(index=False)
+            
+            # Get basic info
+            info = self.get_dataframe_info(filename)
             
-            for filename, df in self.dataframes.items():
-                # Convert dataframe to CSV
-                csv_data = df.to_csv(index=False)
-                
-                # Get basic info
-                info = self.get_dataframe_info(filename)
-                
-                # Add to context
-                data_context.append(f"""
+            # Add to context
+            data_context.append(f"""
 File: {filename}
 Shape: {info['shape'][0]} rows, {info['shape'][1]} columns
 Columns: {', '.join(info['columns'])}
@@ -115,9 +346,9 @@ Column types: {info['dtypes']}
 CSV DATA:
 {csv_data}
                 """)
-            
-            # Create the full prompt
-            prompt = f"""You are an expert data analyst assistant. Analyze the following tabular data based on the user's query.
+        
+        # Create the full prompt
+        prompt = f"""You are an expert data analyst assistant. Analyze the following tabular data based on the user's query.
 
 DATA:
 {''.join(data_context)}
@@ -127,41 +358,58 @@ USER QUERY:
 
 Please provide a detailed analysis with relevant statistics, insights, and explanations. If the query involves calculations, perform them accurately and show your work. If appropriate, describe what visualizations would be helpful for this data.
 """
-            
-            # Create Gemini content
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=prompt),
-                    ],
-                ),
-            ]
-            
-            # Configure Gemini request
-            generate_content_config = types.GenerateContentConfig(
-                response_mime_type="text/plain",
-            )
-            
-            # Send request to Gemini
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=generate_content_config,
-            )
-            
-            # Extract the response text
-            result = {
-                "success": True,
-                "output": response.text,
-                "error": ""
-            }
-            
-            return result
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Error analyzing data with Gemini: {str(e)}",
-                "output": ""
-            }
\ No newline at end of file
+        return self._generate(prompt)
+    
+    def describe_for_prompt(self, filename, df=None):
+        """
+        Describe a table for the planning prompt without including its data.
+        
+        The description has a fixed size regardless of the number of rows:
+        shape, column types, summary statistics and SAMPLE_ROWS sample rows,
+        for at most PROMPT_COLUMNS columns.
+        """
+        if df is None:
+            df = self.dataframes[filename]
+        columns = list(df.columns[:PROMPT_COLUMNS])
+        shown = df.head(SAMPLE_ROWS)[columns]
+        
+        # Statistics come from the profile computed at load time
+        stats = summary_frame(self.profile(filename), [str(c) for c in columns])
+        sample = shown.head(SAMPLE_ROWS).astype(str).apply(lambda col: col.str.slice(0, 40))
+        omitted = f" (first {PROMPT_COLUMNS} of {df.shape[1]} shown)" if df.shape[1] > PROMPT_COLUMNS else ""
+        
+        return f"""
+File: {filename}
+Shape: {df.shape[0]} rows, {df.shape[1]} columns{omitted}
+Column types: {({col: str(dtype) for col, dtype in shown.dtypes.items()})}
+Summary statistics:
+{stats.to_string()}
+Sample rows:
+{sample.to_csv(index=False)}"""
+    
+    def _generate(self, prompt, response_mime_type="text/plain"):
+        """Send one prompt to Gemini and return the response text."""
+        metrics.observe("tabular.prompt_chars", len(prompt))
+        
+        # Create Gemini content
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=prompt),
+                ],
+            ),
+        ]
+        
+        # Configure Gemini request
+        generate_content_config = types.GenerateContentConfig(
+            response_mime_type=response_mime_type,
+        )
+        
+        # Send request to Gemini
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=generate_content_config,
+        )
+        return response.text
@@ -0,0 +1,305 @@
+# modules/tabular_fast_path.py
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from modules import metrics
+from modules.table_store import is_out_of_core
+
+# Largest table shown in a fast-path answer
+FAST_PATH_MAX_ROWS = int(os.getenv("TARA_FAST_PATH_MAX_ROWS", "25"))
+
+# Aggregation words -> (pandas aggregation, label used in the answer)
+AGGREGATIONS = {
+    "standard deviation": ("std", "standard deviation"),
+    "average": ("mean", "average"),
+    "mean": ("mean", "average"),
+    "median": ("median", "median"),
+    "sum": ("sum", "total"),
+    "total": ("sum", "total"),
+    "maximum": ("max", "maximum"),
+    "max": ("max", "maximum"),
+    "highest": ("max", "maximum"),
+    "largest": ("max", "maximum"),
+    "minimum": ("min", "minimum"),
+    "min": ("min", "minimum"),
+    "lowest": ("min", "minimum"),
+    "smallest": ("min", "minimum"),
+    "distinct": ("nunique", "number of distinct values of"),
+    "unique": ("nunique", "number of distinct values of"),
+    "count": ("count", "count"),
+    "how many": ("count", "count"),
+    "number of": ("count", "count"),
+}
+
+# Wording the fast path cannot handle faithfully; such questions go to the LLM
+UNSUPPORTED = re.compile(
+    r"\b(where|if|only|except|between|greater|more than|less than|fewer|above|below|over|under|"
+    r"correlat\w*|trend|predict\w*|plot|chart|graph|visuali[sz]\w*|histogram|distribution|why|explain|"
+    r"compare|percent\w*|ratio|growth|change|and then)\b"
+)
+# Column names that are also common words are never matched ("a", "to", ...)
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "to", "is", "by", "per", "for", "and", "or", "what", "which", "how"}
+GROUP_WORDS = r"(?:per|by|for each|for every|each|across|grouped by|group by)"
+TOP_PATTERN = re.compile(r"\b(top|bottom|highest|lowest|best|worst)\s+(\d+)\b")
+SORT_PATTERN = re.compile(r"\b(?:sort|sorted|order|ordered|rank|ranked)\s+(?:them\s+|it\s+|the\s+\w+\s+)?by\b")
+
+# Questions about particular rows ("which student", "score of Bob", "in section B", "student 17")
+# need a filter the fast path does not apply, so they go to the LLM rather than get a table-wide answer
+ROW_QUESTION = re.compile(r"\b(which|who|whom|whose)\b")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+OF_WORD = re.compile(r"\b(?:of|for|in)\s+(?:(?:the|all|each|every|this|that)\s+)?([a-z0-9]+)")
+# Words that may follow "of", "for" or "in" without naming a row
+GENERIC_WORDS = {
+    "table", "tables", "data", "dataset", "file", "sheet", "row", "rows", "record", "records", "entries",
+    "column", "columns", "value", "values", "distinct", "unique", "total", "average", "sum", "number",
+}
+# Words that may follow a text column's name without being one of its values ("section per ...")
+CONNECTIVES = STOPWORDS | {
+    "per", "by", "each", "every", "across", "group", "grouped", "is", "are", "was", "were", "has", "have",
+    "do", "does", "column", "columns", "value", "values", "with", "there",
+}
+
+def answer_fast(question, dataframes, profiles=None):
+    """
+    Answer a simple aggregation question directly with pandas, without an LLM.
+
+    Handles counts and single aggregations (average, sum, minimum, ...) of
+    named columns, optionally grouped by another column, plus "top N by" and
+    "sort by" listings. Table and column names are matched against the
+    loaded dataframes; anything ambiguous or outside these patterns returns
+    None so the caller can fall back to the LLM.
+
+    Args:
+        question: The user's question
+        dataframes: Dictionary of table name -> DataFrame or ParquetTable
+        profiles: Optional dictionary of table name -> column profile; single
+            aggregations of whole columns are then read from the profile
+            without touching the data
+
+    Returns:
+        Markdown answer, or None if the question is not handled
+    """
+    answer = _answer(question, dataframes, profiles or {})
+    metrics.increment("tabular.fast_path.hits" if answer is not None else "tabular.fast_path.misses")
+    return answer
+
+# Aggregations that can be read straight from a column profile
+PROFILE_STATISTICS = {"mean": "mean", "median": "50%", "sum": "sum", "max": "max", "min": "min", "std": "std", "nunique": "unique", "count": "count"}
+
+def _answer(question, dataframes, profiles):
+    text = _normalize(question)
+    if not dataframes or UNSUPPORTED.search(text):
+        return None
+
+    resolved = _resolve_table(text, dataframes)
+    if resolved is None:
+        return None
+    table_name, df, columns = resolved
+    profile = profiles.get(table_name)
+    # Cached statistics describe the whole table too, so the same check comes first
+    if _selects_rows(text, table_name, df, profile):
+        return None
+    answer = _answer_from_profile(text, table_name, columns, profile) if profile else None
+    if answer is not None:
+        return answer
+    if is_out_of_core(df):
+        # Read only the mentioned columns from disk
+        df = df.scan(columns=columns)
+
+    group_columns = [c for c in columns if re.search(rf"\b{GROUP_WORDS}\s+(?:the\s+)?{re.escape(_normalize(c))}\b", text)]
+    value_columns = [c for c in columns if c not in group_columns]
+    if len(group_columns) > 1:
+        return None
+    group = group_columns[0] if group_columns else None
+
+    # "top 5 students by score", "sort by grade"
+    top = TOP_PATTERN.search(text)
+    if top or SORT_PATTERN.search(text):
+        sort_column = group or (value_columns[0] if len(value_columns) == 1 else None)
+        if sort_column is None or (top and not pd.api.types.is_numeric_dtype(df[sort_column])):
+            return None
+        if top:
+            n = int(top.group(2))
+            largest = top.group(1) in ("top", "highest", "best")
+            rows = df.nlargest(n, sort_column) if largest else df.nsmallest(n, sort_column)
+            return f"{top.group(1).capitalize()} {n} rows of **{table_name}** by **{sort_column}**:\n\n{_markdown_table(rows)}"
+        descending = bool(re.search(r"\b(desc\w*|highest first|largest first|reverse)\b", text))
+        rows = df.sort_values(sort_column, ascending=not descending)
+        return f"**{table_name}** sorted by **{sort_column}**:\n\n{_markdown_table(rows)}"
+
+    aggregation = _find_aggregation(text)
+    if aggregation is None:
+        return None
+    function, label = aggregation
+
+    # Counting rows: "how many students", "count per section"
+    if function == "count" and not value_columns:
+        if group:
+            counts = df[group].value_counts().sort_index().rename("count")
+            return f"Number of rows in **{table_name}** per **{group}**:\n\n{_markdown_table(counts.to_frame())}"
+        return f"**{table_name}** has **{len(df):,}** rows."
+
+    if not value_columns:
+        return None
+    if function in ("min", "max"):
+        # Text is stored as unordered categoricals, which have no minimum or maximum
+        if not all(_is_ordered(df[c]) for c in value_columns):
+            return None
+    elif function not in ("count", "nunique"):
+        if not all(pd.api.types.is_numeric_dtype(df[c]) for c in value_columns):
+            return None
+
+    if group:
+        result = df.groupby(group)[value_columns].agg(function)
+        columns_text = ", ".join(f"**{c}**" for c in value_columns)
+        return f"{label.capitalize()} {columns_text} in **{table_name}** per **{group}**:\n\n{_markdown_table(result)}"
+
+    values = df[value_columns].agg(function)
+    if len(value_columns) == 1:
+        return f"The {label} **{value_columns[0]}** in **{table_name}** is **{_format_value(values.iloc[0])}**."
+    return f"{label.capitalize()} in **{table_name}**:\n\n{_markdown_table(values.rename(label).rename_axis('column').to_frame())}"
+
+def _is_ordered(series):
+    """True for columns with a meaningful order: numbers, dates and ordered categoricals."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return bool(dtype.ordered)
+    return pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+
+def _answer_from_profile(text, table_name, columns, profile):
+    """Answer an ungrouped count or single aggregation from the table's profile, or return None."""
+    if TOP_PATTERN.search(text) or SORT_PATTERN.search(text) or re.search(rf"\b{GROUP_WORDS}\b", text):
+        return None
+    aggregation = _find_aggregation(text)
+    if aggregation is None:
+        return None
+    function, label = aggregation
+    if function == "count" and not columns:
+        return f"**{table_name}** has **{profile['rows']:,}** rows."
+    if len(columns) != 1:
+        return None
+    stats = profile["columns"].get(columns[0], {})
+    key = PROFILE_STATISTICS.get(function)
+    # Quartiles of on-disk tables are approximate, so their medians are computed from the data
+    if stats.get(key) is None or (key == "50%" and profile["approximate_quantiles"]):
+        return None
+    return f"The {label} **{columns[0]}** in **{table_name}** is **{_format_value(stats[key])}**."
+
+def _selects_rows(text, table_name, df, profile=None):
+    """
+    Tell whether a question is about particular rows rather than the whole table.
+
+    That is the case when it asks "which" or "who", contains a number (other
+    than "top 5" or part of a name), follows "of", "for" or "in" with a word
+    that names no column or table ("score of Bob"), follows a text column's
+    name with a value ("section B"), or mentions a value of a text column:
+    one of the profile's most frequent values (which also covers on-disk
+    tables and values of several words), or any single-word value of an
+    in-memory column.
+    """
+    if ROW_QUESTION.search(text):
+        return True
+
+    name_words = {word for column in df.columns for word in _normalize(column).split()}
+    name_words |= {word for name in _table_words(table_name) for word in _normalize(name).split()}
+    known = name_words | STOPWORDS | GENERIC_WORDS
+
+    if any(number not in name_words for number in NUMBER.findall(TOP_PATTERN.sub(" ", text))):
+        return True
+    if any(word not in known and word.rstrip("s") not in known for word in OF_WORD.findall(text)):
+        return True
+
+    dtypes = df.dtypes
+    text_columns = [column for column in df.columns if not pd.api.types.is_numeric_dtype(dtypes[column])]
+    for column in text_columns:
+        following = re.search(rf"\b{re.escape(_normalize(column))}s?\s+([a-z0-9]+)", text)
+        if following and following.group(1) not in CONNECTIVES and following.group(1) not in name_words:
+            return True
+
+    if profile:
+        for column in text_columns:
+            for value, _ in profile["columns"].get(str(column), {}).get("top", []):
+                value = _normalize(value)
+                if value and value not in STOPWORDS and value not in name_words and _mentioned(value, text):
+                    return True
+
+    # Single-word cell values of in-memory text columns ("Bob's score")
+    words = set(re.findall(r"[a-z0-9]+", text)) - known
+    if not words or is_out_of_core(df):
+        return False
+    for column in text_columns:
+        values = df[column].cat.categories if isinstance(dtypes[column], pd.CategoricalDtype) else df[column].dropna()
+        if values.astype(str).str.lower().isin(words).any():
+            return True
+    return False
+
+def _normalize(text):
+    """Lowercase and treat underscores and hyphens in names as spaces."""
+    return re.sub(r"[_\-]+", " ", str(text).lower()).strip()
+
+def _mentioned(name, text):
+    return re.search(rf"\b{re.escape(_normalize(name))}s?\b", text) is not None
+
+def _table_words(name):
+    """Names a table can be referred to by: the file name without extension, and the sheet for "file.xlsx [Sheet]"."""
+    match = re.fullmatch(r"(.+?) \[(.+)\]", name)
+    if match:
+        return [os.path.splitext(match.group(1))[0], match.group(2)]
+    return [os.path.splitext(name)[0]]
+
+def _resolve_table(text, dataframes):
+    """
+    Pick the table and the columns a question refers to.
+
+    Returns:
+        (table name, DataFrame, mentioned columns), or None if ambiguous
+    """
+    named = [name for name in dataframes if any(_mentioned(word, text) for word in _table_words(name))]
+    candidates = named or list(dataframes)
+
+    matches = []
+    for name in candidates:
+        df = dataframes[name]
+        # Longest names first, so "final score" wins over "score"
+        columns = []
+        remaining = text
+        for column in sorted(map(str, df.columns), key=len, reverse=True):
+            if _normalize(column) not in STOPWORDS and _mentioned(column, remaining):
+                columns.append(column)
+                remaining = re.sub(rf"\b{re.escape(_normalize(column))}s?\b", " ", remaining)
+        if columns or len(candidates) == 1:
+            matches.append((name, df, [c for c in map(str, df.columns) if c in columns]))
+
+    if len(matches) != 1:
+        return None
+    return matches[0]
+
+def _find_aggregation(text):
+    found = {AGGREGATIONS[word] for word in AGGREGATIONS if re.search(rf"\b{word}\b", text)}
+    # "how many distinct" is a distinct count, not a row count
+    if len(found) > 1 and ("nunique", "number of distinct values of") in found:
+        found = {("nunique", "number of distinct values of")}
+    return found.pop() if len(found) == 1 else None
+
+def _format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.2f}".rstrip("0").rstrip(".")
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return f"{value:,}"
+    return str(value)
+
+def _markdown_table(df, max_rows=FAST_PATH_MAX_ROWS):
+    """Render a DataFrame as a Markdown table (without requiring tabulate)."""
+    shown = df.head(max_rows).reset_index() if not isinstance(df.index, pd.RangeIndex) else df.head(max_rows)
+    header = "| " + " | ".join(map(str, shown.columns)) + " |"
+    divider = "|" + "---|" * len(shown.columns)
+    rows = [
+        "| " + " | ".join(_format_value(value.item() if hasattr(value, "item") else value) for value in row) + " |"
+        for row in shown.itertuples(index=False)
+    ]
+    table = "\n".join([header, divider, *rows])
+    if len(df) > max_rows:
+        table += f"\n\n_Showing {max_rows} of {len(df):,} rows._"
+    return table
@@ -1,23 +1,32 @@
 # modules/tabular_processor.py
 
 import pandas as pd
-import tempfile
 import os
 import json
+import itertools
 from langchain.schema import Document
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.memory import ConversationBufferMemory
 from langchain_community.llms import Ollama
 from langchain.chains import ConversationalRetrievalChain
+from modules.embeddings import get_embeddings
+from modules.embedding_pipeline import embed_stream
+from modules.upload_store import open_upload
+from modules.table_profile import get_profile, summary_frame
+from modules.excel_workbook import ExcelWorkbook
 import streamlit as st
 
-def process_tabular_file(uploaded_file):
+# Row chunk settings (override with environment variables)
+ROW_CHUNK_CHARS = int(os.getenv("TARA_TABLE_CHUNK_CHARS", "1000"))  # Characters per row chunk, prefix included
+ROW_MAX_CHUNKS = int(os.getenv("TARA_TABLE_MAX_CHUNKS", "2000"))  # Row chunks indexed per table; later rows are left to analysis
+ROW_RENDER_BATCH = 512  # Rows read and rendered at a time
+
+def process_tabular_file(uploaded_file, upload_session=None):
     """
-    Process CSV or Excel files without chunking them.
+    Index a CSV or Excel file as table, column and row-chunk documents.
     
     Args:
         uploaded_file: The uploaded file object
+        upload_session: UploadSession that owns spooled copies of large uploads
         
     Returns:
         ConversationalRetrievalChain or None if processing fails
@@ -25,108 +34,28 @@ def process_tabular_file(uploaded_file):
     file_extension = os.path.splitext(uploaded_file.name)[1].lower()
     
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
-        
-        # Load data into DataFrame
-        if file_extension == '.csv':
-            df = pd.read_csv(tmp_path)
-        elif file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(tmp_path)
-        else:
+        if file_extension not in ['.csv', '.xlsx', '.xls']:
             raise ValueError(f"Unsupported file extension: {file_extension}")
         
-        # Process each sheet as a document (for Excel with multiple sheets)
+        # Load data into DataFrame straight from the upload buffer (or its spooled file)
         documents = []
+        with open_upload(uploaded_file, upload_session) as upload:
+            if file_extension == '.csv':
+                with upload.open() as stream:
+                    df = pd.read_csv(stream)
+            else:
+                # Only the first sheet is parsed; the others are listed by name
+                workbook = ExcelWorkbook(upload)
+                df, _ = workbook.load_sheet(workbook.sheet_names[0])
+                if len(workbook.sheet_names) > 1:
+                    documents.append(build_workbook_document(uploaded_file.name, workbook.sheet_names))
         
-        # For single dataframe (CSV or single sheet Excel)
-        # Create metadata with schema information
-        schema = {col: str(dtype) for col, dtype in df.dtypes.items()}
-        
-        # Create statistical summary
-        stats = {}
-        for col in df.columns:
-            if pd.api.types.is_numeric_dtype(df[col]):
-                stats[col] = {
-                    "min": float(df[col].min()) if not pd.isna(df[col].min()) else None,
-                    "max": float(df[col].max()) if not pd.isna(df[col].max()) else None,
-                    "mean": float(df[col].mean()) if not pd.isna(df[col].mean()) else None,
-                    "median": float(df[col].median()) if not pd.isna(df[col].median()) else None
-                }
-        
-        # Convert first 10 rows to string for preview
-        preview_rows = df.head(10).to_string()
-        
-        # Create a document for table schema and info
-        table_info_doc = Document(
-            page_content=f"""
-            Filename: {uploaded_file.name}
-            Total rows: {len(df)}
-            Total columns: {len(df.columns)}
-            Column names: {', '.join(df.columns)}
-            Column types: {json.dumps(schema)}
-            Statistics: {json.dumps(stats)}
-            
-            Preview:
-            {preview_rows}
-            """,
-            metadata={
-                "source": uploaded_file.name,
-                "type": "table_info",
-                "rows": len(df),
-                "columns": len(df.columns),
-                "column_names": list(df.columns)
-            }
-        )
-        documents.append(table_info_doc)
-        
-        # Create a document for each column with its description
-        for column in df.columns:
-            unique_values = df[column].nunique()
-            sample_values = df[column].dropna().sample(min(5, len(df))).tolist() if len(df) > 0 else []
-            
-            column_doc = Document(
-                page_content=f"""
-                Column: {column}
-                From file: {uploaded_file.name}
-                Data type: {df[column].dtype}
-                Number of unique values: {unique_values}
-                Number of missing values: {df[column].isna().sum()}
-                Sample values: {sample_values}
-                """,
-                metadata={
-                    "source": uploaded_file.name,
-                    "type": "column_info",
-                    "column_name": column,
-                    "data_type": str(df[column].dtype)
-                }
-            )
-            documents.append(column_doc)
-        
-        # Save the full dataframe as a JSON string in a document
-        # This allows querying the entire dataset
-        df_json = df.to_json(orient="records", date_format="iso")
-        full_data_doc = Document(
-            page_content=f"""
-            Complete data from {uploaded_file.name}:
-            {df_json}
-            """,
-            metadata={
-                "source": uploaded_file.name,
-                "type": "full_data",
-                "format": "json"
-            }
-        )
-        documents.append(full_data_doc)
-        
-        # Create embeddings and vector store
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        vector_store = FAISS.from_documents(documents, embeddings)
+        # Describe the table and each column from its cached profile
+        documents += build_table_documents(uploaded_file.name, df, get_profile(df))
         
-        # Clean up the temporary file
-        os.unlink(tmp_path)
+        # Add the rows themselves as context-sized chunks, embedded as they are produced
+        documents = itertools.chain(documents, iter_row_documents(uploaded_file.name, df))
+        vector_store, _ = embed_stream(documents, get_embeddings())
         
         # Create conversation chain
         memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
@@ -141,6 +70,156 @@ def process_tabular_file(uploaded_file):
     
     except Exception as e:
         st.error(f"Error processing tabular file: {e}")
-        if 'tmp_path' in locals():
-            os.unlink(tmp_path)
-        return None
\ No newline at end of file
+        return None
+
+def build_table_documents(file_name, table, profile, file_hash=None):
+    """
+    Build retrieval documents describing a table from its column profile.
+    
+    One document describes the whole table (shape, schema, statistics and a
+    short preview) and one describes each column. No statistic is computed
+    here; everything comes from the profile.
+    
+    Args:
+        file_name: Name of the uploaded file
+        table: DataFrame or ParquetTable (only its first rows are read)
+        profile: Column profile from table_profile.get_profile()
+        file_hash: Content hash stored on each document, if known
+        
+    Returns:
+        List of Documents
+    """
+    base_metadata = {"source": file_name}
+    if file_hash:
+        base_metadata["content_hash"] = file_hash
+    columns = profile["columns"]
+    stats = summary_frame(profile)
+    
+    documents = [Document(
+        page_content=f"""This is a tabular data file named {file_name}. Use data analysis techniques to query its contents.
+Total rows: {profile['rows']}
+Total columns: {len(columns)}
+Column names: {', '.join(columns)}
+Column types: {json.dumps({name: column['dtype'] for name, column in columns.items()})}
+Statistics:
+{stats.to_string()}
+
+Preview:
+{table.head(10).to_string()}
+""",
+        metadata={
+            **base_metadata,
+            "type": "table_info",
+            "rows": profile["rows"],
+            "columns": len(columns),
+            "column_names": list(columns),
+        }
+    )]
+    
+    for name, column in columns.items():
+        numbers = ", ".join(f"{key}: {column[key]}" for key in ("min", "25%", "50%", "75%", "max", "mean") if key in column)
+        top_values = ", ".join(f"{value} ({count})" for value, count in column["top"])
+        documents.append(Document(
+            page_content=f"""Column: {name}
+From file: {file_name}
+Data type: {column['dtype']}
+Number of unique values: {column['unique']}
+Number of missing values: {column['nulls']}
+{f'Distribution: {numbers}' if numbers else ''}
+{f'Most common values: {top_values}' if top_values else ''}
+""",
+            metadata={
+                **base_metadata,
+                "type": "column_info",
+                "column_name": name,
+                "data_type": column["dtype"],
+            }
+        ))
+    
+    return documents
+
+def build_workbook_document(file_name, sheet_names, file_hash=None):
+    """
+    Build a retrieval document listing a workbook's sheets.
+    
+    Only the first sheet is indexed when a workbook is uploaded, so this
+    tells questions about the others which sheet names to ask about.
+    
+    Args:
+        file_name: Name of the uploaded workbook
+        sheet_names: Sheet names in workbook order
+        file_hash: Content hash stored on the document, if known
+        
+    Returns:
+        Document
+    """
+    metadata = {"source": file_name, "type": "workbook_info", "sheet_names": list(sheet_names)}
+    if file_hash:
+        metadata["content_hash"] = file_hash
+    return Document(
+        page_content=f"""This is an Excel workbook named {file_name} with {len(sheet_names)} sheets: {', '.join(sheet_names)}.
+Ask about a sheet by name to analyze its data.
+""",
+        metadata=metadata,
+    )
+
+def iter_row_documents(file_name, table, file_hash=None, chunk_chars=ROW_CHUNK_CHARS, max_chunks=ROW_MAX_CHUNKS):
+    """
+    Yield a table's rows as CSV chunks sized for embedding and the LLM context.
+    
+    Each chunk starts with the table name, its row range and the column
+    names and types (in CSV order), followed by as many CSV rows as fit in
+    chunk_chars.
+    Rows are read ROW_RENDER_BATCH at a time, so large (and on-disk) tables
+    are never rendered in full; at most max_chunks chunks are produced.
+    
+    Args:
+        file_name: Name of the uploaded file
+        table: DataFrame or ParquetTable
+        file_hash: Content hash stored on each document, if known
+        chunk_chars: Largest chunk size in characters
+        max_chunks: Largest number of chunks
+        
+    Yields:
+        Documents with type "rows" and row_start/row_end (1-based, inclusive) metadata
+    """
+    total_rows = len(table)
+    schema = ", ".join(f"{name} ({dtype})" for name, dtype in table.dtypes.items())
+    # A very wide table's schema would crowd out the rows; keep at most half the chunk for it
+    schema = schema if len(schema) <= chunk_chars // 2 else schema[:chunk_chars // 2] + "..."
+    base_metadata = {"source": file_name, "type": "rows"}
+    if file_hash:
+        base_metadata["content_hash"] = file_hash
+    
+    if hasattr(table, "iter_frames"):
+        frames = table.iter_frames(ROW_RENDER_BATCH)
+    else:
+        frames = (table.iloc[i:i + ROW_RENDER_BATCH] for i in range(0, total_rows, ROW_RENDER_BATCH))
+    
+    def make_document(lines, first_row):
+        last_row = first_row + len(lines) - 1
+        prefix = f"Table {file_name}, rows {first_row}-{last_row} of {total_rows}\nColumns: {schema}\n"
+        return Document(
+            page_content=prefix + "\n".join(lines),
+            metadata={**base_metadata, "row_start": first_row, "row_end": last_row},
+        )
+    
+    # Room left for rows after the prefix (row numbers are at most as long as the total)
+    prefix_chars = len(f"Table {file_name}, rows {total_rows}-{total_rows} of {total_rows}\nColumns: {schema}\n")
+    budget = max(chunk_chars // 4, chunk_chars - prefix_chars)
+    chunks = 0
+    lines, size, first_row, row_number = [], 0, 1, 0
+    for frame in frames:
+        for line in frame.to_csv(index=False, header=False).splitlines():
+            row_number += 1
+            line = line[:budget]
+            if lines and size + len(line) + 1 > budget:
+                yield make_document(lines, first_row)
+                chunks += 1
+                if chunks >= max_chunks:
+                    return
+                lines, size, first_row = [], 0, row_number
+            lines.append(line)
+            size += len(line) + 1
+    if lines:
+        yield make_document(lines, first_row)
@@ -0,0 +1,298 @@
+# modules/tabular_sandbox.py
+
+import ast
+import numpy as np
+import pandas as pd
+
+# Methods and attributes a generated expression may use on dataframes, series and groupbys.
+# Anything that reads or writes files, evaluates strings or takes arbitrary callables is left out.
+ALLOWED_ATTRIBUTES = {
+    # selection and shape
+    "loc", "iloc", "at", "iat", "columns", "index", "shape", "size", "dtypes", "values", "T",
+    "head", "tail", "sample", "nlargest", "nsmallest", "isin", "between", "where", "mask",
+    "drop", "drop_duplicates", "duplicated", "dropna", "fillna", "isna", "isnull", "notna", "notnull",
+    "rename", "reset_index", "set_index", "sort_values", "sort_index", "astype", "copy",
+    # aggregation
+    "groupby", "agg", "aggregate", "count", "sum", "mean", "median", "min", "max", "std", "var",
+    "nunique", "unique", "value_counts", "describe", "quantile", "mode", "prod", "cumsum",
+    "cummax", "cummin", "cumprod", "idxmax", "idxmin", "corr", "cov", "pct_change", "diff",
+    "rank", "round", "abs", "clip", "any", "all", "first", "last", "nth", "filter",
+    "pivot_table", "melt", "merge", "join", "stack", "unstack", "explode", "to_frame", "tolist",
+    "item", "empty", "name", "get",
+    # string and datetime accessors
+    "str", "contains", "startswith", "endswith", "lower", "upper", "strip", "len", "split",
+    "replace", "dt", "year", "month", "day", "dayofweek", "hour", "date", "to_period",
+    # comparisons as methods
+    "eq", "ne", "lt", "le", "gt", "ge", "add", "sub", "mul", "div", "floordiv", "mod", "pow",
+}
+
+# Aggregation names accepted as strings by agg(), transform(), pivot_table(aggfunc=) and the like.
+# pandas looks string arguments up as methods (df.agg("to_csv") writes a file), so nothing else is allowed.
+ALLOWED_AGGREGATIONS = {
+    "sum", "mean", "min", "max", "count", "median", "std", "var", "nunique", "first", "last", "size",
+}
+# Methods that dispatch string arguments to methods, and keywords that name the function to apply
+AGGREGATING_METHODS = {"agg", "aggregate", "transform", "apply"}
+AGGFUNC_POSITIONS = {"pivot_table": 3, "crosstab": 5}  # Positional index of aggfunc
+FUNCTION_KEYWORDS = {"func", "aggfunc"}
+OPTION_KEYWORDS = {"axis", "result_type", "by_row"}  # String-valued options of those methods that name no function
+JOIN_POSITIONS = {"merge": 1, "join": 2}  # Positional index of how; how="cross" multiplies the row counts
+
+# Bounds on constant arithmetic, so an expression like 10**10**10 cannot hang the worker
+MAX_EXPONENT = 100
+MAX_REPEAT = 10_000  # Longest "text" * n or [list] * n repetition
+MAX_CONCAT_CELLS = 10_000_000  # concat() may build at most this many cells, or as many as the loaded tables hold
+
+# Plain functions available to expressions
+SAFE_FUNCTIONS = {
+    "len": len, "round": round, "abs": abs, "min": min, "max": max, "sum": sum,
+    "sorted": sorted, "list": list, "int": int, "float": float, "str": str, "bool": bool,
+    "to_datetime": pd.to_datetime, "to_numeric": pd.to_numeric, "concat": pd.concat,
+    "cut": pd.cut, "qcut": pd.qcut, "crosstab": pd.crosstab, "isnan": np.isnan,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Call, ast.Attribute, ast.Name, ast.Load, ast.Constant, ast.Subscript,
+    ast.Slice, ast.keyword,
+    ast.List, ast.Tuple, ast.Dict, ast.Set,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Not, ast.Invert, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.And, ast.Or, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+)
+
+class SandboxError(ValueError):
+    """Raised when a generated expression uses something the sandbox does not allow."""
+
+def check_expression(expression, names):
+    """
+    Parse an expression and verify it only uses allowed syntax, names and attributes.
+
+    Args:
+        expression: Python/pandas expression as text
+        names: Variable names the expression may refer to
+
+    Returns:
+        The parsed expression tree
+
+    Raises:
+        SandboxError: If the expression is not allowed
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise SandboxError(f"Not a valid expression: {e.msg}") from e
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise SandboxError(f"{type(node).__name__} is not allowed")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in SAFE_FUNCTIONS:
+            raise SandboxError(f"Unknown name: {node.id}")
+        if isinstance(node, ast.Attribute) and node.attr not in ALLOWED_ATTRIBUTES:
+            raise SandboxError(f"Attribute not allowed: {node.attr}")
+        if isinstance(node, ast.Call):
+            _check_function_arguments(node)
+        if isinstance(node, ast.BinOp):
+            _check_arithmetic(node)
+    return tree
+
+def _check_function_arguments(call):
+    """Reject string arguments that pandas would resolve to anything but a plain aggregation."""
+    func = call.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+
+    arguments = [keyword.value for keyword in call.keywords if keyword.arg in FUNCTION_KEYWORDS]
+    if name in AGGREGATING_METHODS:
+        arguments.extend(call.args[:1])
+        for keyword in call.keywords:
+            if keyword.arg in FUNCTION_KEYWORDS or keyword.arg in OPTION_KEYWORDS:
+                continue
+            value = keyword.value
+            # Named aggregation: groupby(...).agg(total=("column", "sum")); any other keyword value
+            # (agg(x="to_csv")) is checked whole, since pandas dispatches it as well
+            if isinstance(value, ast.Tuple) and len(value.elts) == 2:
+                value = value.elts[1]
+            arguments.append(value)
+    elif name in AGGFUNC_POSITIONS:
+        arguments.extend(call.args[AGGFUNC_POSITIONS[name]:AGGFUNC_POSITIONS[name] + 1])
+    elif name in JOIN_POSITIONS:
+        how = [keyword.value for keyword in call.keywords if keyword.arg == "how"]
+        how.extend(call.args[JOIN_POSITIONS[name]:JOIN_POSITIONS[name] + 1])
+        for value in how:
+            if not (isinstance(value, ast.Constant) and isinstance(value.value, str)) or value.value == "cross":
+                raise SandboxError('Joins must use how="left", "right", "inner" or "outer"')
+
+    for argument in arguments:
+        for function_name in _function_names(argument):
+            if function_name not in ALLOWED_AGGREGATIONS:
+                raise SandboxError(f"Aggregation not allowed: {function_name}")
+
+def _function_names(node):
+    """Yield the strings naming functions in an aggregation argument ("sum", ["sum", "max"], {"column": "sum"})."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        yield node.value
+    elif isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        for element in node.elts:
+            yield from _function_names(element)
+    elif isinstance(node, ast.Dict):
+        # Keys are column names; values name the functions
+        for value in node.values:
+            yield from _function_names(value)
+
+def _check_arithmetic(node):
+    """Bound powers and sequence repetition on constants."""
+    if isinstance(node.op, ast.Pow):
+        if _is_constant(node.right):
+            exponent = _number(node.right)
+            if exponent is None:
+                raise SandboxError("Constant exponents must be plain numbers")
+            if abs(exponent) > MAX_EXPONENT:
+                raise SandboxError(f"Exponents above {MAX_EXPONENT} are not allowed")
+        if _is_constant(node.left) and _number(node.left) is None:
+            raise SandboxError("Powers of computed constants are not allowed")
+    if isinstance(node.op, ast.Mult):
+        for sequence, count in ((node.left, node.right), (node.right, node.left)):
+            if _is_sequence(sequence):
+                repeat = _number(count)
+                if repeat is None or abs(repeat) > MAX_REPEAT:
+                    raise SandboxError(f"Repeating a sequence is limited to {MAX_REPEAT} constant times")
+
+def _number(node):
+    """Return the value of a numeric literal (optionally signed), or None."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _number(node.operand)
+        return None if value is None else (-value if isinstance(node.op, ast.USub) else value)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+    return None
+
+def _is_constant(node):
+    """True if a subtree refers to no names, so it is computed from literals alone."""
+    return not any(isinstance(child, ast.Name) for child in ast.walk(node))
+
+def _is_sequence(node):
+    return (
+        isinstance(node, (ast.List, ast.Tuple))
+        or isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes))
+    )
+
+def _bounded_concat(max_cells):
+    """Wrap pd.concat so it refuses to build more than max_cells cells (concat([df] * 10000) would exhaust memory)."""
+    def concat(objs, *args, **kwargs):
+        objs = list(objs.values()) if isinstance(objs, dict) else list(objs)
+        cells = sum(getattr(obj, "size", 0) for obj in objs)
+        if cells > max_cells:
+            raise SandboxError(f"concat() would build {cells:,} cells; the limit is {max_cells:,}")
+        return pd.concat(objs, *args, **kwargs)
+    return concat
+
+def string_constants(expression):
+    """
+    Return every string literal in an expression.
+
+    Used to find the columns an expression reads (table["column"]) so
+    on-disk tables only load those columns.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError:
+        return set()
+    return {node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str)}
+
+def reads_whole_tables(expression):
+    """
+    Tell whether an expression needs every column of the tables it uses.
+
+    Only expressions that reach tables through column subscripts
+    (df["score"], df[["name", "score"]], df.groupby("section")["score"])
+    can be run on tables reduced to the columns they name. Anything else
+    (df.nlargest(...), df[df["score"] > 75], df.shape, len(df),
+    df.describe()) returns or counts whole rows, so it needs all columns.
+
+    Args:
+        expression: Python/pandas expression as text
+
+    Returns:
+        True unless every table reference is a column subscript
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError:
+        return True
+
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == "df":
+            table = node
+        elif isinstance(node, ast.Name) and node.id == "dfs":
+            table = parents.get(node)
+            if not (isinstance(table, ast.Subscript) and table.value is node):
+                return True
+        else:
+            continue
+
+        user = parents.get(table)
+        if isinstance(user, ast.Attribute) and user.attr == "groupby":
+            # df.groupby(...)[columns]
+            call = parents.get(user)
+            user = parents.get(call) if isinstance(call, ast.Call) and call.func is user else None
+            table = call
+        if not (isinstance(user, ast.Subscript) and user.value is table and _names_columns(user.slice)):
+            return True
+    return False
+
+def _names_columns(node):
+    """True for a column name or a list of column names."""
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return bool(node.elts) and all(_names_columns(element) for element in node.elts)
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+def evaluate_expression(expression, dataframes):
+    """
+    Evaluate a generated pandas expression against the loaded dataframes.
+
+    The expression can refer to the tables as dfs["file.csv"] (or df when a
+    single table is loaded). Only whitelisted attributes and functions are
+    reachable and builtins are removed, so the expression cannot import
+    modules, touch files or run arbitrary code.
+
+    Args:
+        expression: Python/pandas expression as text
+        dataframes: Dictionary of table name -> DataFrame
+
+    Returns:
+        The computed value (DataFrame, Series or scalar)
+
+    Raises:
+        SandboxError: If the expression is not allowed
+    """
+    names = {"dfs": dict(dataframes)}
+    if len(dataframes) == 1:
+        names["df"] = next(iter(dataframes.values()))
+
+    tree = check_expression(expression, names)
+    code = compile(tree, "<analysis expression>", "eval")
+    concat = _bounded_concat(max(MAX_CONCAT_CELLS, sum(getattr(df, "size", 0) for df in dataframes.values())))
+    return eval(code, {"__builtins__": {}}, {**SAFE_FUNCTIONS, "concat": concat, **names})
+
+def format_result(value, max_rows=50, max_chars=4000):
+    """
+    Render a computed value as bounded text for the explanation prompt and the chat.
+
+    Args:
+        value: Result of evaluate_expression()
+        max_rows: Largest number of rows shown for tables and series
+        max_chars: Hard cap on the returned text
+
+    Returns:
+        Text rendering of the value
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        text = value.to_string(max_rows=max_rows)
+        if len(value) > max_rows:
+            text += f"\n... ({len(value)} rows in total)"
+    elif isinstance(value, (float, np.floating)):
+        text = f"{value:,.4f}".rstrip("0").rstrip(".")
+    else:
+        text = str(value)
+    return text if len(text) <= max_chars else text[:max_chars] + "\n... (truncated)"
@@ -0,0 +1,208 @@
+# modules/upload_store.py
+
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from contextlib import contextmanager
+from modules.index_cache import content_hash
+
+# Uploads larger than this are spooled to disk (override with TARA_SPOOL_THRESHOLD_MB)
+SPOOL_THRESHOLD_BYTES = int(float(os.getenv("TARA_SPOOL_THRESHOLD_MB", "32")) * 1024 * 1024)
+SPOOL_DIR = os.getenv("TARA_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "tara-uploads"))
+
+# Spooled files are shared by content hash; each is deleted when its last session releases it.
+# Ownership is only tracked within a process, so every process spools into its own subdirectory
+# of SPOOL_DIR and never deletes a file another server process is reading.
+_spool_owners = {}  # spool path -> set of session ids
+_spool_lock = threading.Lock()
+_process_dir = None  # (pid, this process's spool subdirectory)
+
+class MemoryviewReader(io.RawIOBase):
+    """Seekable read-only stream over a memoryview, so parsers can read uploads without copying them."""
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        size = min(len(target), len(self._buffer) - self._position)
+        if size <= 0:
+            return 0
+        target[:size] = self._buffer[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._buffer) + offset
+        self._position = max(0, self._position)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+class Upload:
+    """
+    An uploaded file's contents, held in memory or spooled to disk.
+
+    Attributes:
+        name: Original file name
+        suffix: Lowercase file extension, including the dot
+        buffer: Zero-copy memoryview over the uploaded bytes, or None once
+            the upload has been spooled to disk
+        file_hash: SHA-256 of the contents
+        size: Size of the contents in bytes
+        path: Spooled file path, or None if the upload is kept in memory only
+    """
+
+    def __init__(self, name, buffer, file_hash, path=None):
+        self.name = name
+        self.suffix = os.path.splitext(name)[1].lower()
+        self.buffer = buffer
+        self.file_hash = file_hash
+        self.size = buffer.nbytes
+        self.path = path
+
+    @property
+    def source(self):
+        """Path for spooled uploads, otherwise the in-memory buffer (both accepted by the PDF extractors)."""
+        return self.path if self.path else self.buffer
+
+    def open(self):
+        """Open a binary stream over the contents without copying them."""
+        if self.path:
+            return open(self.path, "rb")
+        return io.BufferedReader(MemoryviewReader(self.buffer))
+
+class UploadSession:
+    """
+    Tracks the files one user session has spooled to disk.
+
+    Spooled files are stored once per content hash and shared between
+    sessions. They are deleted when close() is called or when the session
+    object is garbage collected (Streamlit drops session state when a
+    session ends), once no other session still uses them.
+    """
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex
+        self._paths = set()
+        self._finalizer = weakref.finalize(self, _release, self.session_id, self._paths)
+
+    def read(self, uploaded_file):
+        """
+        Wrap an uploaded file without copying it, spooling it to disk if it is large.
+
+        Args:
+            uploaded_file: Streamlit UploadedFile (or any object with name and getvalue)
+
+        Returns:
+            Upload for the file's contents
+        """
+        if hasattr(uploaded_file, "getbuffer"):
+            buffer = uploaded_file.getbuffer()
+        else:
+            buffer = memoryview(uploaded_file.getvalue())
+
+        file_hash = content_hash(buffer)
+        upload = Upload(uploaded_file.name, buffer, file_hash)
+
+        if buffer.nbytes > SPOOL_THRESHOLD_BYTES:
+            upload.path = self._spool(buffer, file_hash, upload.suffix)
+            # Read from disk from now on rather than keeping a second copy in memory
+            upload.buffer = None
+            buffer.release()
+
+        return upload
+
+    def _spool(self, buffer, file_hash, suffix):
+        spool_dir = _spool_dir()
+        path = os.path.join(spool_dir, file_hash + suffix)
+
+        with _spool_lock:
+            if not os.path.exists(path):
+                # Write under a temporary name so other readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=spool_dir, prefix=".tmp-")
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(buffer)
+                os.replace(tmp_path, path)
+            _spool_owners.setdefault(path, set()).add(self.session_id)
+
+        self._paths.add(path)
+        return path
+
+    def close(self):
+        """Release this session's spooled files, deleting those no other session uses."""
+        _release(self.session_id, self._paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+@contextmanager
+def open_upload(uploaded_file, session=None):
+    """
+    Context manager yielding an Upload for a file.
+
+    Args:
+        uploaded_file: The uploaded file object
+        session: UploadSession that keeps spooled files until the user's
+            session ends; if None, any spooled file is deleted on exit
+
+    Yields:
+        Upload for the file's contents
+    """
+    if session is not None:
+        yield session.read(uploaded_file)
+        return
+
+    with UploadSession() as temporary_session:
+        yield temporary_session.read(uploaded_file)
+
+def _spool_dir():
+    """Return this process's spool subdirectory, creating it on first use."""
+    global _process_dir
+    pid = os.getpid()
+    with _spool_lock:
+        # Forked processes inherit the parent's value, so it is keyed by pid
+        if _process_dir is None or _process_dir[0] != pid:
+            os.makedirs(SPOOL_DIR, exist_ok=True)
+            # A random name rather than the pid, which can repeat across hosts sharing SPOOL_DIR
+            _process_dir = (pid, tempfile.mkdtemp(dir=SPOOL_DIR, prefix=f"{pid}-"))
+            atexit.register(_remove_spool_dir, *_process_dir)
+        return _process_dir[1]
+
+def _remove_spool_dir(pid, path):
+    # Forked children inherit atexit handlers; only the owning process removes its directory
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _release(session_id, paths):
+    with _spool_lock:
+        for path in paths:
+            owners = _spool_owners.get(path, set())
+            owners.discard(session_id)
+            if not owners:
+                _spool_owners.pop(path, None)
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        paths.clear()
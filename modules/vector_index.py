@@ -0,0 +1,206 @@
+# modules/vector_index.py
+
+import math
+import os
+import faiss
+import numpy as np
+
+# Index selection settings (override with environment variables)
+ANN_THRESHOLD = int(os.getenv("TARA_ANN_THRESHOLD", "20000"))  # vectors before switching away from exact search
+ANN_INDEX_TYPE = os.getenv("TARA_ANN_INDEX", "hnsw")  # "hnsw", "ivfpq" or "flat" (never switch)
+HNSW_M = int(os.getenv("TARA_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("TARA_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("TARA_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("TARA_IVF_NPROBE", "16"))
+PQ_BITS = 8
+IVF_RETRAIN_GROWTH = float(os.getenv("TARA_IVF_RETRAIN_GROWTH", "4"))  # retrain once the index grows this much
+
+# Fewest vectors an IVF-PQ index can be trained on (each PQ centroid needs a training point)
+MIN_IVFPQ_TRAINING = 2 ** PQ_BITS
+
+# Scalar quantizer per vector storage type; float32 keeps vectors uncompressed
+SCALAR_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+# int8 ranges are learned from the first vectors and widened by this fraction for later ones
+INT8_RANGE_MARGIN = 0.2
+
+def index_storage(index):
+    """Return "float32", "float16" or "int8" for the vectors held by a flat or HNSW index."""
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        for storage, qtype in SCALAR_QUANTIZERS.items():
+            if index.sq.qtype == qtype:
+                return storage
+    return "float32"
+
+def index_memory_bytes(index):
+    """Approximate memory held by an index: vector codes plus HNSW graph links."""
+    if isinstance(index, faiss.IndexHNSW):
+        links = faiss.vector_to_array(index.hnsw.neighbors).nbytes
+        return index_memory_bytes(faiss.downcast_index(index.storage)) + links
+    if isinstance(index, faiss.IndexIVF):
+        return index.ntotal * (index.code_size + 8)  # codes plus stored ids
+    return index.ntotal * index.sa_code_size()
+
+def index_kind(index):
+    """Return "flat", "hnsw" or "ivfpq" for a FAISS index."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+def choose_index_type(n_vectors, current="flat", index_type=ANN_INDEX_TYPE, threshold=ANN_THRESHOLD):
+    """
+    Pick the index type for a corpus of a given size.
+
+    An approximate index is kept until the corpus falls below half the
+    threshold, so removing one document near the threshold does not flip
+    the index back and forth.
+
+    Args:
+        n_vectors: Number of vectors the index will hold
+        current: Kind of the index currently in use
+        index_type: Approximate index to use above the threshold
+        threshold: Vector count at which exact search stops being worthwhile
+
+    Returns:
+        "flat", "hnsw" or "ivfpq"
+    """
+    if current != "flat" and n_vectors >= threshold / 2:
+        threshold = 0
+    if index_type == "flat" or n_vectors < threshold:
+        return "flat"
+    if index_type == "ivfpq" and n_vectors < MIN_IVFPQ_TRAINING:
+        return "hnsw"
+    return index_type
+
+def new_index(d, kind="flat", storage="float32", training_vectors=None):
+    """
+    Create an empty FAISS index, trained if its kind or storage needs it.
+
+    Args:
+        d: Vector dimension
+        kind: "flat", "hnsw" or "ivfpq"
+        storage: "float32", "float16" or "int8" vectors (IVF-PQ always stores PQ codes)
+        training_vectors: Sample of the vectors the index will hold; required
+            for IVF-PQ and int8 storage
+
+    Returns:
+        Empty FAISS index
+    """
+    if storage != "float32" and storage not in SCALAR_QUANTIZERS:
+        raise ValueError(f"Unknown vector storage: {storage}")
+
+    if kind == "flat":
+        if storage == "float32":
+            index = faiss.IndexFlatL2(d)
+        else:
+            index = faiss.IndexScalarQuantizer(d, SCALAR_QUANTIZERS[storage], faiss.METRIC_L2)
+    elif kind == "hnsw":
+        if storage == "float32":
+            index = faiss.IndexHNSWFlat(d, HNSW_M)
+        else:
+            index = faiss.IndexHNSWSQ(d, SCALAR_QUANTIZERS[storage], HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif kind == "ivfpq":
+        n = len(training_vectors)
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(d), d, nlist, _pq_subquantizers(d), PQ_BITS)
+    else:
+        raise ValueError(f"Unknown index type: {kind}")
+
+    if not index.is_trained:
+        if storage == "int8" and kind != "ivfpq":
+            quantizer = index.sq if kind == "flat" else faiss.downcast_index(index.storage).sq
+            quantizer.rangestat = faiss.ScalarQuantizer.RS_minmax
+            quantizer.rangestat_arg = INT8_RANGE_MARGIN
+        index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+    return index
+
+def build_index(vectors, kind, storage="float32"):
+    """
+    Build a FAISS index of the given kind holding the vectors, in order.
+
+    IVF-PQ indexes are trained on the vectors themselves, with the number of
+    lists scaled to the corpus size.
+
+    Args:
+        vectors: float32 array of shape (n, d)
+        kind: "flat", "hnsw" or "ivfpq"
+        storage: "float32", "float16" or "int8" vectors
+
+    Returns:
+        FAISS index with search parameters applied
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = new_index(vectors.shape[1], kind, storage, vectors)
+    index.add(vectors)
+    if kind == "ivfpq":
+        index.make_direct_map()  # needed to reconstruct vectors for migration and prefiltered search
+    configure_search(index)
+    return index
+
+def configure_search(index, ef_search=None, nprobe=None):
+    """
+    Apply the recall/latency trade-off to an approximate index.
+
+    Higher efSearch (HNSW) or nprobe (IVF) improves recall at the cost of
+    latency; exact indexes are left unchanged.
+
+    Args:
+        index: FAISS index
+        ef_search: HNSW candidate list size, defaults to HNSW_EF_SEARCH
+        nprobe: IVF lists visited per query, defaults to IVF_NPROBE
+    """
+    kind = index_kind(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = ef_search or HNSW_EF_SEARCH
+    elif kind == "ivfpq":
+        index.nprobe = min(nprobe or IVF_NPROBE, index.nlist)
+
+def rebuild_index(index, positions=None, vectors=None):
+    """
+    Rebuild an index keeping only the vectors at the given positions, in order.
+
+    Used for removal, since HNSW cannot remove vectors and IVF would keep the
+    old ids. The existing structure (and IVF training) is reused.
+
+    Args:
+        index: FAISS index
+        positions: Positions to keep, or None to keep all
+        vectors: The original vectors at every position of the index, used
+            instead of reconstructing them (which is lossy for IVF-PQ)
+
+    Returns:
+        New FAISS index
+    """
+    if vectors is None:
+        vectors = reconstruct_all(index)
+    if positions is not None:
+        vectors = vectors[np.asarray(positions, dtype=np.int64)]
+
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    if len(vectors):
+        rebuilt.add(vectors)
+    if index_kind(rebuilt) == "ivfpq":
+        rebuilt.make_direct_map()
+    configure_search(rebuilt)
+    return rebuilt
+
+def reconstruct_all(index):
+    """Return every vector stored in an index (approximate for IVF-PQ)."""
+    if not index.ntotal:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+def _pq_subquantizers(d):
+    """Largest number of PQ sub-quantizers that divides d with at least 4 dimensions each."""
+    for m in range(max(1, d // 4), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
@@ -1,75 +1,313 @@
 # modules/voice_processor.py
 
 import os
+import re
+import time
 import streamlit as st
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from elevenlabs import VoiceSettings
 from elevenlabs.client import ElevenLabs
+from modules import metrics
+from modules.audio_cache import AUDIO_CACHE, audio_key, get_audio_cache
+
+# Voice settings (override with environment variables)
+TTS_STREAMING = os.getenv("TARA_TTS_STREAMING", "1") == "1"  # Speak answers sentence by sentence while they are generated
+TTS_WORKERS = int(os.getenv("TARA_TTS_WORKERS", "3"))  # Sentences synthesized concurrently
+TTS_MAX_CHARS = int(os.getenv("TARA_TTS_MAX_CHARS", "5000"))  # Longest text sent in one request (ElevenLabs' limit)
+TTS_MIN_CHARS = int(os.getenv("TARA_TTS_MIN_CHARS", "80"))  # Short sentences are merged up to this length per request
+TTS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL")  # e.g. http://127.0.0.1:8765 for benchmarks/stub_tts_server.py
+OUTPUT_FORMAT = "mp3_22050_32"
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a line break (headings, list items)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_MARKDOWN = re.compile(r"```\w*|`|^\s*#+\s*|^\s*>\s?")
+# Paired emphasis markers only, so arithmetic such as 2*3 is still spoken
+_EMPHASIS = re.compile(r"(?<![\w*])(\*\*\*|\*\*|\*|__)(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+class SentenceSplitter:
+    """
+    Split text into pieces for speech synthesis as it arrives, token by token.
+
+    A piece is emitted once a sentence is complete and the piece is at least
+    min_chars long (short sentences are merged with the next), so each
+    request carries enough text to sound natural. No piece is longer than
+    max_chars; longer sentences are cut at whitespace.
+    """
+
+    def __init__(self, min_chars=TTS_MIN_CHARS, max_chars=TTS_MAX_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+        self.piece = ""
+
+    def feed(self, text):
+        """Add text and return the pieces completed by it."""
+        self.buffer += text
+        sentences = _SENTENCE_END.split(self.buffer)
+        # The last part may be an unfinished sentence
+        self.buffer = sentences.pop()
+        pieces = []
+        for sentence in sentences:
+            pieces.extend(self._add(sentence))
+        # An unfinished sentence can still outgrow a request
+        while len(self.buffer) > self.max_chars:
+            head, self.buffer = _cut(self.buffer, self.max_chars)
+            pieces.extend(self._add(head))
+        return pieces
+
+    def flush(self):
+        """Return the remaining text as pieces, once no more text will arrive."""
+        pieces = self._add(self.buffer)
+        self.buffer = ""
+        if self.piece:
+            pieces.append(self.piece)
+            self.piece = ""
+        return pieces
+
+    def _add(self, sentence):
+        sentence = _speakable(sentence)
+        if not sentence:
+            return []
+        pieces = []
+        joined = f"{self.piece} {sentence}" if self.piece else sentence
+        if len(joined) > self.max_chars:
+            if self.piece:
+                pieces.append(self.piece)
+            joined = sentence
+            while len(joined) > self.max_chars:
+                head, joined = _cut(joined, self.max_chars)
+                pieces.append(head)
+        if len(joined) >= self.min_chars:
+            pieces.append(joined)
+            self.piece = ""
+        else:
+            self.piece = joined
+        return pieces
+
+def split_for_speech(text, max_chars=TTS_MAX_CHARS, min_chars=TTS_MIN_CHARS):
+    """Split a complete text into pieces of at most max_chars characters, at sentence boundaries where possible."""
+    splitter = SentenceSplitter(min_chars=min_chars, max_chars=max_chars)
+    return splitter.feed(text) + splitter.flush()
+
+def _cut(text, max_chars):
+    """Cut text at the last whitespace before max_chars (or at max_chars if there is none)."""
+    cut = text.rfind(" ", 0, max_chars + 1)
+    if cut <= 0:
+        cut = max_chars
+    return text[:cut].strip(), text[cut:].lstrip()
+
+def _speakable(text):
+    """Drop markdown that would be read out literally (emphasis, code fence markers, headings, link targets)."""
+    text = _EMPHASIS.sub(r"\2", _LINK.sub(r"\1", text))
+    return " ".join(_MARKDOWN.sub("", text).split())
+
+def audio_seconds(audio, output_format=OUTPUT_FORMAT):
+    """Estimate an MP3 clip's duration from its size and the output format's bitrate (e.g. mp3_22050_32 is 32 kbps)."""
+    kbps = int(output_format.rsplit("_", 1)[-1])
+    return len(audio) * 8 / (kbps * 1000)
 
 class VoiceProcessor:
     """Class to handle text-to-speech conversion using Eleven Labs."""
-    
+
     def __init__(self):
         """Initialize the voice processor with Eleven Labs API."""
         # Check if API key is set
         api_key = os.getenv("ELEVENLABS_API_KEY")
         if api_key:
-            self.client = ElevenLabs(api_key=api_key)
+            self.client = ElevenLabs(api_key=api_key, base_url=TTS_BASE_URL) if TTS_BASE_URL else ElevenLabs(api_key=api_key)
             self.is_available = True
         else:
             self.client = None
             self.is_available = False
-            
+
         # Default voice settings
         self.voice_id = "pNInz6obpgDQGcFmaJgB"  # Adam voice
         self.model_id = "eleven_multilingual_v2"
+        self.output_format = OUTPUT_FORMAT
         self.voice_settings = VoiceSettings(
             stability=0.0,
             similarity_boost=1.0,
             style=0.0,
             use_speaker_boost=True,
         )
-    
+
+    def synthesize(self, text, previous_text=None):
+        """
+        Convert one piece of text (at most TTS_MAX_CHARS characters) to MP3 audio.
+
+        Clips are looked up in the audio cache first (keyed by the text, voice,
+        model, voice settings, output format and previous_text), so repeated
+        answers are only synthesized once.
+
+        Args:
+            text: Text to convert to speech
+            previous_text: Text spoken just before, so the voice carries its intonation over
+
+        Returns:
+            MP3 bytes
+
+        Raises:
+            Exception: Whatever the Eleven Labs client raises
+        """
+        cache = get_audio_cache() if AUDIO_CACHE else None
+        if cache is not None:
+            key = audio_key(text, self.voice_id, self.model_id, self.voice_settings, self.output_format, previous_text)
+            audio = cache.get(key)
+            if audio is not None:
+                return audio
+
+        start = time.perf_counter()
+        options = {"previous_text": previous_text} if previous_text else {}
+        response = self.client.text_to_speech.convert(
+            voice_id=self.voice_id,
+            output_format=self.output_format,
+            text=text,
+            model_id=self.model_id,
+            voice_settings=self.voice_settings,
+            **options,
+        )
+        audio = b"".join(chunk for chunk in response if chunk)
+        metrics.increment("tts.requests")
+        metrics.observe("tts.synthesis_seconds", time.perf_counter() - start)
+        if cache is not None:
+            cache.put(key, audio)
+        return audio
+
     def text_to_speech(self, text):
         """
         Convert text to speech using Eleven Labs API.
-        
+
+        Texts longer than TTS_MAX_CHARS are split at sentence boundaries and
+        the pieces are synthesized concurrently, then joined (MP3 frames
+        concatenate into one playable stream).
+
         Args:
             text: Text to convert to speech
-            
+
         Returns:
             BytesIO object containing the audio data, or None if conversion failed
         """
         if not self.is_available or not self.client:
             return None
-            
+
         try:
-            # Limit text length if needed (Eleven Labs has character limits)
-            if len(text) > 5000:  # adjust based on your API tier
-                text = text[:5000] + "..."
-                
-            # Perform the text-to-speech conversion
-            response = self.client.text_to_speech.convert(
-                voice_id=self.voice_id,
-                output_format="mp3_22050_32",
-                text=text,
-                model_id=self.model_id,
-                voice_settings=self.voice_settings,
-            )
-            
-            # Create a BytesIO object to hold the audio data
-            audio_stream = BytesIO()
-            
-            # Write each chunk of audio data to the stream
-            for chunk in response:
-                if chunk:
-                    audio_stream.write(chunk)
-                    
-            # Reset stream position to the beginning
-            audio_stream.seek(0)
-            
-            return audio_stream
-            
+            pieces = split_for_speech(text, min_chars=TTS_MAX_CHARS)
+            if not pieces:
+                return None
+            with ThreadPoolExecutor(max_workers=max(1, min(TTS_WORKERS, len(pieces)))) as executor:
+                clips = list(executor.map(self.synthesize, pieces, [None] + pieces[:-1]))
+            return BytesIO(b"".join(clips))
+
         except Exception as e:
             st.error(f"Error converting text to speech: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def speech_pipeline(self):
+        """Start speaking an answer sentence by sentence in the current container (see SpeechPipeline)."""
+        return SpeechPipeline(self)
+
+class SpeechPipeline:
+    """
+    Speak an answer while it is still being written.
+
+    Text is fed in as the LLM produces it. Each completed sentence (see
+    SentenceSplitter) is synthesized on a pool of TTS_WORKERS threads, so
+    later sentences are generated while earlier ones play. Clips are played
+    in order in one audio element: the next clip replaces the previous one
+    when the previous one should have finished. Once the answer is written
+    and every clip is synthesized, the element is replaced by the whole
+    answer's audio, starting where playback has got to, so the browser
+    plays the rest and the answer can be replayed.
+    """
+
+    def __init__(self, voice_processor, workers=TTS_WORKERS):
+        self.voice_processor = voice_processor
+        self.splitter = SentenceSplitter()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.placeholder = st.empty()
+        self.futures = []
+        self.previous_piece = None
+        self.clips = []
+        self.next_clip = 0
+        self.played_seconds = 0.0  # Audio handed to the player before the current clip
+        self.playing_since = 0.0
+        self.playing_until = 0.0
+        self.started = time.perf_counter()
+        self.failed = False
+
+    def feed(self, text):
+        """Add answer text; complete sentences are submitted for synthesis and ready clips start playing."""
+        for piece in self.splitter.feed(text):
+            self._submit(piece)
+        self.poll()
+
+    def poll(self):
+        """Play the next clip if it is synthesized and the previous one has finished. Never blocks."""
+        while (
+            self.next_clip < len(self.futures)
+            and self.futures[self.next_clip].done()
+            and time.perf_counter() >= self.playing_until
+        ):
+            self._play(self.futures[self.next_clip])
+
+    def finish(self):
+        """
+        Submit the rest of the text and hand the remaining audio to the browser.
+
+        Blocks only until the remaining clips are synthesized, never for
+        playback: the whole answer's audio replaces the current clip and
+        starts where playback has got to.
+        """
+        for piece in self.splitter.flush():
+            self._submit(piece)
+        self.executor.shutdown(wait=False)
+        unplayed = self.next_clip < len(self.futures)
+        while self.next_clip < len(self.futures):
+            self._collect(self.futures[self.next_clip])
+        if len(self.clips) > 1 or (unplayed and self.clips):
+            position = self._position()
+            playing = position < sum(self._seconds(clip) for clip in self.clips)
+            # start_time is whole seconds; rounding down repeats a moment rather than skipping one
+            self.placeholder.audio(
+                b"".join(self.clips), format="audio/mp3", start_time=int(position) if playing else 0, autoplay=playing
+            )
+
+    def _submit(self, piece):
+        self.futures.append(self.executor.submit(self.voice_processor.synthesize, piece, self.previous_piece))
+        self.previous_piece = piece
+
+    def _play(self, future):
+        clip = self._collect(future)
+        if clip is None:
+            return
+        self.placeholder.audio(clip, format="audio/mp3", autoplay=True)
+        self.played_seconds = self._position()
+        self.playing_since = time.perf_counter()
+        self.playing_until = self.playing_since + self._seconds(clip)
+
+    def _collect(self, future):
+        """Wait for the next clip and keep it; returns None (after reporting once) if synthesis failed."""
+        self.next_clip += 1
+        try:
+            clip = future.result()
+        except Exception as e:
+            if not self.failed:
+                st.error(f"Error converting text to speech: {str(e)}")
+                self.failed = True
+            return None
+        if not self.clips:
+            metrics.observe("tts.time_to_first_audio_seconds", time.perf_counter() - self.started)
+        self.clips.append(clip)
+        return clip
+
+    def _position(self):
+        """Seconds into the whole answer's audio that playback has reached."""
+        if not self.playing_until:
+            return 0.0
+        now = min(time.perf_counter(), self.playing_until)
+        return self.played_seconds + now - self.playing_since
+
+    def _seconds(self, clip):
+        return audio_seconds(clip, self.voice_processor.output_format)
@@ -0,0 +1,83 @@
+# tests/conftest.py
+
+import os
+import sys
+import zlib
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings, so tests never load a model."""
+
+    def __init__(self, dim=32):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+@pytest.fixture
+def embeddings():
+    return HashEmbeddings()
+
+class UploadedFile:
+    """Stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.size = len(data)
+        self.file_id = f"{name}-{id(self)}"
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+@pytest.fixture
+def make_upload():
+    """Build an UploadedFile from a name and str or bytes contents."""
+    def make(name, data):
+        return UploadedFile(name, data.encode("utf-8") if isinstance(data, str) else data)
+    return make
+
+@pytest.fixture
+def make_pdf():
+    """Build a minimal PDF with one line of text per page."""
+    def make(texts):
+        page_ids = [4 + 2 * i for i in range(len(texts))]
+        objects = {
+            1: "<< /Type /Catalog /Pages 2 0 R >>",
+            2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(texts)} >>",
+            3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        }
+        for page_id, text in zip(page_ids, texts):
+            stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+            objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>")
+            objects[page_id + 1] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+
+        pdf = b"%PDF-1.4\n"
+        offsets = {}
+        for number in sorted(objects):
+            offsets[number] = len(pdf)
+            pdf += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode("latin-1")
+        xref = len(pdf)
+        pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        pdf += "".join(f"{offsets[number]:010d} 00000 n \n" for number in sorted(objects)).encode()
+        pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        return pdf
+    return make
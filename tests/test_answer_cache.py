@@ -0,0 +1,81 @@
+# tests/test_answer_cache.py
+
+import contextlib
+from types import SimpleNamespace
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from modules import chat_handler
+from modules.answer_cache import AnswerCache
+from modules.knowledge_base import KnowledgeBase
+
+def test_lookup_matches_role_version_and_context():
+    cache = AnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], "student", ("kb", 1), "answer", ["a.pdf"])
+    cache.store([1.0, 0.0], "student", ("kb", 1), "follow-up answer", [], context="digest")
+
+    assert cache.lookup([0.99, 0.05], "student", ("kb", 1))["answer"] == "answer"
+    assert cache.lookup([1.0, 0.0], "student", ("kb", 1), "digest")["answer"] == "follow-up answer"
+    assert cache.lookup([1.0, 0.0], "student", ("kb", 1), "other") is None
+    assert cache.lookup([1.0, 0.0], "professor", ("kb", 1)) is None
+    assert cache.lookup([0.0, 1.0], "student", ("kb", 1)) is None
+    # A newer knowledge base version drops every older entry
+    assert cache.lookup([1.0, 0.0], "student", ("kb", 2)) is None
+    assert len(cache) == 0
+
+class FakeMemory:
+    memory_key = "chat_history"
+
+    def __init__(self):
+        self.history = []
+
+    def load_memory_variables(self, inputs):
+        return {self.memory_key: self.history}
+
+    def save_context(self, inputs, outputs):
+        self.history.append(("human", inputs["question"]))
+        self.history.append(("ai", outputs["answer"]))
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return self.embeddings.embed_query(text)
+
+@pytest.fixture
+def conversation(embeddings, monkeypatch):
+    counting = CountingEmbeddings(embeddings)
+    knowledge_base = KnowledgeBase(counting)
+    knowledge_base.add(FAISS.from_texts(["eigenvalues are roots of the characteristic polynomial"], embeddings),
+                       "hash", "linalg.pdf")
+    condensed = []
+    conversation = SimpleNamespace(
+        memory=FakeMemory(),
+        get_chat_history=lambda history: "\n".join(f"{who}: {text}" for who, text in history),
+        question_generator=SimpleNamespace(run=lambda question, chat_history: condensed.append(question) or "what are eigenvalues"),
+        retriever=knowledge_base.as_retriever(k=1),
+        rephrase_question=True,
+        condensed=condensed,
+    )
+    ui = SimpleNamespace(spinner=lambda text: contextlib.nullcontext(), caption=lambda text: None,
+                         write=lambda text: None, write_stream=lambda tokens: "".join(tokens))
+    monkeypatch.setattr(chat_handler, "st", ui)
+    monkeypatch.setattr(chat_handler, "get_answer_cache", lambda cache=AnswerCache(): cache)
+    monkeypatch.setattr(chat_handler, "stream_answer", lambda conversation, question, docs: iter(["roots"]))
+    return conversation
+
+def test_follow_ups_are_condensed_only_on_a_miss(conversation):
+    embeddings = conversation.retriever.knowledge_base.embeddings
+    assert chat_handler.stream_rag_response(conversation, "[role] what are eigenvalues", "what are eigenvalues", "student") == "roots"
+    assert conversation.condensed == []
+    assert embeddings.queries == ["what are eigenvalues"]  # Embedded once, for the cache and retrieval
+
+    chat_handler.stream_rag_response(conversation, "[role] and them?", "and them?", "student")
+    assert len(conversation.condensed) == 1
+    assert embeddings.queries[1:] == ["and them?", "what are eigenvalues"]
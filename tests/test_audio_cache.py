@@ -0,0 +1,62 @@
+# tests/test_audio_cache.py
+
+import os
+from modules.audio_cache import AudioCache, audio_key
+
+def clip(i, size=1000):
+    return bytes([i % 256]) * size
+
+def disk_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.name.endswith(".mp3"))
+
+def test_key_ignores_whitespace_but_not_voice_or_context():
+    settings = {"stability": 0.0}
+    key = audio_key("Hello  world.\n", "voice", "model", settings, "mp3_22050_32")
+    assert key == audio_key("Hello world.", "voice", "model", settings, "mp3_22050_32")
+    assert key != audio_key("Hello world.", "other", "model", settings, "mp3_22050_32")
+    assert key != audio_key("Hello world.", "voice", "model", settings, "mp3_22050_32", previous_text="Hi.")
+
+def test_memory_hit_returns_the_stored_object(tmp_path):
+    cache = AudioCache(str(tmp_path), memory_bytes=10_000, disk_bytes=10_000)
+    audio = clip(1)
+    cache.put("a", audio)
+    assert cache.get("a") is audio
+    assert cache.get("missing") is None
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(str(tmp_path), memory_bytes=2000, disk_bytes=100_000)
+    cache.put("a", clip(1))
+    cache.put("b", clip(2))
+    cache.get("a")
+    cache.put("c", clip(3))
+    assert set(cache._memory) == {"a", "c"}
+    # The evicted clip is still served from disk
+    assert cache.get("b") == clip(2)
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    AudioCache(str(tmp_path)).put("a", clip(1))
+    assert AudioCache(str(tmp_path)).get("a") == clip(1)
+
+def test_disk_tier_evicts_oldest_first(tmp_path):
+    cache = AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=3000)
+    for i in range(5):
+        cache.put(f"k{i}", clip(i))
+    assert sorted(name[:-4] for name in os.listdir(tmp_path)) == ["k2", "k3", "k4"]
+    assert cache.stats()["disk_bytes"] == 3000
+
+def test_disk_cap_holds_across_processes(tmp_path):
+    # Two caches over one directory stand in for two server processes
+    first = AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=5000)
+    second = AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=5000)
+    for i in range(20):
+        (first if i % 2 else second).put(f"k{i}", clip(i))
+        assert disk_bytes(tmp_path) <= 5000
+    assert sorted(os.listdir(tmp_path)) == [f"k{i}.mp3" for i in range(15, 20)]
+
+def test_clear_removes_every_clip(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    cache.put("a", clip(1))
+    AudioCache(str(tmp_path)).put("b", clip(2))
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert cache.get("a") is None
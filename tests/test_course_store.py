@@ -0,0 +1,64 @@
+# tests/test_course_store.py
+
+import threading
+import pytest
+from modules.course_store import Course
+from modules.tabular_analyzer import TabularAnalyzer
+
+@pytest.fixture(autouse=True)
+def hash_embeddings(monkeypatch, embeddings):
+    monkeypatch.setattr("modules.knowledge_base.get_embeddings", lambda: embeddings)
+
+def test_writer_requires_the_course_passcode():
+    course = Course("CS-101", passcode="secret")
+    assert course.writer("secret") is course.knowledge_base
+    with pytest.raises(PermissionError):
+        course.writer("guess")
+    with pytest.raises(PermissionError):
+        course.writer("")
+
+def test_first_professor_chooses_the_passcode():
+    course = Course("CS-102", passcode="")
+    course.writer("chosen")
+    with pytest.raises(PermissionError):
+        course.writer("other")
+    with pytest.raises(PermissionError):
+        course.reset("other")
+    course.reset("chosen")
+
+def test_reader_and_files_are_read_only():
+    course = Course("CS-103", passcode="secret")
+    course.files(writable=True)["abc"] = "notes.pdf"
+    reader = course.reader()
+    assert reader.read_only
+    for call in (lambda: reader.add(None, "key", "name"), lambda: reader.remove("abc"),
+                 lambda: reader.replace("abc", None, "key", "name")):
+        with pytest.raises(RuntimeError):
+            call()
+    files = course.files()
+    assert files["abc"] == "notes.pdf"
+    with pytest.raises(TypeError):
+        del files["abc"]
+
+def test_concurrent_loads_keep_every_table(make_upload):
+    analyzer = TabularAnalyzer()
+    uploads = [make_upload(f"t{i}.csv", f"a,b\n{i},x\n{i + 1},y\n") for i in range(16)]
+    errors = []
+
+    def load(upload):
+        try:
+            analyzer.load_file(upload)
+            for table in analyzer.tables().values():  # Snapshots stay iterable while others load
+                table.shape
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(upload,)) for upload in uploads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(analyzer.tables()) == sorted(upload.name for upload in uploads)
+    assert all(analyzer.profile(name)["rows"] == 2 for name in analyzer.tables())
@@ -0,0 +1,40 @@
+# tests/test_dataframe_loader.py
+
+import io
+import pandas as pd
+from modules import dataframe_loader
+from modules.dataframe_loader import read_table
+
+def load(csv, mode="compact"):
+    df, _ = read_table(io.BytesIO(csv.encode()), ".csv", mode)
+    return df
+
+def test_integers_keep_64_bits():
+    df = load("course,enrolled,fee\nA,200000,30000\nB,100,5\n")
+    assert df["enrolled"].dtype == "int64"
+    assert (df["enrolled"] * df["fee"]).iloc[0] == 6_000_000_000
+
+def test_exact_floats_are_downcast():
+    df = load("x,y\n0.5,0.1\n1.25,0.2\n")
+    assert df["x"].dtype == "float32"
+    assert df["y"].dtype == "float64"  # 0.1 does not survive float32
+
+def test_uniform_dates_are_parsed_across_chunks(monkeypatch):
+    monkeypatch.setattr(dataframe_loader, "CHUNK_ROWS", 2)
+    df = load("due,score\n2024-01-05,1\n2024-02-10,2\n2024-03-15,3\n2024-01-05,4\n")
+    assert pd.api.types.is_datetime64_any_dtype(df["due"])
+    assert df["due"].iloc[2] == pd.Timestamp("2024-03-15")
+    assert df["due"].notna().all()
+
+def test_mixed_date_formats_stay_text(monkeypatch):
+    monkeypatch.setattr(dataframe_loader, "CHUNK_ROWS", 2)
+    df = load("due,score\n2024-01-05,1\n2024-02-10,2\nJan 5 2024,3\n2024-03-15,4\n")
+    assert not pd.api.types.is_datetime64_any_dtype(df["due"])
+    assert df["due"].iloc[2] == "Jan 5 2024"
+    assert df["due"].notna().all()
+
+def test_repetitive_text_becomes_categorical_across_chunks(monkeypatch):
+    monkeypatch.setattr(dataframe_loader, "CHUNK_ROWS", 4)
+    df = load("section,score\nA,1\nA,2\nB,3\nB,4\nC,5\nA,6\n")
+    assert isinstance(df["section"].dtype, pd.CategoricalDtype)
+    assert list(df["section"]) == ["A", "A", "B", "B", "C", "A"]
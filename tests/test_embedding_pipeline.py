@@ -0,0 +1,26 @@
+# tests/test_embedding_pipeline.py
+
+import numpy as np
+from langchain.schema import Document
+from modules.embedding_pipeline import embed_into_vectorstore, embed_stream
+
+def _documents(n):
+    # Varying lengths, so length-sorted batches differ from input order
+    return [Document(page_content=f"chunk {i} " + "word " * (i % 7), metadata={"i": i}) for i in range(n)]
+
+def test_batches_keep_each_chunk_with_its_vector(embeddings):
+    documents = _documents(25)
+    store, stats = embed_into_vectorstore(documents, embeddings, batch_size=4, workers=4)
+
+    assert stats["chunks"] == 25 and store.index.ntotal == 25
+    for position, doc_id in store.index_to_docstore_id.items():
+        doc = store.docstore.search(doc_id)
+        assert np.allclose(store.index.reconstruct(position), embeddings.embed_query(doc.page_content))
+
+def test_embed_stream_consumes_a_generator_in_windows(embeddings):
+    store, stats = embed_stream(iter(_documents(10)), embeddings, window_size=3)
+    assert stats["chunks"] == 10 and store.index.ntotal == 10
+
+def test_embed_stream_of_nothing(embeddings):
+    store, stats = embed_stream(iter([]), embeddings)
+    assert store is None and stats["chunks"] == 0
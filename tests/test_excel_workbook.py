@@ -0,0 +1,95 @@
+# tests/test_excel_workbook.py
+
+import io
+import os
+import pytest
+from openpyxl import Workbook
+from modules import excel_workbook, table_store
+from modules.excel_workbook import ExcelWorkbook
+from modules.tabular_analyzer import TabularAnalyzer
+from modules.upload_store import open_upload
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_store, "TABLE_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(excel_workbook, "TABLE_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+def make_xlsx(sheets):
+    """Build an .xlsx file from {sheet name: list of rows}, the first row being the header."""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+GRADES = {
+    "Midterm": [["name", "score"], ["Ann", 90], ["Bob", 70]],
+    "Final_Exam": [["name", "score"], ["Ann", 85], [None, None], ["Bob", 75], ["Cy", 60]],
+}
+
+def open_workbook(make_upload, sheets=GRADES, name="grades.xlsx"):
+    with open_upload(make_upload(name, make_xlsx(sheets))) as upload:
+        return ExcelWorkbook(upload)
+
+def test_lists_sheets_without_parsing_them(make_upload, store_dir):
+    workbook = open_workbook(make_upload)
+    assert workbook.sheet_names == ["Midterm", "Final_Exam"]
+    assert not any(path.suffix == ".parquet" for path in store_dir.iterdir())
+
+def test_table_names(make_upload):
+    workbook = open_workbook(make_upload)
+    assert workbook.table_name("Midterm") == "grades.xlsx [Midterm]"
+    single = open_workbook(make_upload, {"Sheet1": [["a"], [1]]}, name="single.xlsx")
+    assert single.table_name("Sheet1") == "single.xlsx"
+
+def test_sheets_mentioned_ignores_case_and_separators(make_upload):
+    workbook = open_workbook(make_upload)
+    assert workbook.sheets_mentioned("What was the average on the final exam?") == ["Final_Exam"]
+    assert workbook.sheets_mentioned("Compare the MIDTERM and final-exam") == ["Midterm", "Final_Exam"]
+    assert workbook.sheets_mentioned("How many students?") == []
+
+def test_load_sheet_skips_blank_rows_and_caches(make_upload, monkeypatch):
+    workbook = open_workbook(make_upload)
+    df, report = workbook.load_sheet("Final_Exam")
+    assert list(df["name"]) == ["Ann", "Bob", "Cy"]
+    assert df["score"].sum() == 220
+    assert report is not None
+
+    # The second load reads the Parquet copy and never opens the Excel file
+    monkeypatch.setattr(ExcelWorkbook, "_iter_sheet_frames", lambda self, sheet: pytest.fail("sheet parsed again"))
+    cached, report = workbook.load_sheet("Final_Exam")
+    assert report is None
+    assert list(cached["name"]) == ["Ann", "Bob", "Cy"]
+
+def test_reopening_reads_the_sheet_list_from_the_store(make_upload, monkeypatch):
+    open_workbook(make_upload)
+    monkeypatch.setattr(ExcelWorkbook, "_store_copy", lambda self, upload: None)
+    os.remove(open_workbook(make_upload).path)
+    assert open_workbook(make_upload).sheet_names == ["Midterm", "Final_Exam"]
+
+def test_sheet_is_read_in_chunks(make_upload, monkeypatch):
+    monkeypatch.setattr(excel_workbook, "CHUNK_ROWS", 2)
+    rows = [["section", "score"]] + [["A" if i % 2 else "B", i] for i in range(7)]
+    workbook = open_workbook(make_upload, {"Scores": rows}, name="scores.xlsx")
+    df, _ = workbook.load_sheet("Scores")
+    assert len(df) == 7
+    assert list(df["score"]) == list(range(7))
+
+def test_column_names_match_read_excel():
+    assert excel_workbook._column_names(["a", None, "a", "b", "a"]) == ["a", "Unnamed: 1", "a.1", "b", "a.2"]
+
+def test_analyzer_loads_named_sheets_on_demand(make_upload):
+    analyzer = TabularAnalyzer()
+    analyzer.load_file(make_upload("grades.xlsx", make_xlsx(GRADES)))
+    assert list(analyzer.tables()) == ["grades.xlsx [Midterm]"]
+    assert analyzer.unloaded_sheets() == ["grades.xlsx [Final_Exam]"]
+
+    tables = analyzer.tables_for("What is the highest final exam score?")
+    assert set(tables) == {"grades.xlsx [Midterm]", "grades.xlsx [Final_Exam]"}
+    assert tables["grades.xlsx [Final_Exam]"]["score"].max() == 85
+    assert analyzer.unloaded_sheets() == []
@@ -0,0 +1,48 @@
+# tests/test_index_cache.py
+
+import os
+from langchain_community.vectorstores import FAISS
+from modules import index_cache
+from modules.index_cache import IndexCacheWriter, cache_key, content_hash, load_cached_vectorstore, save_vectorstore
+
+def test_content_hash_depends_only_on_bytes():
+    assert content_hash(b"lecture notes") == content_hash(bytearray(b"lecture notes"))
+    assert content_hash(b"lecture notes") != content_hash(b"lecture notes v2")
+
+def test_cache_key_covers_indexing_parameters():
+    file_hash = content_hash(b"pdf")
+    key = cache_key(file_hash, chunk_size=1000, chunk_overlap=200, embedding_model="m")
+    assert key == cache_key(file_hash, embedding_model="m", chunk_overlap=200, chunk_size=1000)
+    assert key != cache_key(file_hash, chunk_size=500, chunk_overlap=200, embedding_model="m")
+    assert key != cache_key(content_hash(b"other"), chunk_size=1000, chunk_overlap=200, embedding_model="m")
+
+def test_round_trip_renames_source(tmp_path, monkeypatch, embeddings):
+    monkeypatch.setattr(index_cache, "CACHE_DIR", str(tmp_path))
+    store = FAISS.from_texts(["first chunk", "second chunk"], embeddings, metadatas=[{"source": "old.pdf"}] * 2)
+    key = cache_key(content_hash(b"pdf"), chunk_size=1000)
+
+    assert load_cached_vectorstore(key, embeddings) is None
+    save_vectorstore(key, store)
+    loaded = load_cached_vectorstore(key, embeddings, source_name="new.pdf")
+
+    assert loaded.index.ntotal == 2
+    assert {doc.metadata["source"] for doc in loaded.docstore._dict.values()} == {"new.pdf"}
+
+def test_entries_written_in_parts(tmp_path, monkeypatch, embeddings):
+    monkeypatch.setattr(index_cache, "CACHE_DIR", str(tmp_path))
+    key = cache_key(content_hash(b"pdf"), chunk_size=1000)
+
+    aborted = IndexCacheWriter(key)
+    aborted.append(FAISS.from_texts(["partial"], embeddings))
+    aborted.abort()
+    assert load_cached_vectorstore(key, embeddings) is None
+    assert os.listdir(tmp_path) == []
+
+    writer = IndexCacheWriter(key)
+    writer.append(FAISS.from_texts(["first chunk", "second chunk"], embeddings))
+    writer.append(FAISS.from_texts(["third chunk"], embeddings))
+    writer.commit()
+    writer.abort()
+    loaded = load_cached_vectorstore(key, embeddings)
+    assert loaded.index.ntotal == 3
+    assert {doc.page_content for doc in loaded.docstore._dict.values()} == {"first chunk", "second chunk", "third chunk"}
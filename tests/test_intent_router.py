@@ -0,0 +1,59 @@
+# tests/test_intent_router.py
+
+import json
+import os
+import pytest
+from modules.intent_router import ANALYSIS, DOCUMENTS, ROUTER_RULE_CONFIDENCE, route_question
+
+CASES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "routing_queries.jsonl")
+
+def load_cases(split="all"):
+    with open(CASES_PATH) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    return [case for case in cases if split == "all" or case["split"] == split]
+
+class FixedClassifier:
+    """Answers every question the same way and records what it was asked."""
+
+    def __init__(self, intent=DOCUMENTS, confidence=0.0):
+        self.intent = intent
+        self.confidence = confidence
+        self.asked = []
+
+    def classify(self, question):
+        self.asked.append(question)
+        return self.intent, self.confidence
+
+def rules_only(question):
+    return route_question(question, classifier=FixedClassifier())
+
+@pytest.mark.parametrize("case", load_cases(), ids=lambda case: case["question"])
+def test_rules_are_never_confidently_wrong(case):
+    # A wrong intent is only acceptable when the rules leave the decision to the classifier
+    route = rules_only(case["question"])
+    assert route.intent == case["intent"] or route.confidence < ROUTER_RULE_CONFIDENCE
+
+@pytest.mark.parametrize("split, minimum", [("tuning", 0.9), ("heldout", 0.8)])
+def test_rule_accuracy(split, minimum):
+    cases = load_cases(split)
+    correct = sum(rules_only(case["question"]).intent == case["intent"] for case in cases)
+    assert correct / len(cases) >= minimum
+
+@pytest.mark.parametrize("question", [
+    "Explain how to compute the variance of a random variable",
+    "What is the mean of the normal distribution?",
+    "standard deviation formula from the slides",
+    "average case complexity of quicksort",
+    "What is the worst case running time of the median of medians algorithm?",
+])
+def test_concept_words_next_to_a_metric_defer_to_the_classifier(question):
+    classifier = FixedClassifier(DOCUMENTS, 0.9)
+    route = route_question(question, classifier=classifier)
+    assert classifier.asked == [question]
+    assert route == (DOCUMENTS, 0.9, "classifier")
+
+def test_clear_analysis_questions_skip_the_classifier():
+    classifier = FixedClassifier(DOCUMENTS, 0.99)
+    route = route_question("Calculate the variance of the exam scores", classifier=classifier)
+    assert classifier.asked == []
+    assert route == (ANALYSIS, 0.95, "rules")
@@ -0,0 +1,33 @@
+# tests/test_kb_snapshot.py
+
+import shutil
+import pytest
+from langchain_community.vectorstores import FAISS
+from modules import kb_snapshot
+from modules.kb_snapshot import SnapshotKnowledgeBase, publish_snapshot
+from modules.knowledge_base import KnowledgeBase
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch, embeddings):
+    monkeypatch.setattr(kb_snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    knowledge_base = KnowledgeBase(embeddings)
+    store = FAISS.from_texts(["alpha beta", "gamma delta"], embeddings, metadatas=[{"source": "a.pdf"}] * 2)
+    knowledge_base.add(store, "hash-a", "a.pdf")
+    return knowledge_base
+
+def test_new_versions_are_reloaded(knowledge_base, embeddings):
+    publish_snapshot(knowledge_base, "course")
+    snapshot = SnapshotKnowledgeBase("course", embeddings=embeddings, poll_seconds=0)
+    assert snapshot.version == 1
+    publish_snapshot(knowledge_base, "course")
+    assert snapshot.version == 2
+    assert snapshot.search("alpha", k=1, mode="dense")[0].page_content == "alpha beta"
+
+def test_pruned_version_keeps_the_loaded_one(knowledge_base, embeddings, tmp_path):
+    publish_snapshot(knowledge_base, "course")
+    snapshot = SnapshotKnowledgeBase("course", embeddings=embeddings, poll_seconds=0)
+    publish_snapshot(knowledge_base, "course")
+    # Another process pruned version 2 before this one could open it
+    shutil.rmtree(tmp_path / "course" / "v000002")
+    assert snapshot.version == 1
+    assert snapshot.search("alpha", k=1, mode="dense")[0].page_content == "alpha beta"
@@ -0,0 +1,84 @@
+# tests/test_knowledge_base.py
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from modules.knowledge_base import KnowledgeBase
+from modules.vector_index import index_kind, reconstruct_all
+
+def make_store(embeddings, texts, name):
+    return FAISS.from_texts(texts, embeddings, metadatas=[{"source": name} for _ in texts])
+
+def sources_found(knowledge_base, query, k=10):
+    return {doc.metadata["source"] for doc in knowledge_base.search(query, k=k, mode="dense")}
+
+def test_add_keeps_the_source_store_intact(embeddings):
+    store = make_store(embeddings, ["eigenvalues of a matrix", "gradient descent"], "linalg.pdf")
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(store, "hash-a", "linalg.pdf")
+    assert store.index.ntotal == 2
+    assert knowledge_base.vectorstore.index.ntotal == 2
+    assert knowledge_base.sources["hash-a"]["name"] == "linalg.pdf"
+    assert knowledge_base.search("eigenvalues matrix", k=1, mode="dense")[0].page_content == "eigenvalues of a matrix"
+
+def test_remove_drops_only_that_source(embeddings):
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(make_store(embeddings, ["eigenvalues of a matrix"], "a.pdf"), "hash-a", "a.pdf")
+    knowledge_base.add(make_store(embeddings, ["gradient descent steps", "learning rate"], "b.pdf"), "hash-b", "b.pdf")
+    version = knowledge_base.version
+
+    assert knowledge_base.remove("hash-a")
+    assert not knowledge_base.remove("hash-a")
+    assert knowledge_base.version > version
+    assert knowledge_base.vectorstore.index.ntotal == 2
+    assert sources_found(knowledge_base, "eigenvalues matrix") == {"b.pdf"}
+    assert knowledge_base.search("eigenvalues", k=4, mode="hybrid")[0].metadata["source"] == "b.pdf"
+
+def test_replace_swaps_versions(embeddings):
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(make_store(embeddings, ["old syllabus"], "syllabus v1"), "hash-1", "syllabus.pdf")
+    knowledge_base.replace("hash-1", make_store(embeddings, ["new syllabus", "office hours"], "syllabus v2"),
+                           "hash-2", "syllabus.pdf")
+    assert list(knowledge_base.sources) == ["hash-2"]
+    assert sources_found(knowledge_base, "syllabus") == {"syllabus v2"}
+
+def test_windows_of_one_source_accumulate(embeddings):
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(make_store(embeddings, ["page one"], "a.pdf"), "hash-a", "a.pdf")
+    knowledge_base.add(make_store(embeddings, ["page two"], "a.pdf"), "hash-a", "a.pdf")
+    assert len(knowledge_base.sources["hash-a"]["ids"]) == 2
+    knowledge_base.remove("hash-a")
+    assert knowledge_base.search("page", mode="dense") == []
+
+def test_ivfpq_retrains_and_migrates_from_original_vectors(embeddings, monkeypatch):
+    monkeypatch.setattr("modules.knowledge_base.choose_index_type",
+                        lambda n_vectors, current: "ivfpq" if n_vectors >= 300 else "flat")
+    monkeypatch.setattr("modules.knowledge_base.IVF_RETRAIN_GROWTH", 1.2)
+    rng = np.random.default_rng(0)
+    batches = [rng.standard_normal((n, embeddings.dim)).astype(np.float32) for n in (320, 200)]
+    knowledge_base = KnowledgeBase(embeddings)
+    for number, vectors in enumerate(batches):
+        store = FAISS.from_embeddings([(f"chunk {number}-{i}", vector) for i, vector in enumerate(vectors)], embeddings)
+        knowledge_base.add(store, f"hash-{number}", f"{number}.pdf")
+        assert index_kind(knowledge_base.vectorstore.index) == "ivfpq"
+    assert knowledge_base._trained_size == 520  # Retrained after growing past 1.2x
+
+    # Back below the threshold, the flat index holds the original vectors, not PQ approximations
+    knowledge_base.remove("hash-0")
+    assert index_kind(knowledge_base.vectorstore.index) == "flat"
+    assert np.array_equal(reconstruct_all(knowledge_base.vectorstore.index), batches[1])
+
+def test_prefiltered_candidates_are_scored_exactly_on_ivfpq(embeddings, monkeypatch):
+    monkeypatch.setattr("modules.knowledge_base.choose_index_type",
+                        lambda n_vectors, current: "ivfpq" if n_vectors >= 300 else "flat")
+    vectors = np.random.default_rng(1).standard_normal((320, embeddings.dim)).astype(np.float32)
+    store = FAISS.from_embeddings([(f"chunk {i}", vector) for i, vector in enumerate(vectors)], embeddings)
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(store, "hash-0", "0.pdf")
+    assert index_kind(knowledge_base.vectorstore.index) == "ivfpq"
+
+    id_map = knowledge_base.vectorstore.index_to_docstore_id
+    candidates = {id_map[i] for i in range(0, 320, 4)}
+    query = vectors[0] + 0.5
+    ranking = knowledge_base._dense_search("", 80, candidates, query)
+    exact = sorted(range(0, 320, 4), key=lambda i: ((vectors[i] - query) ** 2).sum())
+    assert ranking == [id_map[i] for i in exact]
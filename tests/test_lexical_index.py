@@ -0,0 +1,52 @@
+# tests/test_lexical_index.py
+
+from langchain_community.vectorstores import FAISS
+from modules.knowledge_base import KnowledgeBase, reciprocal_rank_fusion
+from modules.lexical_index import BM25Index, tokenize
+
+def test_tokenize_keeps_codes_and_numbers_together():
+    assert tokenize("See Theorem 3.2.1 in CS-101, x_i.") == ["see", "theorem", "3.2.1", "in", "cs-101", "x_i"]
+
+def test_bm25_ranks_rarer_and_more_frequent_terms_higher():
+    index = BM25Index()
+    index.add("a", "the lecture covers sorting")
+    index.add("b", "the lecture covers quicksort quicksort pivots")
+    index.add("c", "the lecture covers heaps")
+    ranking = [doc_id for doc_id, _ in index.search("quicksort lecture", 3)]
+    assert ranking[0] == "b"
+    assert set(ranking) == {"a", "b", "c"}
+    assert index.search("unknown", 3) == []
+
+def test_bm25_remove_and_readd():
+    index = BM25Index()
+    index.add("a", "cs-101 syllabus")
+    index.add("b", "cs-102 syllabus")
+    index.remove("a")
+    index.remove("missing")
+    assert len(index) == 1
+    assert "cs-101" not in index.postings
+    assert index.total_length == 2
+    index.add("b", "cs-103")  # Re-adding replaces the old text
+    assert [doc_id for doc_id, _ in index.search("syllabus", 5)] == []
+    assert index.search("cs-103", 5)[0][0] == "b"
+
+def test_candidates_only_for_rare_terms():
+    index = BM25Index()
+    for i in range(40):
+        index.add(str(i), f"chapter notes {i}")
+    index.add("code", "chapter notes cs-101")
+    assert index.candidates("cs-101 notes", max_candidates=10) == {"code"}
+    assert index.candidates("chapter notes", max_candidates=10) is None
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["d", "b", "e"]], k=60)
+    assert fused[0] == "b"  # Second in both rankings beats first in only one
+    assert set(fused[1:3]) == {"a", "d"}
+    assert set(fused[3:]) == {"c", "e"}
+
+def test_hybrid_search_finds_exact_codes(embeddings):
+    texts = [f"general notes about topic {word}" for word in ("graphs", "trees", "sorting", "hashing")]
+    texts.append("homework for MATH-2210 is due friday")
+    knowledge_base = KnowledgeBase(embeddings)
+    knowledge_base.add(FAISS.from_texts(texts, embeddings), "hash", "notes.pdf")
+    assert knowledge_base.search("when is MATH-2210 due", k=1, mode="hybrid")[0].page_content == texts[-1]
@@ -0,0 +1,64 @@
+# tests/test_pdf_extractors.py
+
+import os
+import pytest
+from modules import pdf_extractors
+from modules.pdf_extractors import PdfExtractor, PyPdfExtractor, get_extractor
+
+def test_extractor_methods_are_abstract():
+    with pytest.raises(TypeError):
+        PdfExtractor()
+
+def test_pypdf_reads_paths_and_memoryviews(tmp_path, make_pdf):
+    data = make_pdf(["alpha", "beta", "gamma"])
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(data)
+    extractor = PyPdfExtractor()
+    for source in (str(path), memoryview(data)):
+        assert extractor.page_count(source) == 3
+        assert [text.strip() for text in extractor.read_range(source, 1, 3)] == ["beta", "gamma"]
+
+def test_iter_pages_splits_into_ranges(monkeypatch, make_pdf):
+    monkeypatch.setattr(pdf_extractors, "EXTRACT_RANGE_PAGES", 2)
+    texts = [f"page{i}" for i in range(5)]
+    pages = list(PyPdfExtractor().iter_pages(memoryview(make_pdf(texts)), "notes.pdf", workers=1))
+    assert [page.page_content.strip() for page in pages] == texts
+    assert [page.metadata for page in pages][-1] == {"source": "notes.pdf", "page": 4, "total_pages": 5}
+
+def test_in_memory_pdfs_are_extracted_in_parallel(monkeypatch, make_pdf):
+    monkeypatch.setattr(pdf_extractors, "EXTRACT_RANGE_PAGES", 2)
+    paths = []
+    extract = pdf_extractors._extract_parallel
+
+    def recording(backend, path, ranges, workers):
+        paths.append(path)
+        return extract(backend, path, ranges, workers)
+
+    monkeypatch.setattr(pdf_extractors, "_extract_parallel", recording)
+    texts = [f"page{i}" for i in range(5)]
+    pages = list(PyPdfExtractor().iter_pages(memoryview(make_pdf(texts)), "notes.pdf", workers=2))
+    assert [page.page_content.strip() for page in pages] == texts
+    # The workers read a temporary copy, removed once extraction is done
+    assert len(paths) == 1 and not os.path.exists(paths[0])
+
+def test_extraction_opens_the_pdf_once(monkeypatch, make_pdf):
+    monkeypatch.setattr(pdf_extractors, "EXTRACT_RANGE_PAGES", 2)
+    extractor = PyPdfExtractor()
+    opened = []
+    reader = extractor._reader
+
+    def counting(source):
+        if not hasattr(source, "pages"):
+            opened.append(source)
+        return reader(source)
+
+    monkeypatch.setattr(extractor, "_reader", counting)
+    pages = list(extractor.iter_pages(memoryview(make_pdf([f"page{i}" for i in range(5)])), "notes.pdf", workers=1))
+    assert len(pages) == 5
+    assert len(opened) == 1
+
+def test_get_extractor_falls_back_to_pypdf(monkeypatch):
+    monkeypatch.setattr(pdf_extractors, "_import_pymupdf", lambda: None)
+    assert isinstance(get_extractor("auto"), PyPdfExtractor)
+    with pytest.raises(ValueError):
+        get_extractor("unknown")
@@ -0,0 +1,71 @@
+# tests/test_pdf_processor.py
+
+from types import SimpleNamespace
+import pytest
+from langchain_community.vectorstores import FAISS
+from modules import index_cache, pdf_processor
+from modules.pdf_extractors import PyPdfExtractor
+from modules.knowledge_base import KnowledgeBase
+from modules.pdf_processor import attach_to_conversation, build_pdf_vectorstore
+from modules.upload_store import open_upload
+
+@pytest.fixture
+def groups(tmp_path, monkeypatch, embeddings):
+    """Index with test embeddings and pypdf, recording the size of every group of chunks embedded."""
+    monkeypatch.setattr(index_cache, "CACHE_DIR", str(tmp_path / "indexes"))
+    monkeypatch.setattr(pdf_processor, "get_embeddings", lambda model=None: embeddings)
+    monkeypatch.setattr(pdf_processor, "get_extractor", lambda: PyPdfExtractor())
+    # Groups of 2 workers x 2 chunks
+    monkeypatch.setattr(pdf_processor, "EMBED_WORKERS", 2)
+    monkeypatch.setattr(pdf_processor, "EMBED_BATCH_SIZE", 2)
+    sizes = []
+    embed = pdf_processor.embed_into_vectorstore
+
+    def recording(chunks, embeddings, **kwargs):
+        sizes.append(len(chunks))
+        return embed(chunks, embeddings, **kwargs)
+
+    monkeypatch.setattr(pdf_processor, "embed_into_vectorstore", recording)
+    return sizes
+
+def test_chunks_are_embedded_in_groups_spanning_windows(groups, make_upload, make_pdf):
+    pages = [f"page {i} text" for i in range(10)]
+    windows = []
+    with open_upload(make_upload("notes.pdf", make_pdf(pages))) as upload:
+        build_pdf_vectorstore(upload, window_pages=1, on_window=lambda store, done, total: windows.append((store.index.ntotal, done)))
+    assert groups == [4, 4, 2]
+    assert windows == [(4, 4), (4, 8), (2, 10)]
+
+def test_streamed_groups_are_not_kept_but_cached(groups, make_upload, make_pdf, embeddings):
+    pages = [f"page {i} text" for i in range(10)]
+    received = []
+    with open_upload(make_upload("notes.pdf", make_pdf(pages))) as upload:
+        store, stats = build_pdf_vectorstore(upload, window_pages=1, on_window=lambda store, done, total: received.append(store))
+        assert store is None
+        assert not stats["cached"] and stats["chunks"] == 10
+
+        cached, stats = build_pdf_vectorstore(upload, window_pages=1, on_window=lambda *args: pytest.fail("re-embedded"))
+    assert stats["cached"]
+    assert sorted(doc.page_content for doc in cached.docstore._dict.values()) == sorted(pages)
+    # Stores handed to on_window are left intact
+    assert sum(store.index.ntotal for store in received) == 10
+
+def test_whole_file_is_returned_without_on_window(groups, make_upload, make_pdf):
+    with open_upload(make_upload("notes.pdf", make_pdf(["alpha", "beta", "gamma"]))) as upload:
+        store, stats = build_pdf_vectorstore(upload)
+    assert store.index.ntotal == 3 and stats["chunks"] == 3
+
+def test_reattaching_a_file_replaces_an_interrupted_run(embeddings):
+    knowledge_base = KnowledgeBase(embeddings)
+    conversation = SimpleNamespace(retriever=SimpleNamespace(knowledge_base=knowledge_base))
+    first = FAISS.from_texts(["page one"], embeddings)
+    second = FAISS.from_texts(["page two"], embeddings)
+
+    # A rerun stopped the first run after one window
+    attach_to_conversation(first, conversation, "hash", "notes.pdf")
+    # The second run starts over: its first window replaces, the next ones add
+    attach_to_conversation(FAISS.from_texts(["page one"], embeddings), conversation, "hash", "notes.pdf")
+    attach_to_conversation(second, conversation, "hash", "notes.pdf", replace=False)
+
+    assert len(knowledge_base.sources["hash"]["ids"]) == 2
+    assert knowledge_base.vectorstore.index.ntotal == 2
@@ -0,0 +1,45 @@
+# tests/test_table_store.py
+
+import pytest
+from modules import table_store
+from modules.table_store import is_out_of_core, project_tables, store_upload
+from modules.tabular_sandbox import evaluate_expression, reads_whole_tables, string_constants
+from modules.upload_store import open_upload
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch, make_upload):
+    monkeypatch.setattr(table_store, "TABLE_STORE_DIR", str(tmp_path))
+    csv = "name,section,score\nAnn,A,90\nBob,B,70\nCy,A,80\nDan,B,60\n"
+    with open_upload(make_upload("grades.csv", csv)) as upload:
+        table = store_upload(upload)
+    return {"grades.csv": table}
+
+def run(expression, tables):
+    # As TabularAnalyzer does when DuckDB is not installed
+    columns = None if reads_whole_tables(expression) else string_constants(expression)
+    return evaluate_expression(expression, project_tables(tables, columns))
+
+def test_parquet_table_reads_lazily(tables):
+    table = tables["grades.csv"]
+    assert is_out_of_core(table)
+    assert table.shape == (4, 3)
+    assert list(table.scan(columns=["score"]).columns) == ["score"]
+    assert sum(len(frame) for frame in table.iter_frames(3)) == 4
+
+def test_column_expressions_read_only_their_columns(tables):
+    projected = project_tables(tables, string_constants('df["score"].mean()'))
+    assert list(projected["grades.csv"].columns) == ["score"]
+    assert run('df["score"].mean()', tables) == 75
+    assert run('df.groupby("section")["score"].sum()', tables).to_dict() == {"A": 170, "B": 130}
+
+@pytest.mark.parametrize("expression, check", [
+    ('df.nlargest(2, "score")', lambda value: list(value["name"]) == ["Ann", "Cy"]),
+    ('df[df["score"] > 75]', lambda value: list(value.columns) == ["name", "section", "score"]),
+    ("len(df.columns)", lambda value: value == 3),
+    ("df.shape", lambda value: value == (4, 3)),
+    ("df.describe()", lambda value: value.loc["max", "score"] == 90),
+    ("df.head(1)", lambda value: value.iloc[0].tolist() == ["Ann", "A", 90]),
+])
+def test_row_expressions_read_every_column(tables, expression, check):
+    assert reads_whole_tables(expression)
+    assert check(run(expression, tables))
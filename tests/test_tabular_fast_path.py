@@ -0,0 +1,62 @@
+# tests/test_tabular_fast_path.py
+
+import pandas as pd
+import pytest
+from modules.table_profile import get_profile
+from modules.tabular_fast_path import answer_fast
+
+@pytest.fixture
+def tables():
+    return {"grades.csv": pd.DataFrame({
+        "name": ["Ann", "Bob", "Cy", "Dan"],
+        "section": ["A", "B", "A", "B"],
+        "score": [90, 70, 80, 60],
+    })}
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is the average score?", "The average **score** in **grades.csv** is **75**."),
+    ("What is the total score?", "The total **score** in **grades.csv** is **300**."),
+    ("maximum score in the table", "The maximum **score** in **grades.csv** is **90**."),
+    ("How many rows are in grades?", "**grades.csv** has **4** rows."),
+    ("How many distinct sections are there?", "The number of distinct values of **section** in **grades.csv** is **2**."),
+])
+def test_whole_table_aggregations(tables, question, expected):
+    assert answer_fast(question, tables) == expected
+
+def test_grouped_and_top_answers(tables):
+    assert "| A | 85 |" in answer_fast("average score per section", tables)
+    top = answer_fast("top 2 students by score", tables)
+    assert top.index("Ann") < top.index("Cy") and "Bob" not in top
+
+@pytest.mark.parametrize("question", [
+    "How many students are in section B?",
+    "What is the maximum score of Bob?",
+    "total score for Dan",
+    "What is Bob's score?",
+    "Which student has the highest score?",
+    "Who has the lowest score?",
+    "average score for student 3",
+    "What is the average score of section A students?",
+])
+def test_questions_about_particular_rows_go_to_the_llm(tables, question):
+    assert answer_fast(question, tables) is None
+
+def test_profile_answers_share_the_row_check(tables):
+    df = tables["grades.csv"].assign(program=["Computer Science", "Physics", "Physics", "Computer Science"])
+    profiles = {"grades.csv": get_profile(df)}
+    tables = {"grades.csv": df}
+    assert answer_fast("What is the maximum score?", tables, profiles) == "The maximum **score** in **grades.csv** is **90**."
+    assert answer_fast("What is the maximum score of Bob?", tables, profiles) is None
+    assert answer_fast("How many students are in section B?", tables, profiles) is None
+    assert answer_fast("average score in computer science", tables, profiles) is None
+
+def test_min_and_max_of_unordered_text_go_to_the_llm():
+    # dataframe_loader stores repetitive text as unordered categoricals
+    tables = {"grades.csv": pd.DataFrame({
+        "grade": pd.Categorical(["A", "B", "A", "C"]),
+        "due": pd.to_datetime(["2024-01-05", "2024-02-01", "2024-01-20", "2024-03-01"]),
+    })}
+    assert answer_fast("What is the maximum grade?", tables) is None
+    assert "2024-03-01" in answer_fast("What is the maximum due?", tables)
+    tables["grades.csv"]["grade"] = tables["grades.csv"]["grade"].cat.as_ordered()
+    assert "C" in answer_fast("What is the maximum grade?", tables)
@@ -0,0 +1,93 @@
+# tests/test_tabular_sandbox.py
+
+import pandas as pd
+import pytest
+from modules import tabular_sandbox
+from modules.tabular_analyzer import TabularAnalyzer
+from modules.tabular_sandbox import SandboxError, evaluate_expression, format_result, reads_whole_tables, string_constants
+
+@pytest.fixture
+def tables():
+    return {"grades.csv": pd.DataFrame({"name": ["Ann", "Bob", "Cy"], "section": ["A", "B", "A"], "score": [90, 70, 80]})}
+
+@pytest.mark.parametrize("expression", [
+    'df.agg("to_csv", path_or_buf="{path}")',
+    'df.agg("to_pickle", path="{path}")',
+    'df["score"].agg("to_csv", "{path}")',
+    'df.aggregate(["sum", "to_csv"])',
+    'df.agg(func="to_csv")',
+    'df.agg({{"score": "to_csv"}})',
+    'df.agg("eval", expr="score + 1")',
+    'df.agg("query", expr="score > 1")',
+    'df.groupby("section").agg("pipe", len)',
+    'df.groupby("section").agg(total=("score", "to_csv"))',
+    'df.pivot_table(values="score", index="section", aggfunc="to_csv")',
+    'df.pivot_table("score", "section", None, "to_csv")',
+    'crosstab(df["section"], df["name"], aggfunc="eval")',
+    'df["score"].agg(x="to_csv")',
+    'df.groupby("section")["score"].agg(x="to_csv", y="sum")',
+])
+def test_string_dispatch_is_limited_to_aggregations(tables, tmp_path, expression):
+    path = tmp_path / "leak.csv"
+    with pytest.raises(SandboxError):
+        evaluate_expression(expression.format(path=path), tables)
+    assert not path.exists()
+
+@pytest.mark.parametrize("expression", [
+    "10**10**10", "(10**100)**100", "2**1000", "df['score']**(2+1)", '"x" * 10**9', "[0] * len(df)",
+    "__import__('os')", "df.to_csv('x')", "df.eval('score')", "[x for x in df]", "lambda: 1",
+    "df.__class__",
+    'df.merge(df, how="cross")', 'df.merge(df, "cross")', 'df.join(df, how="cr" + "oss", rsuffix="_r")',
+])
+def test_unsafe_expressions_are_rejected(tables, expression):
+    with pytest.raises(SandboxError):
+        evaluate_expression(expression, tables)
+
+def test_concat_is_bounded_by_size(tables, monkeypatch):
+    monkeypatch.setattr(tabular_sandbox, "MAX_CONCAT_CELLS", 100)
+    assert len(evaluate_expression("concat([df, df])", tables)) == 6
+    with pytest.raises(SandboxError):
+        evaluate_expression("concat([df] * 10000)", tables)
+
+def test_aggregations_still_work(tables):
+    assert evaluate_expression('df.groupby("section").agg(total=("score", "sum"))', tables)["total"].to_dict() == {"A": 170, "B": 70}
+    assert evaluate_expression('df["score"].agg(["min", "max"])', tables).tolist() == [70, 90]
+    assert evaluate_expression('dfs["grades.csv"].pivot_table(values="score", index="section", aggfunc="mean")', tables)["score"]["A"] == 85
+    assert evaluate_expression('df["score"] ** 2 * 2', tables).tolist() == [16200, 9800, 12800]
+    assert evaluate_expression('"-" * 3', tables) == "---"
+    assert evaluate_expression('df[["score"]].agg("sum", axis="columns").tolist()', tables) == [90, 70, 80]
+    assert len(evaluate_expression('df.merge(df, on="section", how="inner")', tables)) == 5
+    assert len(evaluate_expression("concat([df, df])", tables)) == 6
+
+def test_string_constants_and_format_result():
+    assert string_constants('df[df["score"] > 75]["name"]') == {"score", "name"}
+    assert format_result(2 / 3) == "0.6667"
+    assert format_result(pd.Series(range(100)), max_rows=10).endswith("(100 rows in total)")
+
+@pytest.mark.parametrize("expression, whole", [
+    ('df["score"].mean()', False),
+    ('dfs["grades.csv"][["name", "score"]].head()', False),
+    ('df.groupby("section")["score"].max()', False),
+    ('df.groupby("section").first()', True),
+    ('len(df)', True),
+    ('dfs["grades.csv"].shape', True),
+    ('df[df["score"] > 75]["name"]', True),
+])
+def test_reads_whole_tables(expression, whole):
+    assert reads_whole_tables(expression) is whole
+
+def test_malformed_plan_is_retried(tables, monkeypatch):
+    analyzer = TabularAnalyzer()
+    responses = iter(['{"expression": df["score"].mean()}', '{"expression": "df[\\"score\\"].mean()"}', "The mean is 80."])
+    prompts = []
+
+    def generate(prompt, response_mime_type="text/plain"):
+        prompts.append(prompt)
+        return next(responses)
+
+    monkeypatch.setattr(analyzer, "_generate", generate)
+    monkeypatch.setattr(analyzer, "describe_for_prompt", lambda filename, df=None: "")
+    output = analyzer._analyze_locally("What is the mean score?", tables)
+    assert "JSONDecodeError" in prompts[1]
+    assert "80" in prompts[2]
+    assert output.startswith("The mean is 80.")
@@ -0,0 +1,46 @@
+# tests/test_upload_store.py
+
+import os
+import pytest
+from modules import upload_store
+from modules.upload_store import UploadSession, open_upload
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(upload_store, "SPOOL_THRESHOLD_BYTES", 4)
+    monkeypatch.setattr(upload_store, "_process_dir", None)
+    return tmp_path
+
+def test_small_uploads_stay_in_memory(spool, make_upload):
+    with open_upload(make_upload("a.txt", "abc")) as upload:
+        assert upload.path is None
+        assert upload.source.tobytes() == b"abc"
+
+def test_spooled_upload_drops_its_buffer(spool, make_upload):
+    with open_upload(make_upload("notes.txt", "spooled contents")) as upload:
+        assert upload.buffer is None
+        assert upload.size == len("spooled contents")
+        assert upload.source == upload.path
+        with upload.open() as f:
+            assert f.read() == b"spooled contents"
+    assert not os.path.exists(upload.path)
+
+def test_sessions_share_spooled_files(spool, make_upload):
+    first, second = UploadSession(), UploadSession()
+    path = first.read(make_upload("notes.txt", "shared contents")).path
+    assert second.read(make_upload("copy.txt", "shared contents")).path == path[:-4] + ".txt"
+    first.close()
+    assert os.path.exists(path)
+    second.close()
+    assert not os.path.exists(path)
+
+def test_other_processes_files_are_not_released(spool, make_upload):
+    # Another server process spooled the same contents into its own directory
+    other = spool / "other-process"
+    other.mkdir()
+    with open_upload(make_upload("notes.txt", "shared contents")) as upload:
+        (other / os.path.basename(upload.path)).write_bytes(b"shared contents")
+        assert os.path.dirname(upload.path) != str(other)
+    assert not os.path.exists(upload.path)
+    assert (other / os.path.basename(upload.path)).exists()
@@ -0,0 +1,98 @@
+# tests/test_voice_processor.py
+
+import time
+import pytest
+from modules import voice_processor
+from modules.voice_processor import SentenceSplitter, SpeechPipeline, audio_seconds, split_for_speech
+
+def test_emits_pieces_only_when_sentences_are_complete():
+    splitter = SentenceSplitter(min_chars=1, max_chars=100)
+    assert splitter.feed("The first sentence") == []
+    assert splitter.feed(" ends here. The second") == ["The first sentence ends here."]
+    assert splitter.flush() == ["The second"]
+
+def test_short_sentences_are_merged_up_to_min_chars():
+    splitter = SentenceSplitter(min_chars=20, max_chars=100)
+    assert splitter.feed("Yes. No. Maybe so, then. ") == ["Yes. No. Maybe so, then."]
+    assert splitter.feed("Ok. ") == []
+    assert splitter.flush() == ["Ok."]
+
+def test_line_breaks_end_sentences():
+    assert split_for_speech("# Heading\n- first item\n- second item", min_chars=1) == [
+        "Heading", "- first item", "- second item"
+    ]
+
+def test_no_piece_is_longer_than_max_chars():
+    text = "word " * 50 + "end. " + "another " * 30
+    splitter = SentenceSplitter(min_chars=1, max_chars=40)
+    pieces = [piece for chunk in text.split(" ") for piece in splitter.feed(chunk + " ")] + splitter.flush()
+    assert all(len(piece) <= 40 for piece in pieces)
+    assert " ".join(pieces).split() == text.split()
+
+def test_markdown_is_not_read_out():
+    pieces = split_for_speech("**Bold** and *italic* and __under__, see [the notes](http://x.y) and `code`.", min_chars=1)
+    assert pieces == ["Bold and italic and under, see the notes and code."]
+
+@pytest.mark.parametrize("text", ["2*3 = 6", "a * b * c", "x**2 + y**2", "2*3*4 is 24"])
+def test_arithmetic_asterisks_are_kept(text):
+    assert split_for_speech(text, min_chars=1) == [text]
+
+class FakePlaceholder:
+    def __init__(self):
+        self.calls = []
+
+    def audio(self, data, format="audio/wav", start_time=0, autoplay=False):
+        self.calls.append({"data": data, "start_time": start_time, "autoplay": autoplay})
+
+class FakeStreamlit:
+    def __init__(self):
+        self.placeholder = FakePlaceholder()
+        self.errors = []
+
+    def empty(self):
+        return self.placeholder
+
+    def error(self, message):
+        self.errors.append(message)
+
+class FakeVoice:
+    output_format = "mp3_22050_32"  # 4000 bytes per second
+
+    def synthesize(self, text, previous_text=None):
+        return text.encode() * 4000  # len(text) seconds of "audio"
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    fake = FakeStreamlit()
+    monkeypatch.setattr(voice_processor, "st", fake)
+    return fake
+
+def test_finish_returns_without_waiting_for_playback(fake_st, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: pytest.fail("slept on the script thread"))
+    pipeline = SpeechPipeline(FakeVoice())
+    pipeline.splitter = SentenceSplitter(min_chars=1)
+    pipeline.feed("Twenty characters!! ")
+    pipeline.futures[0].result()
+    pipeline.poll()
+    assert len(fake_st.placeholder.calls) == 1
+
+    pipeline.feed("Then a second sentence.")
+    start = time.perf_counter()
+    pipeline.finish()
+    assert time.perf_counter() - start < 5
+
+    last = fake_st.placeholder.calls[-1]
+    assert last["data"] == b"".join(pipeline.clips)
+    assert len(pipeline.clips) == 2
+    # The first clip (20 s) is still playing, so the whole answer resumes near its start
+    assert last["autoplay"] and last["start_time"] == 0
+
+def test_finish_plays_clips_never_played_from_the_start(fake_st):
+    pipeline = SpeechPipeline(FakeVoice())
+    pipeline.splitter = SentenceSplitter(min_chars=1)
+    pipeline.splitter.feed("Only one sentence here")
+    pipeline.finish()
+    assert fake_st.placeholder.calls == [{"data": pipeline.clips[0], "start_time": 0, "autoplay": True}]
+
+def test_audio_seconds_uses_the_bitrate():
+    assert audio_seconds(b"x" * 4000, "mp3_22050_32") == 1.0